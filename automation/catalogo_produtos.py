@@ -0,0 +1,218 @@
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from urllib.parse import urlparse
+
+# Opções (valor, texto) do select 'p_id_produto_servico' do formulário principal
+_JS_LER_OPCOES = """
+var select = document.getElementsByName(arguments[0])[0];
+if (!select) { return null; }
+return Array.prototype.map.call(select.options, function (o) { return [o.value, o.text]; });
+"""
+
+# Define o valor do select direto (sem percorrer as opções pelo Selenium) e
+# dispara o change; retorna false se o valor não existe entre as opções
+_JS_DEFINIR_VALOR = """
+var el = arguments[0];
+el.value = arguments[1];
+if (el.value !== arguments[1]) { return false; }
+el.dispatchEvent(new Event('change', {bubbles: true}));
+return true;
+"""
+
+# Produto usado quando o nome da planilha não corresponde a nenhuma opção (comportamento anterior)
+PRODUTO_PADRAO = 'DIESEL S10'
+# Produto das linhas de aditivo ("Diesel (valor) + Arla (valor)")
+PRODUTO_ADITIVO = 'ARLA'
+
+# Nomes usados nas planilhas -> nome da opção no portal
+_SINONIMOS = {
+    'ALCOOL': 'ETANOL',
+    'GASOLINA': 'GASOLINA COMUM',
+    'DIESEL': PRODUTO_PADRAO,
+    'S10': PRODUTO_PADRAO,
+    'ADITIVO': PRODUTO_ADITIVO,
+    'ARLA32': PRODUTO_ADITIVO,
+}
+
+# Palavras que só descrevem o produto: sozinhas não identificam uma opção
+_DESCRITIVAS = {'OLEO', 'COMUM', 'ADITIVADO', 'ADITIVADA', 'HIDRATADO', 'COMBUSTIVEL', 'TIPO'}
+
+def _palavras(texto):
+    sem_acento = ''.join(c for c in unicodedata.normalize('NFKD', str(texto or ''))
+                         if not unicodedata.combining(c))
+    return re.findall(r'[A-Z0-9]+', sem_acento.upper())
+
+def normalizar(texto):
+    """ 'Diesel S-10' -> 'DIESELS10' (sem acentos, espaços e pontuação). """
+    return ''.join(_palavras(texto))
+
+class CatalogoProdutos:
+    """
+    Opções de produto do formulário, lidas do navegador uma vez por sessão e
+    guardadas em disco por validade_horas. Um nome da planilha é resolvido,
+    nesta ordem: pela opção de nome mais longo contido nele ('Óleo Diesel S10'
+    -> 'DIESEL S10'), pelos sinônimos e, por fim, por palavras que só aparecem
+    em uma opção (ex.: 'ETANOL', 'ARLA'), desde que todas as palavras do nome
+    indiquem a mesma opção.
+    """
+
+    def __init__(self, caminho, validade_horas):
+        self.caminho = caminho
+        self.validade = validade_horas * 3600
+        self.opcoes = None
+        self.origem = None
+        self.lido_em = 0.0
+        self._nomes = []
+        self._unicas = {}
+        self._sinonimos = {}
+        self._resolvidos = {}
+        self._avisados = set()
+        self._lock = threading.Lock()
+
+    # --- Carga ---
+
+    def _valido(self, lido_em):
+        return time.time() - lido_em < self.validade
+
+    def _ler_disco(self, origem):
+        if not self.caminho:
+            return False
+        try:
+            with open(self.caminho, encoding='utf-8') as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if dados.get('origem') != origem or not self._valido(dados.get('lido_em', 0)) or not dados.get('opcoes'):
+            return False
+        self._definir(dados['opcoes'], origem, dados['lido_em'])
+        return True
+
+    def _gravar_disco(self):
+        if not self.caminho:
+            return
+        try:
+            temporario = f"{self.caminho}.tmp"
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump({'origem': self.origem, 'lido_em': self.lido_em, 'opcoes': self.opcoes},
+                          f, ensure_ascii=False)
+            os.replace(temporario, self.caminho)
+        except OSError:
+            # Sem o cache em disco a próxima execução apenas lê as opções de novo
+            pass
+
+    def carregar(self, driver, nome_select, logger):
+        """ Garante o catálogo em memória: do disco, se ainda válido, ou lendo o select da página. """
+        origem = urlparse(driver.current_url).netloc
+        with self._lock:
+            if self.opcoes and self.origem == origem and self._valido(self.lido_em):
+                return
+            if self._ler_disco(origem):
+                logger(f"Catálogo de produtos carregado do cache: {len(self._nomes)} opções.")
+                return
+            opcoes = driver.execute_script(_JS_LER_OPCOES, nome_select)
+            if not opcoes:
+                raise Exception("Lista de produtos não encontrada no formulário.")
+            self._definir(opcoes, origem, time.time())
+            self._gravar_disco()
+            logger(f"Catálogo de produtos lido do portal: {len(self.opcoes)} opções.")
+
+    def _definir(self, opcoes, origem, lido_em):
+        self.opcoes = [[str(valor), str(texto)] for valor, texto in opcoes]
+        self.origem = origem
+        self.lido_em = lido_em
+        self._resolvidos = {}
+
+        validas = [(valor, texto) for valor, texto in self.opcoes if valor]
+        # Nomes completos do mais longo ao mais curto: 'DIESEL S500 ADITIVADO' antes de 'DIESEL S500'
+        self._nomes = sorted(((normalizar(texto), valor) for valor, texto in validas),
+                             key=lambda item: len(item[0]), reverse=True)
+        contagem = Counter(p for _, texto in validas for p in set(_palavras(texto)))
+        self._unicas = {palavra: valor for valor, texto in validas for palavra in _palavras(texto)
+                        if contagem[palavra] == 1 and not palavra.isdigit() and palavra not in _DESCRITIVAS}
+        # Os sinônimos são resolvidos só pelos nomes e palavras das opções
+        self._sinonimos = {}
+        sinonimos = {}
+        for sinonimo, alvo in _SINONIMOS.items():
+            valor = self._procurar(alvo)
+            if valor is not None:
+                sinonimos[sinonimo] = valor
+        self._sinonimos = sinonimos
+
+    def invalidar(self):
+        """ Descarta o catálogo (uma opção não existia mais no formulário). """
+        with self._lock:
+            self.opcoes = None
+            self._nomes = []
+            self._unicas = {}
+            self._sinonimos = {}
+            self._resolvidos = {}
+            if self.caminho:
+                try:
+                    os.remove(self.caminho)
+                except OSError:
+                    pass
+
+    # --- Consulta ---
+
+    def _procurar(self, nome):
+        chave = normalizar(nome)
+        if not chave:
+            return None
+        for nome_opcao, valor in self._nomes:
+            if nome_opcao in chave:
+                return valor
+        if chave in self._sinonimos:
+            return self._sinonimos[chave]
+        # Palavra a palavra (sinônimo ou palavra de uma opção só): todas precisam indicar a mesma opção
+        palavras = [p for p in _palavras(nome) if p not in _DESCRITIVAS and not p.isdigit()]
+        valores = {self._sinonimos.get(p, self._unicas.get(p)) for p in palavras}
+        if len(valores) == 1 and None not in valores:
+            return valores.pop()
+        return None
+
+    def valor(self, nome_produto, logger):
+        """ Valor da opção para o nome de produto da planilha (resultado memorizado por nome). """
+        if not self._nomes:
+            raise Exception("Catálogo de produtos não carregado.")
+        if nome_produto in self._resolvidos:
+            return self._resolvidos[nome_produto]
+        valor = self._procurar(nome_produto or '')
+        if valor is None:
+            valor = self._procurar(PRODUTO_PADRAO)
+            if valor is None:
+                raise Exception(f"Produto '{nome_produto}' não encontrado nas opções do portal.")
+            if nome_produto not in self._avisados:
+                self._avisados.add(nome_produto)
+                logger(f"AVISO: Produto '{nome_produto}' não reconhecido nas opções do portal. "
+                       f"Usando {PRODUTO_PADRAO} (valor {valor}).")
+        self._resolvidos[nome_produto] = valor
+        return valor
+
+    def valor_aditivo(self):
+        """ Valor da opção do aditivo. Sem ela a linha não é enviada como outro produto. """
+        if not self._nomes:
+            raise Exception("Catálogo de produtos não carregado.")
+        valor = self._procurar(PRODUTO_ADITIVO)
+        if valor is None:
+            raise Exception(f"Produto {PRODUTO_ADITIVO} (aditivo) não encontrado nas opções do portal.")
+        return valor
+
+# Catálogo da sessão (definido no início de cada execução; mantido entre execuções iguais)
+catalogo = CatalogoProdutos("", 24)
+
+def configurar(caminho, validade_horas):
+    global catalogo
+    if catalogo.caminho != caminho or catalogo.validade != validade_horas * 3600:
+        catalogo = CatalogoProdutos(caminho, validade_horas)
+    return catalogo
+
+def definir_valor(driver, elemento, valor):
+    """ Seleciona a opção pelo valor em uma única chamada. Lança exceção se ela não existir. """
+    if not driver.execute_script(_JS_DEFINIR_VALOR, elemento, valor):
+        catalogo.invalidar()
+        raise Exception(f"Opção {valor} não encontrada no select de produto.")
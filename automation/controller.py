@@ -1,73 +1,347 @@
 import time
 import os
+import functools
 from dotenv import load_dotenv
 import automation.core_functions as core
-from selenium.webdriver.support import expected_conditions as EC
+import automation.paralelo as paralelo
+import automation.esperas as esperas
+import automation.preenchimento_js as preenchimento_js
+import automation.envio_http as envio_http
+import automation.diario as diario_envios
+import automation.telemetria as telemetria
+import automation.navegador as navegador
+import automation.validacao as validacao
+import automation.recuperacao as recuperacao
+import automation.pipeline as pipeline
+import automation.localizadores as localizadores
+import automation.sessao as sessao
+import automation.reconciliacao as reconciliacao
+import automation.catalogo_produtos as catalogo_produtos
+import automation.reciclagem as reciclagem
+import automation.governador as governador
+from automation.opcoes import OpcoesExecucao
+from automation.importacao_tardia import ImportacaoTardia
 
-def run_automation_flow(caminho_arquivo, logger, callback_pausa, callback_final):
+EC = ImportacaoTardia('selenium.webdriver.support.expected_conditions')
+
+def _enviar_registro(driver, wait, dados_completos, logger, indice, opcoes, diario=None, arquivo=None,
+                     reautenticar=None):
+    """
+    Preenche e submete um único registro no formulário já aberto, com até
+    opcoes.max_tentativas tentativas (a página é recuperada entre elas).
+    Lança exceção se o registro não puder ser enviado.
+    O governador de ritmo decide quando o registro pode começar.
+    """
+    with governador.vaga(), telemetria.registro(arquivo, indice + 1):
+        recuperacao.enviar_com_recuperacao(
+            lambda: _preencher_e_submeter(driver, wait, dados_completos, logger, indice, opcoes, diario),
+            driver, wait, logger, opcoes.max_tentativas, reautenticar
+        )
+
+def _preencher_e_submeter(driver, wait, dados_completos, logger, indice, opcoes, diario):
+    #  Preenche os campos
+    if opcoes.modo_preenchimento == "teclado":
+        preencher = core.preencher_um_registro
+    else:
+        preencher = preenchimento_js.preencher_um_registro_js
+    with telemetria.fase('preenchimento'):
+        if not preencher(driver, wait, dados_completos, logger):
+            raise Exception(f"Falha no preenchimento do registro {indice+1}")
+    
+    # Submete o formulário (o diário registra a intenção antes do envio)
+    logger("Campos preenchidos. Enviando formulário...")
+    chave = diario_envios.chave_registro(dados_completos) if diario else None
+    enviando = False
+    try:
+        with telemetria.fase('envio'):
+            form_principal = wait.until(EC.presence_of_element_located(
+                core.LOCATORS['form_principal']
+            ))
+            if diario:
+                diario.marcar(chave, diario_envios.ENVIADO)
+            enviando = True
+            form_principal.submit()
+            localizadores.invalidar(driver)
+        logger("Formulário enviado.")
+
+    except Exception as e_confirm:
+        logger(f"ERRO: Não foi possível submeter o formulário principal. {e_confirm}")
+        if enviando:
+            # O portal pode ter recebido o registro: não pode ser repetido
+            governador.registrar_erro('envio')
+            raise recuperacao.EnvioIncerto(f"Falha durante o envio do registro {indice+1}: {e_confirm}") from e_confirm
+        raise e_confirm
+
+    # Espera a página recarregar e limpar os campos
+    try:
+        with telemetria.fase('espera_pos_envio'):
+            duracao = esperas.aguardar_pos_envio(driver, form_principal, opcoes.tempo_maximo_espera)
+        pagina = driver.page_source
+    except Exception as e_espera:
+        # O formulário já foi submetido: sem a página de volta, o resultado é incerto
+        governador.registrar_erro('envio')
+        raise recuperacao.EnvioIncerto(
+            f"Falha ao confirmar o envio do registro {indice+1}: {e_espera}"
+        ) from e_espera
+
+    # O portal recusa o registro devolvendo o formulário vazio com a mensagem de erro:
+    # nada foi gravado, então o registro volta a pendente e pode ser tentado de novo
+    erro_portal = envio_http.erro_na_pagina(pagina)
+    if erro_portal:
+        governador.registrar_erro('envio')
+        if diario:
+            diario.marcar(chave, diario_envios.PENDENTE, detalhe=erro_portal)
+        raise Exception(f"Registro {indice+1} recusado pelo portal: {erro_portal}")
+
+    governador.registrar('envio', duracao)
+    logger(f"Página pronta para o próximo registro em {duracao:.2f}s.")
+    if diario:
+        diario.marcar(chave, diario_envios.CONFIRMADO)
+
+def _registrar_resumo_esperas(logger):
+    for nome, (quantidade, media, maximo) in sorted(esperas.registro.resumo().items()):
+        logger(f"Espera '{nome}': {quantidade}x, média {media:.2f}s, máximo {maximo:.2f}s")
+
+def _iniciar_governador(opcoes, logger):
+    # Sessões (ou envios HTTP) simultâneos: o máximo que o governador pode liberar
+    governador.iniciar(opcoes.ritmo_adaptativo, max(1, opcoes.num_workers), opcoes.intervalo_maximo_envio, logger)
+
+def _registrar_resumo_governador(logger):
+    if governador.atual.ativo:
+        logger(f"Ritmo final: {governador.atual.situacao()} ({governador.atual.recuos} recuo(s)).")
+
+def _registrar_resumo_telemetria(logger):
+    if not telemetria.atual.ativa:
+        return
+    for linha in telemetria.atual.texto_resumo().splitlines():
+        logger(f"Telemetria: {linha}")
+    logger(f"Telemetria gravada em {os.path.abspath(telemetria.atual.caminho_jsonl)}")
+
+def _resumir_resultados(resultados, total, logger):
+    """ Consolida os resultados de todas as sessões. Retorna a mensagem de erro ou None. """
+    falhas = sorted(i for i, erro in resultados.items() if erro is not None)
+    enviados = sum(1 for erro in resultados.values() if erro is None)
+    nao_processados = [i for i in range(total) if i not in resultados]
+
+    logger(f"Resumo: {enviados} enviados, {len(falhas)} com falha, {len(nao_processados)} não processados.")
+    for i in falhas:
+        logger(f"  Registro {i+1}: {resultados[i]}")
+
+    if falhas or nao_processados:
+        registros = ", ".join(str(i+1) for i in falhas + nao_processados)
+        return f"{len(falhas) + len(nao_processados)} registro(s) não foram enviados: {registros}"
+    return None
+
+def _obter_url_login():
+    # Carrega as variáveis de ambiente do .env
+    load_dotenv()
+    url_login = os.getenv("URL_LOGIN")
+    if not url_login:
+        raise Exception("URL_LOGIN não encontrada no arquivo .env")
+    return url_login
+
+def _abrir_diario(opcoes, logger):
+    if not opcoes.caminho_diario:
+        return None
+    logger(f"Diário de envios: {os.path.abspath(opcoes.caminho_diario)}")
+    return diario_envios.DiarioEnvios(opcoes.caminho_diario)
+
+def _validar_planilha(dados_cabecalho, lista_transacoes, logger):
+    """ Valida todos os registros antes de abrir o navegador. Retorna a mensagem de erro ou None. """
+    relatorio = validacao.validar_planilha(dados_cabecalho, lista_transacoes)
+    relatorio.registrar(logger)
+    return relatorio.mensagem_erro()
+
+def _sessao_salva(url_login, opcoes):
+    if not opcoes.caminho_sessao:
+        return None
+    return sessao.ArmazemSessao(opcoes.caminho_sessao, url_login)
+
+def _indice_portal(opcoes):
+    if not opcoes.url_consulta:
+        return None
+    return reconciliacao.IndicePortal(opcoes.url_consulta)
+
+def _reautenticar(navegacao, url_login, logger, callback_pausa, sessao_salva=None):
+    """ Volta à página de login e pausa para um novo login manual (sessão expirada). """
+    logger("A sessão do portal expirou. Refaça o login no navegador.")
+    driver = navegacao.driver
+    driver.switch_to.default_content()
+    driver.get(url_login)
+    callback_pausa()
+    if sessao_salva:
+        sessao_salva.salvar(driver, logger)
+
+def _abrir_navegador(url_login, logger, callback_pausa, opcoes):
+    """ Reutiliza o navegador mantido aberto pela execução anterior ou abre um novo e faz o login. """
+    perfil = navegador.configurar_perfil(opcoes.perfil_enxuto, opcoes.bloquear_recursos)
+    if perfil.enxuto:
+        logger(f"Perfil do navegador: {perfil.descricao()}.")
+    if opcoes.manter_navegador:
+        driver, wait = navegador.quente.reutilizar(url_login, logger, callback_pausa)
+        if driver:
+            return driver, wait
+    else:
+        navegador.quente.fechar()
+    driver, wait = core.iniciar_e_logar(url_login, logger, callback_pausa, _sessao_salva(url_login, opcoes))
+    if driver and opcoes.manter_navegador:
+        navegador.quente.guardar(driver, wait)
+    return driver, wait
+
+def _navegador_reciclavel(driver, wait, opcoes):
+    return reciclagem.NavegadorReciclavel(driver, wait, opcoes.reciclar_apos_registros, opcoes.reciclar_memoria_mb)
+
+def _fechar_navegador(driver, opcoes, logger):
+    if opcoes.manter_navegador and navegador.quente.contem(driver):
+        logger("Navegador mantido aberto para a próxima execução.")
+        return
+    driver.quit()
+    logger("Navegador fechado.")
+
+def _aguardar_antes_de_fechar(opcoes, logger):
+    # Com o navegador mantido aberto não há por que esperar antes de fechar
+    if not opcoes.manter_navegador and opcoes.espera_ao_fechar > 0:
+        logger(f"Aguardando {opcoes.espera_ao_fechar:g} segundos antes de fechar.")
+        time.sleep(opcoes.espera_ao_fechar)
+
+def _registrar_no_indice(indice_portal, dados_cabecalho, lista_transacoes, resultados):
+    """
+    Registros enviados (ou talvez gravados) nesta execução entram no índice do
+    portal, para que outra planilha do lote com o mesmo registro não o reenvie.
+    """
+    if not indice_portal:
+        return
+    placa = dados_cabecalho.get('placa')
+    for i, erro in resultados.items():
+        if erro is None or isinstance(erro, recuperacao.EnvioIncerto):
+            indice_portal.registrar(placa, reconciliacao.chave_transacao(placa, lista_transacoes[i]))
+
+def _enviar_transacoes(navegacao, dados_cabecalho, lista_transacoes, opcoes, logger, diario=None, arquivo=None,
+                       reautenticar=None, indice_portal=None):
+    """
+    Envia as transações de uma planilha pelo modo configurado, a partir do
+    navegador já logado (reciclagem.NavegadorReciclavel). Lança exceção se
+    algum registro não for enviado.
+    reautenticar() refaz o login se a sessão expirar; o navegador só é
+    reiniciado pela política de reciclagem no modo sequencial.
+    Com indice_portal, os registros que já existem no portal são pulados.
+    """
+    driver, wait = navegacao.driver, navegacao.wait
+    if diario:
+        lista_transacoes = diario.filtrar_pendentes(dados_cabecalho, lista_transacoes, arquivo, logger)
+        if not lista_transacoes:
+            logger("Nenhum registro pendente nesta planilha.")
+            return
+    if indice_portal:
+        lista_transacoes = indice_portal.filtrar(driver, dados_cabecalho, lista_transacoes, logger, diario)
+        if not lista_transacoes:
+            logger("Todos os registros desta planilha já existem no portal.")
+            return
+    telemetria.atual.adicionar_previstos(len(lista_transacoes))
+
+    enviar_registro = functools.partial(_enviar_registro, opcoes=opcoes, diario=diario, arquivo=arquivo)
+
+    if opcoes.modo_envio == "http" or opcoes.num_workers > 1:
+        if opcoes.modo_envio == "http":
+            # Selenium só para login e placa; registros enviados por HTTP
+            if not core.garantir_formulario(driver, wait, logger):
+                raise Exception("Falha ao navegar até o formulário de inclusão.")
+            resultados = envio_http.executar_envio_http(
+                driver, wait, dados_cabecalho, lista_transacoes,
+                opcoes.num_workers, logger, diario, arquivo
+            )
+        else:
+            # Várias sessões consomem a mesma fila de transações
+            resultados = paralelo.executar_em_paralelo(
+                driver, wait, dados_cabecalho, lista_transacoes,
+                opcoes.num_workers, enviar_registro, logger
+            )
+        _registrar_no_indice(indice_portal, dados_cabecalho, lista_transacoes, resultados)
+        erro_resumo = _resumir_resultados(resultados, len(lista_transacoes), logger)
+        if erro_resumo:
+            raise Exception(erro_resumo)
+        return
+
+    # Navega até o formulário (só se ele ainda não estiver aberto)
+    if not core.garantir_formulario(driver, wait, logger):
+        raise Exception("Falha ao navegar até o formulário de inclusão.")
+
+    # Inicia o LOOP de registros; um registro com falha é anotado e pulado
+    resultados = {}
+    for i, transacao in enumerate(lista_transacoes):
+        logger(f"--- Processando Registro {i+1} de {len(lista_transacoes)} ---")
+        
+        dados_completos = {**dados_cabecalho, **transacao}
+        try:
+            navegacao.antes_do_registro(logger)
+            enviar_registro(navegacao.driver, navegacao.wait, dados_completos, logger, i, reautenticar=reautenticar)
+            resultados[i] = None
+        except recuperacao.SessaoIrrecuperavel as e:
+            resultados[i] = e
+            logger(f"ERRO no registro {i+1}: {e}. Interrompendo o envio.")
+            break
+        except Exception as e:
+            resultados[i] = e
+            logger(f"ERRO no registro {i+1}: {e}. Registro pulado.")
+            continue
+
+        # Prepara para o próximo registro
+        if i < len(lista_transacoes) - 1:
+            logger("Formulário enviado. Preparando para o próximo registro...")
+
+    _registrar_no_indice(indice_portal, dados_cabecalho, lista_transacoes, resultados)
+    erro_resumo = _resumir_resultados(resultados, len(lista_transacoes), logger)
+    if erro_resumo:
+        raise Exception(erro_resumo)
+
+def run_automation_flow(caminho_arquivo, logger, callback_pausa, callback_final, opcoes=None):
     """
     Função principal que orquestra todo o processo de automação.
     Executada em uma thread separada.
     """
-    driver = None
+    opcoes = opcoes or OpcoesExecucao()
+    esperas.registro.limpar()
+    telemetria.iniciar(opcoes.caminho_telemetria)
+    catalogo_produtos.configurar(opcoes.caminho_catalogo, opcoes.validade_catalogo_horas)
+    _iniciar_governador(opcoes, logger)
+    navegacao = None
+    diario = None
     try:
-        # Carrega as variáveis de ambiente do .env
-        load_dotenv()
-        url_login = os.getenv("URL_LOGIN")
-        if not url_login:
-            raise Exception("URL_LOGIN não encontrada no arquivo .env")
+        url_login = _obter_url_login()
+        diario = _abrir_diario(opcoes, logger)
         
         # Extrai dados da planilha
         dados_cabecalho, lista_transacoes = core.extrair_dados_planilha(caminho_arquivo, logger)
         
         if not dados_cabecalho or not lista_transacoes:
             raise Exception("Falha ao extrair dados (cabeçalho ou transações). Verifique o log.")
+
+        erro_validacao = _validar_planilha(dados_cabecalho, lista_transacoes, logger)
+        if erro_validacao:
+            raise Exception(erro_validacao)
+        if opcoes.somente_validar:
+            logger(f"Somente validação: {len(lista_transacoes)} transações válidas, nada foi enviado.")
+            callback_final(sucesso=True, erro=None)
+            return
         
         logger(f"{len(lista_transacoes)} transações encontradas. Iniciando navegador...")
 
         # Inicia o navegador e pausa para login
-        driver, wait = core.iniciar_e_logar(url_login, logger, callback_pausa)
+        driver, wait = _abrir_navegador(url_login, logger, callback_pausa, opcoes)
         if not driver:
             raise Exception("Falha ao iniciar o navegador.")
+        navegacao = _navegador_reciclavel(driver, wait, opcoes)
         
-        # Navega até o formulário (APENAS UMA VEZ)
-        if not core.navegar_ate_formulario(driver, wait, logger):
-            raise Exception("Falha ao navegar até o formulário de inclusão.")
-
-        # Inicia o LOOP de registros
-        for i, transacao in enumerate(lista_transacoes):
-            logger(f"--- Processando Registro {i+1} de {len(lista_transacoes)} ---")
-            
-            dados_completos = {**dados_cabecalho, **transacao}
-            
-            #  Preenche os campos
-            if not core.preencher_um_registro(driver, wait, dados_completos, logger):
-                raise Exception(f"Falha no preenchimento do registro {i+1}")
-            
-            # Submete o formulário
-            logger("Campos preenchidos. Enviando formulário...")
-            try:
-                form_principal = wait.until(EC.presence_of_element_located(
-                    core.LOCATORS['form_principal']
-                ))
-                form_principal.submit()
-                logger("Formulário enviado.")
-                
-                # Espera para a página recarregar e limpar os campos
-                logger("Aguardando 5 segundos...")
-                time.sleep(5) 
-
-            except Exception as e_confirm:
-                logger(f"ERRO: Não foi possível submeter o formulário principal. {e_confirm}")
-                raise e_confirm
-
-            # Prepara para o próximo registro
-            if i < len(lista_transacoes) - 1:
-                logger("Formulário enviado. Preparando para o próximo registro...")
+        reautenticar = functools.partial(_reautenticar, navegacao, url_login, logger, callback_pausa,
+                                         _sessao_salva(url_login, opcoes))
+        _enviar_transacoes(navegacao, dados_cabecalho, lista_transacoes, opcoes, logger,
+                           diario, os.path.basename(caminho_arquivo), reautenticar, _indice_portal(opcoes))
         
         logger("--- TODOS OS REGISTROS FORAM PROCESSADOS ---")
-        logger("Aguardando 10 segundos antes de fechar.")
-        time.sleep(10)
+        _registrar_resumo_esperas(logger)
+        _registrar_resumo_governador(logger)
+        _registrar_resumo_telemetria(logger)
+        _aguardar_antes_de_fechar(opcoes, logger)
         
         callback_final(sucesso=True, erro=None)
 
@@ -75,7 +349,135 @@ def run_automation_flow(caminho_arquivo, logger, callback_pausa, callback_final)
         callback_final(sucesso=False, erro=e)
         
     finally:
-        if driver:
-            driver.quit()
-            logger("Navegador fechado.")
+        if navegacao:
+            _fechar_navegador(navegacao.driver, opcoes, logger)
+        if diario:
+            diario.fechar()
+        telemetria.atual.encerrar()
+        logger("Thread de automação finalizada.")
+
+def listar_planilhas(entradas):
+    """
+    Expande a entrada do modo em lote (uma pasta, um arquivo ou uma lista
+    de ambos) na lista ordenada de planilhas .xlsx.
+    """
+    if isinstance(entradas, (str, os.PathLike)):
+        entradas = [entradas]
+
+    caminhos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            caminhos.extend(
+                os.path.join(entrada, nome) for nome in sorted(os.listdir(entrada))
+                # '~$' são os arquivos temporários do Excel aberto
+                if nome.lower().endswith('.xlsx') and not nome.startswith('~$')
+            )
+        else:
+            caminhos.append(entrada)
+    return caminhos
+
+def run_automation_flow_lote(entradas, logger, callback_pausa, callback_final, opcoes=None):
+    """
+    Modo em lote: as planilhas são lidas e validadas em processos separados
+    enquanto o navegador abre e o login é feito; cada planilha pronta é
+    enviada assim que chega, com um único login para todas.
+    Executada em uma thread separada.
+    """
+    opcoes = opcoes or OpcoesExecucao()
+    esperas.registro.limpar()
+    telemetria.iniciar(opcoes.caminho_telemetria)
+    catalogo_produtos.configurar(opcoes.caminho_catalogo, opcoes.validade_catalogo_horas)
+    _iniciar_governador(opcoes, logger)
+    navegacao = None
+    diario = None
+    leitura = None
+    try:
+        url_login = _obter_url_login()
+        diario = _abrir_diario(opcoes, logger)
+
+        caminhos = listar_planilhas(entradas)
+        if not caminhos:
+            raise Exception("Nenhuma planilha .xlsx encontrada na seleção.")
+
+        # A leitura das planilhas corre em paralelo com a abertura do navegador e o login
+        leitura = pipeline.PipelinePlanilhas(caminhos, opcoes.processos_leitura)
+        leitura.iniciar()
+        logger(f"{len(caminhos)} planilhas na fila de leitura ({leitura.num_processos} processo(s)).")
+
+        reautenticar = None
+        if not opcoes.somente_validar:
+            driver, wait = _abrir_navegador(url_login, logger, callback_pausa, opcoes)
+            if not driver:
+                raise Exception("Falha ao iniciar o navegador.")
+            # Um único navegador para o lote: a contagem da reciclagem segue entre as planilhas
+            navegacao = _navegador_reciclavel(driver, wait, opcoes)
+            reautenticar = functools.partial(_reautenticar, navegacao, url_login, logger, callback_pausa,
+                                             _sessao_salva(url_login, opcoes))
+
+        # Um único índice para o lote: cada placa é lida do portal uma vez só
+        indice_portal = _indice_portal(opcoes)
+        falhas = {}
+        validas = 0
+        enviados = 0
+        for n, planilha in enumerate(leitura, 1):
+            nome = planilha['nome']
+            logger(f"=== Arquivo {n} de {len(caminhos)}: {nome} ===")
+
+            def logger_arquivo(mensagem, nome=nome):
+                logger(f"[{nome}] {mensagem}")
+
+            for mensagem in planilha['mensagens']:
+                logger_arquivo(mensagem)
+            if planilha['erro']:
+                falhas[nome] = planilha['erro']
+                logger(f"ERRO: {nome} ignorado. {planilha['erro']}")
+                continue
+            validas += 1
+            if opcoes.somente_validar:
+                continue
+
+            lista_transacoes = planilha['lista_transacoes']
+            logger(f"Enviando {len(lista_transacoes)} registros de {nome}...")
+            try:
+                _enviar_transacoes(navegacao, planilha['dados_cabecalho'], lista_transacoes, opcoes,
+                                   logger_arquivo, diario, nome, reautenticar, indice_portal)
+                enviados += len(lista_transacoes)
+                logger(f"Arquivo concluído: {nome}. Registros processados até agora: {enviados}.")
+            except Exception as e:
+                falhas[nome] = e
+                logger(f"ERRO no arquivo {nome}: {e}. Seguindo para o próximo arquivo.")
+
+        if opcoes.somente_validar:
+            logger(f"Somente validação: {validas} de {len(caminhos)} planilhas válidas, nada foi enviado.")
+            if falhas:
+                callback_final(sucesso=False, erro=Exception(f"{len(falhas)} arquivo(s) inválido(s): {', '.join(falhas)}"))
+            else:
+                callback_final(sucesso=True, erro=None)
+            return
+
+        logger("--- LOTE FINALIZADO ---")
+        logger(f"Arquivos concluídos: {len(caminhos) - len(falhas)} de {len(caminhos)}.")
+        for nome, erro in falhas.items():
+            logger(f"  {nome}: {erro}")
+        _registrar_resumo_esperas(logger)
+        _registrar_resumo_governador(logger)
+        _registrar_resumo_telemetria(logger)
+        _aguardar_antes_de_fechar(opcoes, logger)
+
+        if falhas:
+            callback_final(sucesso=False, erro=Exception(f"{len(falhas)} arquivo(s) com falha: {', '.join(falhas)}"))
+        else:
+            callback_final(sucesso=True, erro=None)
+
+    except Exception as e:
+        callback_final(sucesso=False, erro=e)
+
+    finally:
+        if leitura:
+            leitura.encerrar()
+        if navegacao:
+            _fechar_navegador(navegacao.driver, opcoes, logger)
+        if diario:
+            diario.fechar()
+        telemetria.atual.encerrar()
         logger("Thread de automação finalizada.")
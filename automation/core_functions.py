@@ -1,17 +1,27 @@
-import time
-import pandas as pd
 import re
 import math
+import threading
+import time
+import weakref
 from datetime import datetime
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.support.ui import Select
+from selenium.common.exceptions import NoAlertPresentException, TimeoutException
+import automation.esperas as esperas
+import automation.telemetria as telemetria
+import automation.navegador as navegador
+import automation.localizadores as localizadores
+import automation.catalogo_produtos as catalogo_produtos
+import automation.governador as governador
+from automation.importacao_tardia import ImportacaoTardia
+
+# Dependências pesadas: importadas só no primeiro uso
+pd = ImportacaoTardia('pandas')
+np = ImportacaoTardia('numpy')
+load_workbook = ImportacaoTardia('openpyxl', 'load_workbook')
+WebDriverWait = ImportacaoTardia('selenium.webdriver.support.ui', 'WebDriverWait')
+EC = ImportacaoTardia('selenium.webdriver.support.expected_conditions')
+Keys = ImportacaoTardia('selenium.webdriver.common.keys', 'Keys')
+ActionChains = ImportacaoTardia('selenium.webdriver.common.action_chains', 'ActionChains')
 
 MAP_CHAVES_BUSCA_CABECALHO = {
     'nome': ['CONDUTOR'],
@@ -50,15 +60,16 @@ def _buscar_placa_popup(driver, placa, logger):
         driver.execute_script("arguments[0].scrollIntoView(true);", link_buscar)
         link_buscar.click()
  
-        # Espera o modal ficar visível
+        # Espera o modal ficar visível e terminar a animação de abertura
         modal_locator = (By.CSS_SELECTOR, "#lov.jqmWindow")
-        wait.until(EC.visibility_of_element_located(modal_locator))
+        esperas.aguardar_visivel(driver, modal_locator, timeout=20, nome="modal_visivel")
+        esperas.aguardar_modal(driver, visivel=True, timeout=20)
  
         # Espera pelo campo de input (ID duplicado)
         input_placa_locator = (By.ID, "p_nr_placa_veiculo")
-        wait.until(
-            lambda d: len(d.find_elements(*input_placa_locator)) > 1,
-            "Modal abriu, mas o campo de input duplicado não foi encontrado."
+        esperas.aguardar_quantidade(
+            driver, input_placa_locator, 2, timeout=20,
+            mensagem="Modal abriu, mas o campo de input duplicado não foi encontrado.", nome="input_placa_modal"
         )
         
         # Pega o segundo campo [1], que é o do modal
@@ -67,9 +78,9 @@ def _buscar_placa_popup(driver, placa, logger):
         input_placa.clear()
         input_placa.send_keys(placa)
  
-        # Força a validação do campo (onBlur/onChange)
+        # Força a validação do campo (onBlur/onChange) e espera ela terminar
         input_placa.send_keys(Keys.TAB)
-        time.sleep(0.5)
+        esperas.aguardar_rede_ociosa(driver, timeout=20)
 
         # Clica no botão "Pesquisar" (dentro do modal)
         botao_pesquisar_locator = (By.XPATH, "//button[contains(text(), 'Pesquisar')]")
@@ -77,10 +88,11 @@ def _buscar_placa_popup(driver, placa, logger):
         botao_pesquisar.click()
  
         # Espera a tabela de resultados
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "div.tabela")))
-        wait.until(lambda d: len(d.find_elements(By.CSS_SELECTOR, "a.retorno")) > 0, 
-                   "A busca no popup não retornou nenhum resultado.")
-        time.sleep(0.5)  
+        esperas.aguardar_quantidade(driver, (By.CSS_SELECTOR, "div.tabela"), 1, timeout=20, nome="tabela_resultados")
+        esperas.aguardar_quantidade(driver, (By.CSS_SELECTOR, "a.retorno"), 1, timeout=20,
+                                    mensagem="A busca no popup não retornou nenhum resultado.",
+                                    nome="resultado_placa")
+        esperas.aguardar_rede_ociosa(driver, timeout=20)
  
         # Tenta clicar no resultado exato, se falhar, clica no primeiro
         try:
@@ -93,8 +105,8 @@ def _buscar_placa_popup(driver, placa, logger):
  
         link_resultado.click()
  
-        # Espera o modal ficar invisível
-        wait.until(EC.invisibility_of_element_located((By.ID, "lov")))
+        # Espera o modal ficar invisível (fim da animação de fechamento)
+        esperas.aguardar_modal(driver, visivel=False, timeout=20)
  
         # Verificação final
         campo_placa_principal = wait.until(EC.presence_of_element_located((By.NAME, "p_nr_placa_veiculo")))
@@ -107,6 +119,100 @@ def _buscar_placa_popup(driver, placa, logger):
         logger(f"ERRO CRÍTICO durante busca da placa no popup: {e}")
         raise e 
  
+# --- Cache da Placa (evita o popup em registros repetidos) ---
+
+# Lista [nome, índice, valor] de todos os campos nomeados do formulário principal
+_JS_CAPTURAR_CAMPOS = """
+var form = document.querySelector('button.gravar') ? document.querySelector('button.gravar').form : null;
+var elementos = form ? form.elements : document.querySelectorAll('input[name], select[name], textarea[name]');
+var contagem = {}, campos = [];
+for (var i = 0; i < elementos.length; i++) {
+    var el = elementos[i];
+    if (!el.name || el.tagName === 'BUTTON' || el.closest('#lov')) { continue; }
+    var indice = contagem[el.name] || 0;
+    contagem[el.name] = indice + 1;
+    campos.push([el.name, indice, el.value]);
+}
+return campos;
+"""
+
+# Reaplica os valores que o popup escreveu, disparando os eventos que o popup dispararia
+_JS_INJETAR_CAMPOS = """
+var campos = arguments[0];
+for (var i = 0; i < campos.length; i++) {
+    var el = document.getElementsByName(campos[i][0])[campos[i][1]];
+    if (!el) { return false; }
+    el.value = campos[i][2];
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+    el.dispatchEvent(new FocusEvent('blur'));
+}
+return true;
+"""
+
+# Um cache por sessão do navegador: {driver: {placa: [[nome, índice, valor], ...]}}
+_cache_placas = weakref.WeakKeyDictionary()
+_lock_cache_placas = threading.Lock()
+
+def _capturar_campos(driver):
+    return {(nome, indice): valor for nome, indice, valor in driver.execute_script(_JS_CAPTURAR_CAMPOS)}
+
+def _injetar_placa_do_cache(driver, campos_placa):
+    """ Injeta os campos em cache e verifica se o portal os aceitou. """
+    if not driver.execute_script(_JS_INJETAR_CAMPOS, campos_placa):
+        return False
+    esperas.aguardar_rede_ociosa(driver, timeout=10)
+
+    # Um alerta de validação indica rejeição
+    try:
+        alerta = driver.switch_to.alert
+        alerta.accept()
+        return False
+    except NoAlertPresentException:
+        pass
+
+    # A validação do portal não pode ter limpado ou alterado os valores injetados
+    atuais = _capturar_campos(driver)
+    return all(atuais.get((nome, indice)) == valor for nome, indice, valor in campos_placa)
+
+def resolver_placa(driver, placa, logger):
+    """
+    Preenche a placa reaproveitando o resultado do popup de um registro anterior
+    da mesma sessão. Se o portal rejeitar a injeção, volta ao popup.
+    """
+    with telemetria.fase('placa') as fase:
+        chave = placa.strip().upper()
+        with _lock_cache_placas:
+            campos_placa = _cache_placas.get(driver, {}).get(chave)
+
+        if campos_placa:
+            if _injetar_placa_do_cache(driver, campos_placa):
+                fase.anotar(origem='cache')
+                logger(f"Placa '{chave}' preenchida a partir do cache (popup evitado).")
+                return True
+            logger("AVISO: O portal rejeitou a placa em cache. Usando o popup.")
+            with _lock_cache_placas:
+                _cache_placas.get(driver, {}).pop(chave, None)
+
+        fase.anotar(origem='popup')
+        antes = _capturar_campos(driver)
+        inicio = time.perf_counter()
+        try:
+            _buscar_placa_popup(driver, placa, logger)
+        except TimeoutException:
+            governador.registrar_erro('placa')
+            raise
+        governador.registrar('placa', time.perf_counter() - inicio)
+        depois = _capturar_campos(driver)
+
+        # O resultado da busca são os campos (visíveis ou ocultos) que o popup escreveu
+        campos_placa = [[nome, indice, valor] for (nome, indice), valor in depois.items()
+                        if (nome, indice) in antes and antes[(nome, indice)] != valor]
+        if campos_placa:
+            with _lock_cache_placas:
+                _cache_placas.setdefault(driver, {})[chave] = campos_placa
+        return True
+
 # --- Funções de Extração ---
 
 def _extrair_valor_busca(texto_celula, mapa_busca):
@@ -135,12 +241,14 @@ def _mapear_colunas_tabela(header_row, logger):
     logger(f"Mapa de colunas da tabela criado: {mapa}")
     return mapa
 
+# Produto dividido: "Diesel (valor) + Aditivo/Arla (valor)"
+_REGEX_PRODUTO_DIVIDIDO = re.compile(
+    r"(.*?)\s*\(\s*([\d,.]+)\s*\)\s*\+\s*(Aditivo|Arla)\s*\(\s*([\d,.]+)\s*\)",
+    re.IGNORECASE
+)
+
 def _extrair_transacao(row_data, col_map, logger):
     try:
-        product_regex = re.compile(
-            r"(.*?)\s*\(\s*([\d,.]+)\s*\)\s*\+\s*(Aditivo|Arla)\s*\(\s*([\d,.]+)\s*\)", 
-            re.IGNORECASE
-        )
         idx_data = col_map.get('data', 0)
         val_data = str(row_data[idx_data]).strip()
         idx_check_total_col = col_map.get('valor_total', 4)
@@ -153,9 +261,10 @@ def _extrair_transacao(row_data, col_map, logger):
         data_formatada = data_obj.strftime('%d/%m/%Y')
         
         produto_nome_bruto = str(row_data[col_map['produto_nome']])
-        match = product_regex.search(produto_nome_bruto)
+        match = _REGEX_PRODUTO_DIVIDIDO.search(produto_nome_bruto)
         
         aditivo_info = None
+        erro_aditivo = None
         produto_nome_final = produto_nome_bruto.strip()
         valor_total_final = str(row_data[col_map['valor_total']]).strip().replace(',', '.')
         
@@ -178,6 +287,7 @@ def _extrair_transacao(row_data, col_map, logger):
                 logger(f"Produto dividido: {produto_nome_final} ({valor_diesel}) + {nome_aditivo} ({valor_aditivo_bruto})")
             except Exception as e_calc:
                 logger(f"ERRO ao calcular litros do aditivo para valor '{valor_aditivo_bruto}': {e_calc}")
+                erro_aditivo = valor_aditivo_bruto
         
         idx_litros = col_map.get('litros', 5)
         litros_diesel = str(row_data[idx_litros]).replace('L', '').replace('"', '').strip().replace(',', '.')
@@ -190,50 +300,214 @@ def _extrair_transacao(row_data, col_map, logger):
             'litros': litros_diesel,
             'aditivo': aditivo_info
         }
+        if erro_aditivo is not None:
+            # Sinaliza para a validação: o aditivo existe, mas não pôde ser interpretado
+            transacao['erro_aditivo'] = erro_aditivo
         return transacao
     except Exception as e:
         logger(f"AVISO: Ignorando linha (provavelmente cabeçalho/total ou erro). Linha: {row_data}. Erro: {e}")
         return None
 
+# --- Extração vetorizada da tabela ---
+
+# Linhas da tabela convertidas de uma vez por _extrair_transacoes_bloco
+_TAMANHO_BLOCO_TABELA = 2000
+# Formatos de data que o caminho vetorizado reconhece (os demais vão para _extrair_transacao)
+_PADRAO_DATA_ISO = r'^\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}:\d{2}(?:\.\d+)?)?$'
+_PADRAO_DATA_BARRAS = r'^\d{2}/\d{2}/\d{4}$'
+_PADRAO_NUMERO = r'^(?:\d+\.?\d*|\.\d+)$'
+# Limites de dígitos garantem que int(float(x)) seja a própria parte inteira
+_PADRAO_HODOMETRO = r'^(\d{1,9})(?:\.\d{0,6})?$'
+
+def _tabela_vetorizavel(col_map, largura):
+    """ O caminho vetorizado só vale quando todas as colunas usadas existem nas linhas. """
+    if not all(k in col_map for k in ('produto_nome', 'valor_total', 'hodometro_abastecimento')):
+        return False
+    indices = (col_map.get('data', 0), col_map['produto_nome'], col_map['valor_total'],
+               col_map['hodometro_abastecimento'], col_map.get('litros', 5))
+    return max(indices) < largura
+
+def _converter_datas(datas):
+    """
+    Converte a coluna de datas como pd.to_datetime faria célula a célula:
+    texto ISO (datas vindas do Excel) e dd/mm/aaaa, que o pandas lê como
+    mês/dia e só inverte quando o mês seria inválido. Os demais ficam NaT.
+    """
+    iso = datas.where(datas.str.match(_PADRAO_DATA_ISO))
+    barras = datas.where(datas.str.match(_PADRAO_DATA_BARRAS))
+    convertidas = pd.to_datetime(iso, format='ISO8601', errors='coerce')
+    mes_dia = pd.to_datetime(barras, format='%m/%d/%Y', errors='coerce')
+    dia_mes = pd.to_datetime(barras, format='%d/%m/%Y', errors='coerce')
+    return convertidas.fillna(mes_dia).fillna(dia_mes)
+
+def _extrair_transacoes_bloco(linhas, col_map, logger):
+    """
+    Equivalente vetorizado de _extrair_transacao para um bloco de linhas da
+    tabela: datas, produto dividido e números são convertidos por coluna.
+    Linhas fora do padrão comum (datas em outro formato, células vazias,
+    valores malformados) passam pelo _extrair_transacao, de modo que o
+    resultado e o log sejam exatamente os mesmos.
+    """
+    def coluna(indice):
+        # str(célula) como no caminho linha a linha (NaN vira 'nan')
+        return pd.Series([c if isinstance(c, str) else str(c) for c in (l[indice] for l in linhas)], dtype=object)
+
+    datas = _converter_datas(coluna(col_map.get('data', 0)).str.strip())
+    datas_formatadas = datas.dt.strftime('%d/%m/%Y')
+
+    produtos = coluna(col_map['produto_nome'])
+    partes = produtos.str.extract(_REGEX_PRODUTO_DIVIDIDO)
+    dividido = partes[0].notna()
+    valor_diesel = partes[1].str.strip().str.replace(',', '.', regex=False)
+    valor_aditivo = partes[3].str.strip().str.replace(',', '.', regex=False)
+    aditivo_numerico = valor_aditivo.str.match(_PADRAO_NUMERO, na=False)
+    litros_aditivo = np.ceil(valor_aditivo.where(aditivo_numerico, '0').astype(float) / 40)
+    aditivo_valido = aditivo_numerico & np.isfinite(litros_aditivo) & (litros_aditivo < 1e15)
+    litros_aditivo = litros_aditivo.where(aditivo_valido, 0).astype('int64').astype(str) + "00"
+
+    produto_nome = partes[0].str.strip().where(dividido, produtos.str.strip())
+    valor_total = valor_diesel.where(
+        dividido, coluna(col_map['valor_total']).str.strip().str.replace(',', '.', regex=False)
+    )
+    litros = (coluna(col_map.get('litros', 5)).str.replace('L', '', regex=False)
+              .str.replace('"', '', regex=False).str.strip().str.replace(',', '.', regex=False))
+
+    hodometros = coluna(col_map['hodometro_abastecimento']).str.extract(_PADRAO_HODOMETRO)[0]
+    hodometro_valido = hodometros.notna()
+    hodometros = hodometros.where(hodometro_valido, '0').astype('int64').astype(str)
+
+    rapida = (datas.notna() & hodometro_valido & (~dividido | aditivo_valido)).tolist()
+
+    transacoes = []
+    colunas = zip(rapida, datas_formatadas.tolist(), hodometros.tolist(), produto_nome.tolist(),
+                  valor_total.tolist(), litros.tolist(), dividido.tolist(), partes[2].tolist(),
+                  valor_aditivo.tolist(), litros_aditivo.tolist())
+    for k, (ok, data, hodometro, nome, valor, qtd, tem_aditivo, nome_aditivo, valor_adit, litros_adit) in enumerate(colunas):
+        if not ok:
+            transacao = _extrair_transacao(linhas[k], col_map, logger)
+            if transacao:
+                transacoes.append(transacao)
+            continue
+        aditivo_info = None
+        if tem_aditivo:
+            aditivo_info = {'valor': valor_adit, 'litros': litros_adit}
+            logger(f"Produto dividido: {nome} ({valor}) + {nome_aditivo.strip()} ({valor_adit})")
+        transacoes.append({
+            'data': data,
+            'hodometro_abastecimento': hodometro,
+            'produto_nome': nome,
+            'valor_total': valor,
+            'litros': qtd,
+            'aditivo': aditivo_info
+        })
+    return transacoes
+
+# Textos que o pd.read_excel trata como célula vazia (NaN)
+_VALORES_NA = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+    '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+}
+
+def _converter_celula(valor):
+    """ Converte o valor da célula exatamente como pd.read_excel(..., dtype=str). """
+    if valor is None:
+        return math.nan
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    valor = str(valor)
+    return math.nan if valor in _VALORES_NA else valor
+
+def _iterar_linhas_planilha(caminho_arquivo):
+    """
+    Percorre as linhas da primeira aba sob demanda (openpyxl read-only).
+    Linhas vazias só são entregues se vier alguma linha com dados depois,
+    como o pandas faz ao descartar as linhas vazias do final.
+    """
+    with open(caminho_arquivo, 'rb') as f:
+        wb = load_workbook(f, read_only=True, data_only=True, keep_links=False)
+        try:
+            ws = wb.worksheets[0]
+            largura = ws.max_column or 0
+            linhas_vazias_pendentes = 0
+            for valores in ws.iter_rows(values_only=True):
+                linha = [_converter_celula(v) for v in valores]
+                if len(linha) < largura:
+                    linha.extend([math.nan] * (largura - len(linha)))
+                if all(isinstance(c, float) for c in linha):
+                    linhas_vazias_pendentes += 1
+                    continue
+                for _ in range(linhas_vazias_pendentes):
+                    yield (math.nan,) * len(linha)
+                linhas_vazias_pendentes = 0
+                yield tuple(linha)
+        finally:
+            wb.close()
+
+def _iterar_dados_planilha(caminho_arquivo, logger):
+    """
+    Gera ('cabecalho', chave, valor) para cada dado do cabeçalho e
+    ('transacao', transacao) para cada linha da tabela, parando na linha
+    'TOTAL' sem ler o restante da planilha.
+    """
+    chaves_cabecalho_encontradas = set()
+    col_map = None
+    vetorizar = None
+    bloco = []
+
+    for row in _iterar_linhas_planilha(caminho_arquivo):
+        if col_map is None:
+            for i, cell_value in enumerate(row):
+                chave_encontrada = _extrair_valor_busca(cell_value, MAP_CHAVES_BUSCA_CABECALHO)
+                if chave_encontrada and chave_encontrada not in chaves_cabecalho_encontradas:
+                    valor = row[i+1] if (i + 1) < len(row) else None
+                    if valor and not pd.isna(valor) and str(valor).strip():
+                        logger(f"Dado encontrado: '{chave_encontrada}' = {valor}")
+                        chaves_cabecalho_encontradas.add(chave_encontrada)
+                        yield 'cabecalho', chave_encontrada, str(valor).strip()
+                
+                if str(cell_value).strip().upper() == 'DATA':
+                    col_map = _mapear_colunas_tabela(row, logger)
+                    break
+            continue
+
+        if vetorizar is None:
+            # As linhas têm a mesma largura: basta decidir uma vez
+            vetorizar = bool(col_map) and _tabela_vetorizavel(col_map, len(row))
+        if vetorizar:
+            # A linha 'TOTAL' encerra a tabela; as anteriores são convertidas em bloco
+            if 'TOTAL' in str(row[col_map.get('valor_total', 4) - 1]).strip().upper():
+                for transacao in _extrair_transacoes_bloco(bloco, col_map, logger):
+                    yield 'transacao', transacao
+                logger("Fim da extração de transações (linha 'TOTAL' encontrada).")
+                return
+            bloco.append(row)
+            if len(bloco) >= _TAMANHO_BLOCO_TABELA:
+                for transacao in _extrair_transacoes_bloco(bloco, col_map, logger):
+                    yield 'transacao', transacao
+                bloco = []
+        else:
+            transacao = _extrair_transacao(row, col_map, logger)
+            if transacao:
+                yield 'transacao', transacao
+            elif col_map and 'TOTAL' in str(row[col_map.get('valor_total', 4) - 1]).strip().upper():
+                logger("Fim da extração de transações (linha 'TOTAL' encontrada).")
+                return
+
+    if bloco:
+        for transacao in _extrair_transacoes_bloco(bloco, col_map, logger):
+            yield 'transacao', transacao
+
 def extrair_dados_planilha(caminho_arquivo, logger):
     logger(f"Lendo planilha: {caminho_arquivo}...")
     try:
-        with open(caminho_arquivo, 'rb') as f:
-            df = pd.read_excel(f, header=None, engine='openpyxl', dtype=str)
-        
         dados_cabecalho = {}
         lista_transacoes = []
-        chaves_cabecalho_encontradas = set()
-        chaves_cabecalho_necessarias = set(MAP_CHAVES_BUSCA_CABECALHO.keys())
-        idx_tabela_header = -1
-        col_map = {}
-
-        for idx, row in enumerate(df.itertuples(index=False, name=None)):
-            if idx_tabela_header == -1:
-                is_row_tabela_header = False
-                for i, cell_value in enumerate(row):
-                    chave_encontrada = _extrair_valor_busca(cell_value, MAP_CHAVES_BUSCA_CABECALHO)
-                    if chave_encontrada and chave_encontrada not in chaves_cabecalho_encontradas:
-                        valor = row[i+1] if (i + 1) < len(row) else None
-                        if valor and not pd.isna(valor) and str(valor).strip():
-                            logger(f"Dado encontrado: '{chave_encontrada}' = {valor}")
-                            dados_cabecalho[chave_encontrada] = str(valor).strip()
-                            chaves_cabecalho_encontradas.add(chave_encontrada)
-                    
-                    if str(cell_value).strip().upper() == 'DATA':
-                        idx_tabela_header = idx
-                        col_map = _mapear_colunas_tabela(row, logger)
-                        is_row_tabela_header = True
-                        break
-                if is_row_tabela_header:
-                    continue
+
+        for evento in _iterar_dados_planilha(caminho_arquivo, logger):
+            if evento[0] == 'cabecalho':
+                dados_cabecalho[evento[1]] = evento[2]
             else:
-                transacao = _extrair_transacao(row, col_map, logger)
-                if transacao:
-                    lista_transacoes.append(transacao)
-                elif col_map and 'TOTAL' in str(row[col_map.get('valor_total', 4) - 1]).strip().upper():
-                    logger("Fim da extração de transações (linha 'TOTAL' encontrada).")
-                    break
+                lista_transacoes.append(evento[1])
             
         veiculo_completo = dados_cabecalho.get('veiculo', '')
         if veiculo_completo and ' ' in veiculo_completo:
@@ -274,15 +548,28 @@ def extrair_dados_planilha(caminho_arquivo, logger):
 
 # --- Funções de Navegação ---
 
-def iniciar_e_logar(url, logger, callback_pausa_login):
+def criar_driver(logger=print):
+    return navegador.criar_driver(logger)
+
+def iniciar_e_logar(url, logger, callback_pausa_login, sessao_salva=None):
+    """
+    Abre o navegador e faz o login. Com sessao_salva (sessao.ArmazemSessao),
+    tenta antes restaurar a sessão da execução anterior e só pausa para o
+    login manual se ela tiver expirado; após o login a sessão é salva.
+    """
     logger("Iniciando automação com Selenium...")
     driver = None
     try:
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service)
-        driver.get(url)
-        
-        callback_pausa_login() 
+        driver = criar_driver(logger)
+        if sessao_salva and sessao_salva.restaurar(driver, logger):
+            logger("Sessão anterior restaurada: login manual dispensado.")
+        else:
+            driver.get(url)
+
+            callback_pausa_login()
+
+            if sessao_salva:
+                sessao_salva.salvar(driver, logger)
         
         logger("Continuando automação...")
         wait = WebDriverWait(driver, 30)
@@ -320,54 +607,96 @@ def navegar_ate_formulario(driver, wait, logger):
         logger(f"ERRO CRÍTICO ao navegar para o formulário: {e}")
         return False
 
+def garantir_formulario(driver, wait, logger, recarregar=False):
+    """
+    Garante que o driver esteja no formulário de inclusão, navegando pelos
+    menus apenas quando ele não estiver aberto no contexto atual.
+    Com recarregar=True, reabre o formulário vazio mesmo que ele esteja aberto.
+    """
+    if not recarregar and driver.find_elements(*LOCATORS['cliente_codigo']):
+        return True
+
+    # O formulário será trocado: os elementos em cache deixam de valer
+    localizadores.invalidar(driver)
+
+    # Se o frame 'content' já tem o frame aninhado do CONTROLLER, os menus
+    # foram percorridos antes: recarrega a página inicial para recomeçar
+    driver.switch_to.default_content()
+    ja_navegou = recarregar
+    frames_content = [] if recarregar else driver.find_elements(By.NAME, "content")
+    if frames_content:
+        driver.switch_to.frame(frames_content[0])
+        ja_navegou = bool(driver.find_elements(By.NAME, "content"))
+        driver.switch_to.default_content()
+    if ja_navegou:
+        logger("Recarregando a página inicial do portal...")
+        driver.get(driver.current_url)
+
+    return navegar_ate_formulario(driver, wait, logger)
+
 # --- Função Principal de Preenchimento ---
 
+# Campos do formulário principal localizados de uma vez no início de cada registro
+_CHAVES_FORMULARIO = (
+    'cliente_codigo', 'contrato_informe', 'motorista_nome', 'motorista_matricula', 'destino',
+    'data', 'hora', 'hodometro_abastecimento', 'valor_total', 'litros', 'select_produto', 'btn_incluir_novo',
+)
+_CHAVES_LINHA_PRODUTO = ('select_produto', 'valor_total', 'litros')
+
+def _digitar(campos, chave, valor, indice=0):
+    """ Seleciona o conteúdo do campo e digita o valor (refaz tudo se o campo ficou obsoleto). """
+    def acao(elemento):
+        elemento.send_keys(Keys.CONTROL, "a")
+        elemento.send_keys(valor)
+    campos.usar(chave, acao, indice)
+
+def _selecionar(driver, campos, chave, valor, indice=0):
+    campos.usar(chave, lambda elemento: catalogo_produtos.definir_valor(driver, elemento, valor), indice)
+
+def valores_produto(driver, dados_combinados, logger):
+    """
+    Valores das opções de produto do registro: (produto principal, aditivo ou
+    None), pelo catálogo de opções do formulário aberto.
+    """
+    catalogo = catalogo_produtos.catalogo
+    catalogo.carregar(driver, LOCATORS['select_produto'][1], logger)
+    principal = catalogo.valor(dados_combinados.get('produto_nome'), logger)
+    aditivo = catalogo.valor_aditivo() if dados_combinados.get('aditivo') else None
+    return principal, aditivo
+
 def preencher_um_registro(driver, wait, dados_combinados, logger):
     try:
         wait.until(EC.presence_of_element_located(LOCATORS['cliente_codigo']))
+        campos = localizadores.cache(driver, LOCATORS)
+        campos.carregar(_CHAVES_FORMULARIO)
+        valor_produto, valor_aditivo = valores_produto(driver, dados_combinados, logger)
         
         logger("Preenchendo campos fixos (Cliente/Contrato)...")
-        driver.find_element(*LOCATORS['cliente_codigo']).send_keys(Keys.CONTROL, "a")
-        driver.find_element(*LOCATORS['cliente_codigo']).send_keys("3359")
-        driver.find_element(*LOCATORS['contrato_informe']).send_keys(Keys.CONTROL, "a")
-        driver.find_element(*LOCATORS['contrato_informe']).send_keys("00101033590125")
+        _digitar(campos, 'cliente_codigo', "3359")
+        _digitar(campos, 'contrato_informe', "00101033590125")
 
         logger("Preenchendo dados do motorista...")
-        driver.find_element(*LOCATORS['motorista_nome']).send_keys(Keys.CONTROL, "a")
-        driver.find_element(*LOCATORS['motorista_nome']).send_keys(dados_combinados['nome'])
-        driver.find_element(*LOCATORS['motorista_matricula']).send_keys(Keys.CONTROL, "a")
-        driver.find_element(*LOCATORS['motorista_matricula']).send_keys(dados_combinados['matricula'])
+        _digitar(campos, 'motorista_nome', dados_combinados['nome'])
+        _digitar(campos, 'motorista_matricula', dados_combinados['matricula'])
         
-        # --- Lógica do Popup (chamando sua função) ---
+        # --- Lógica do Popup (ou cache da placa) ---
         placa = dados_combinados['placa']
-        _buscar_placa_popup(driver, placa, logger) 
+        resolver_placa(driver, placa, logger)
         
-        driver.find_element(*LOCATORS['destino']).send_keys(Keys.CONTROL, "a")
-        driver.find_element(*LOCATORS['destino']).send_keys(dados_combinados['destino'])
+        _digitar(campos, 'destino', dados_combinados['destino'])
 
         # --- Dados da Transação (Principal - Diesel) ---
         logger("Preenchendo dados da transação (data, hora, hodômetro)...")
         
-        driver.find_element(*LOCATORS['data']).send_keys(Keys.CONTROL, "a")
-        driver.find_element(*LOCATORS['data']).send_keys(dados_combinados['data'])
-        driver.find_element(*LOCATORS['hora']).send_keys(Keys.CONTROL, "a")
-        driver.find_element(*LOCATORS['hora']).send_keys(dados_combinados['hora_para_preencher'])
-        driver.find_element(*LOCATORS['hodometro_abastecimento']).send_keys(Keys.CONTROL, "a")
-        driver.find_element(*LOCATORS['hodometro_abastecimento']).send_keys(dados_combinados['hodometro_abastecimento'])
-
-        logger("Preenchendo dados do produto principal (Diesel)...")
-        
-        campo_valor_diesel = driver.find_elements(*LOCATORS['valor_total'])[0]
-        campo_valor_diesel.send_keys(Keys.CONTROL, "a")
-        campo_valor_diesel.send_keys(dados_combinados['valor_total'])
-        
-        campo_litros_diesel = driver.find_elements(*LOCATORS['litros'])[0]
-        campo_litros_diesel.send_keys(Keys.CONTROL, "a")
-        campo_litros_diesel.send_keys(dados_combinados['litros'])
+        _digitar(campos, 'data', dados_combinados['data'])
+        _digitar(campos, 'hora', dados_combinados['hora_para_preencher'])
+        _digitar(campos, 'hodometro_abastecimento', dados_combinados['hodometro_abastecimento'])
 
-        elemento_select_diesel = driver.find_elements(*LOCATORS['select_produto'])[0]
-        seletor_diesel = Select(elemento_select_diesel)
-        seletor_diesel.select_by_value("72") # Padrão Diesel S10
+        logger(f"Preenchendo dados do produto principal ({dados_combinados.get('produto_nome')})...")
+        
+        _digitar(campos, 'valor_total', dados_combinados['valor_total'])
+        _digitar(campos, 'litros', dados_combinados['litros'])
+        _selecionar(driver, campos, 'select_produto', valor_produto)
         
         # --- Lógica do Aditivo (se existir) ---
         if 'aditivo' in dados_combinados and dados_combinados['aditivo']:
@@ -375,28 +704,20 @@ def preencher_um_registro(driver, wait, dados_combinados, logger):
             logger(f"Detectado Aditivo/Arla. Preenchendo: {aditivo_dados}")
             
             try:
-                driver.find_element(*LOCATORS['btn_incluir_novo']).click()
+                campos.usar('btn_incluir_novo', lambda botao: botao.click())
                 
-                wait.until(
-                    lambda d: len(d.find_elements(*LOCATORS['select_produto'])) > 1,
-                    "Timeout: O segundo campo de produto (Arla) não apareceu."
+                esperas.aguardar_quantidade(
+                    driver, LOCATORS['select_produto'], 2, timeout=esperas.TEMPO_MAXIMO_PADRAO,
+                    mensagem="Timeout: O segundo campo de produto (Arla) não apareceu.", nome="select_aditivo"
                 )
                 
-                todos_selects_produto = driver.find_elements(*LOCATORS['select_produto'])
-                todos_campos_valor = driver.find_elements(*LOCATORS['valor_total'])
-                todos_campos_litros = driver.find_elements(*LOCATORS['litros'])
+                # A linha nova muda as listas de produto, valor e litros: uma consulta para as três
+                campos.invalidar(*_CHAVES_LINHA_PRODUTO)
+                campos.carregar(_CHAVES_LINHA_PRODUTO)
 
-                select_arla_elem = todos_selects_produto[1]
-                seletor_arla = Select(select_arla_elem)
-                seletor_arla.select_by_value("85") # 85 = ÓLEO ARLA 32
-                
-                valor_arla_elem = todos_campos_valor[1]
-                valor_arla_elem.send_keys(Keys.CONTROL, "a")
-                valor_arla_elem.send_keys(aditivo_dados['valor'])
-                
-                litros_arla_elem = todos_campos_litros[1]
-                litros_arla_elem.send_keys(Keys.CONTROL, "a")
-                litros_arla_elem.send_keys(aditivo_dados['litros'])
+                _selecionar(driver, campos, 'select_produto', valor_aditivo, indice=1)
+                _digitar(campos, 'valor_total', aditivo_dados['valor'], indice=1)
+                _digitar(campos, 'litros', aditivo_dados['litros'], indice=1)
                 
                 logger("Campos do aditivo preenchidos com sucesso.")
             
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+# Estados de um registro no diário
+PENDENTE = 'pendente'      # Na fila; nada foi enviado ao portal
+ENVIADO = 'enviado'        # Envio disparado; o portal pode ou não ter gravado
+CONFIRMADO = 'confirmado'  # O portal respondeu e o formulário voltou limpo
+
+# Campos gerados na leitura da planilha que mudam a cada execução
+_CAMPOS_VOLATEIS = ('hora_para_preencher',)
+
+def chave_registro(dados_completos):
+    """
+    Hash estável de um registro (cabeçalho + transação). A mesma linha da mesma
+    planilha gera a mesma chave em qualquer execução.
+    """
+    campos = {k: v for k, v in dados_completos.items() if k not in _CAMPOS_VOLATEIS}
+    texto = json.dumps(campos, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+class DiarioEnvios:
+    """
+    Diário local (SQLite) do estado de cada registro enviado ao portal.
+    Cada mudança de estado é gravada em uma transação própria com
+    synchronous=FULL, ou seja, vai para o disco antes da automação seguir.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=FULL")
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS envios (
+                chave TEXT PRIMARY KEY,
+                arquivo TEXT,
+                indice INTEGER,
+                estado TEXT NOT NULL,
+                detalhe TEXT,
+                atualizado_em TEXT NOT NULL
+            )
+        """)
+
+    def estado(self, chave):
+        with self._lock:
+            linha = self._conexao.execute("SELECT estado FROM envios WHERE chave = ?", (chave,)).fetchone()
+        return linha[0] if linha else None
+
+    def marcar(self, chave, estado, arquivo=None, indice=None, detalhe=None):
+        """ Grava o novo estado do registro (mantém arquivo/índice já conhecidos). """
+        with self._lock:
+            self._conexao.execute("""
+                INSERT INTO envios (chave, arquivo, indice, estado, detalhe, atualizado_em)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(chave) DO UPDATE SET
+                    arquivo = COALESCE(excluded.arquivo, envios.arquivo),
+                    indice = COALESCE(excluded.indice, envios.indice),
+                    estado = excluded.estado,
+                    detalhe = excluded.detalhe,
+                    atualizado_em = excluded.atualizado_em
+            """, (chave, arquivo, indice, estado, detalhe, datetime.now().isoformat(timespec='seconds')))
+
+    def filtrar_pendentes(self, dados_cabecalho, lista_transacoes, arquivo, logger):
+        """
+        Devolve as transações que ainda precisam ser enviadas. Registros
+        confirmados são pulados; registros 'enviado' (execução interrompida
+        logo após o envio) também, para não duplicar, com aviso para conferência.
+        """
+        restantes = []
+        for i, transacao in enumerate(lista_transacoes):
+            chave = chave_registro({**dados_cabecalho, **transacao})
+            estado = self.estado(chave)
+            if estado == CONFIRMADO:
+                logger(f"Registro {i+1} já confirmado em execução anterior. Pulando.")
+                continue
+            if estado == ENVIADO:
+                logger(f"AVISO: Registro {i+1} foi enviado em execução interrompida, sem confirmação. "
+                       f"Pulando para não duplicar; confira no portal ({transacao.get('data')}).")
+                continue
+            self.marcar(chave, PENDENTE, arquivo, i)
+            restantes.append(transacao)
+
+        puladas = len(lista_transacoes) - len(restantes)
+        if puladas:
+            logger(f"Diário: {puladas} registro(s) pulados, {len(restantes)} a enviar.")
+        return restantes
+
+    def fechar(self):
+        with self._lock:
+            self._conexao.close()
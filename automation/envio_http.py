@@ -0,0 +1,227 @@
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import automation.core_functions as core
+import automation.preenchimento_js as preenchimento_js
+import automation.catalogo_produtos as catalogo_produtos
+import automation.diario as diario_envios
+import automation.telemetria as telemetria
+import automation.governador as governador
+from automation.importacao_tardia import ImportacaoTardia
+
+requests = ImportacaoTardia('requests')
+HTTPAdapter = ImportacaoTardia('requests.adapters', 'HTTPAdapter')
+
+# Serializa o formulário principal como o navegador faria no envio
+_JS_CAPTURAR_FORMULARIO = """
+var botao = document.querySelector('button.gravar');
+var form = botao ? botao.form : document.forms[0];
+if (!form) { return null; }
+var contagem = {}, campos = [];
+for (var i = 0; i < form.elements.length; i++) {
+    var el = form.elements[i];
+    if (!el.name || el.disabled || el.tagName === 'BUTTON') { continue; }
+    if ((el.type === 'checkbox' || el.type === 'radio') && !el.checked) { continue; }
+    var indice = contagem[el.name] || 0;
+    contagem[el.name] = indice + 1;
+    campos.push([el.name, indice, el.value]);
+}
+return {
+    action: form.action,
+    metodo: (form.getAttribute('method') || 'get').toLowerCase(),
+    url: location.href,
+    agente: navigator.userAgent,
+    campos: campos
+};
+"""
+
+# Indícios de que o portal recusou o envio ou a sessão expirou. O padrão foi tirado do
+# portal simulado (benchmarks/portal_simulado.py); para o portal real, PADRAO_ERRO_PORTAL no .env
+PADRAO_ERRO = r'class="erro"|ORA-\d{5}|type="password"'
+
+_CAMPOS_PRODUTO = ('select_produto', 'litros', 'valor_total')
+
+def _nome(chave):
+    return core.LOCATORS[chave][1]
+
+class ModeloFormulario:
+    """ Ação, método e campos do formulário de inclusão, capturados do navegador. """
+
+    def __init__(self, dados_js):
+        self.action = dados_js['action']
+        self.metodo = dados_js['metodo']
+        self.url = dados_js['url']
+        self.agente = dados_js['agente']
+        self.campos = dados_js['campos']
+
+    def montar_payload(self, dados_combinados, logger):
+        """
+        Gera a lista (nome, valor) do envio: os campos 'p_*' do LOCATORS recebem
+        os dados do registro e os demais (ocultos, placa) mantêm o valor capturado.
+        As linhas de produto são recriadas conforme o registro tenha aditivo ou não.
+        """
+        valores = {
+            _nome('cliente_codigo'): "3359",
+            _nome('contrato_informe'): "00101033590125",
+            _nome('motorista_nome'): dados_combinados['nome'],
+            _nome('motorista_matricula'): dados_combinados['matricula'],
+            _nome('destino'): dados_combinados['destino'],
+            _nome('data'): dados_combinados['data'],
+            _nome('hora'): dados_combinados['hora_para_preencher'],
+            _nome('hodometro_abastecimento'): dados_combinados['hodometro_abastecimento'],
+        }
+        catalogo = catalogo_produtos.catalogo
+        linhas_produto = [{
+            _nome('select_produto'): catalogo.valor(dados_combinados.get('produto_nome'), logger),
+            _nome('valor_total'): dados_combinados['valor_total'],
+            _nome('litros'): dados_combinados['litros'],
+        }]
+        aditivo = dados_combinados.get('aditivo')
+        if aditivo:
+            linhas_produto.append({
+                _nome('select_produto'): catalogo.valor_aditivo(),
+                _nome('valor_total'): aditivo['valor'],
+                _nome('litros'): aditivo['litros'],
+            })
+
+        nomes_produto = {_nome(chave) for chave in _CAMPOS_PRODUTO}
+        ordem_produto = [nome for nome, indice, _ in self.campos if nome in nomes_produto and indice == 0]
+
+        payload = []
+        produtos_incluidos = False
+        for nome, indice, valor in self.campos:
+            if nome in nomes_produto:
+                if not produtos_incluidos:
+                    for linha in linhas_produto:
+                        payload.extend((n, linha[n]) for n in ordem_produto)
+                    produtos_incluidos = True
+                continue
+            payload.append((nome, valores[nome] if indice == 0 and nome in valores else valor))
+        return payload
+
+def capturar_modelo(driver, wait, dados_primeiro_registro, logger):
+    """
+    Preenche o primeiro registro no navegador (inclusive a placa pelo popup),
+    sem enviar, e captura o formulário resultante. Assim os campos ocultos que
+    o JavaScript do portal calcula já vêm preenchidos no modelo.
+    """
+    if not preenchimento_js.preencher_um_registro_js(driver, wait, dados_primeiro_registro, logger):
+        raise Exception("Falha ao preencher o formulário modelo para o envio HTTP.")
+    dados_js = driver.execute_script(_JS_CAPTURAR_FORMULARIO)
+    if not dados_js:
+        raise Exception("Formulário de inclusão não encontrado para captura.")
+    modelo = ModeloFormulario(dados_js)
+    logger(f"Formulário capturado: {modelo.metodo.upper()} {modelo.action} ({len(modelo.campos)} campos).")
+    return modelo
+
+def criar_sessao_http(driver, modelo, tamanho_pool):
+    """ Cliente HTTP com keep-alive que reaproveita os cookies do navegador logado. """
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, tamanho_pool))
+    sessao.mount("http://", adaptador)
+    sessao.mount("https://", adaptador)
+    sessao.headers.update({'User-Agent': modelo.agente, 'Referer': modelo.url})
+    for cookie in driver.get_cookies():
+        sessao.cookies.set(cookie['name'], cookie['value'],
+                           domain=cookie.get('domain', ''), path=cookie.get('path', '/'))
+    return sessao
+
+class RespostaRecusada(Exception):
+    """ O portal respondeu ao envio, mas não aceitou o registro. """
+
+def erro_na_pagina(html):
+    """ Mensagem de erro se a página devolvida pelo portal indica recusa ou sessão expirada; senão None. """
+    erro = re.search(os.getenv("PADRAO_ERRO_PORTAL") or PADRAO_ERRO, html, re.IGNORECASE)
+    if erro:
+        return f"O portal indicou erro na resposta ('{erro.group(0)}')."
+    return None
+
+def validar_resposta(resposta, marcador_sucesso=None):
+    """
+    Confere se o portal aceitou o registro. Retorna a mensagem de erro ou None.
+    Sem marcador de sucesso configurado, espera o formulário de inclusão limpo
+    de volta (o mesmo sinal usado no modo navegador).
+    """
+    if resposta.status_code != 200:
+        return f"Resposta HTTP {resposta.status_code}."
+    if 'login' in resposta.url.lower():
+        return "Sessão expirada (redirecionado para o login)."
+    texto = resposta.text
+    erro = erro_na_pagina(texto)
+    if erro:
+        return erro
+    if marcador_sucesso:
+        if marcador_sucesso not in texto:
+            return f"Marcador de sucesso '{marcador_sucesso}' ausente na resposta."
+    elif f'name="{_nome("cliente_codigo")}"' not in texto:
+        return "A resposta não trouxe o formulário de inclusão de volta."
+    return None
+
+def enviar_registro_http(sessao, modelo, dados_combinados, logger, timeout=30):
+    """ Envia um registro e valida a resposta. Lança exceção em caso de falha. """
+    payload = modelo.montar_payload(dados_combinados, logger)
+    if modelo.metodo == 'post':
+        resposta = sessao.post(modelo.action, data=payload, timeout=timeout)
+    else:
+        resposta = sessao.get(modelo.action, params=payload, timeout=timeout)
+    erro = validar_resposta(resposta, os.getenv("HTTP_MARCADOR_SUCESSO"))
+    if erro:
+        raise RespostaRecusada(erro)
+
+def executar_envio_http(driver, wait, dados_cabecalho, lista_transacoes, num_workers, logger, diario=None,
+                        arquivo=None):
+    """
+    Modo de envio direto: o Selenium só faz o login e a busca da placa;
+    os registros são enviados por HTTP (num_workers envios simultâneos).
+
+    Retorna um dicionário {indice_transacao: None (sucesso) ou Exception}.
+    """
+    with telemetria.fase('captura_modelo'):
+        modelo = capturar_modelo(driver, wait, {**dados_cabecalho, **lista_transacoes[0]}, logger)
+    # Resolve os produtos aqui (avisos no log); os envios usam o resultado memorizado
+    for transacao in lista_transacoes:
+        catalogo_produtos.catalogo.valor(transacao.get('produto_nome'), logger)
+    sessao = criar_sessao_http(driver, modelo, num_workers)
+    total = len(lista_transacoes)
+    resultados = {}
+    lock = threading.Lock()
+
+    def enviar(i, transacao):
+        dados_completos = {**dados_cabecalho, **transacao}
+        chave = diario_envios.chave_registro(dados_completos) if diario else None
+        try:
+            with governador.vaga():
+                inicio = time.perf_counter()
+                with telemetria.registro(arquivo, i + 1), telemetria.fase('envio_http'):
+                    if diario:
+                        diario.marcar(chave, diario_envios.ENVIADO)
+                    enviar_registro_http(sessao, modelo, dados_completos, logger)
+                duracao = time.perf_counter() - inicio
+            governador.registrar('envio', duracao)
+            if diario:
+                diario.marcar(chave, diario_envios.CONFIRMADO)
+            erro = None
+            logger(f"Registro {i+1} de {total} enviado via HTTP em {duracao * 1000:.0f} ms.")
+        except Exception as e:
+            erro = e
+            # Só resposta recusada e falha de rede indicam portal sobrecarregado
+            if isinstance(e, (RespostaRecusada, requests.RequestException)):
+                governador.registrar_erro('envio')
+            logger(f"ERRO no registro {i+1} (HTTP): {e}")
+            # Resposta recusada pelo portal: nada foi gravado, pode ser reenviado.
+            # Falha de rede deixa o registro como 'enviado' (resultado incerto).
+            if diario and not isinstance(e, requests.RequestException):
+                diario.marcar(chave, diario_envios.PENDENTE, detalhe=str(e))
+        with lock:
+            resultados[i] = erro
+
+    logger(f"Modo HTTP: enviando {total} registros ({max(1, num_workers)} simultâneos)...")
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, num_workers)) as executor:
+            for i, transacao in enumerate(lista_transacoes):
+                executor.submit(enviar, i, transacao)
+    finally:
+        sessao.close()
+    return resultados
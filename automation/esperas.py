@@ -0,0 +1,208 @@
+import threading
+import time
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from automation.importacao_tardia import ImportacaoTardia
+import automation.navegador as navegador
+
+WebDriverWait = ImportacaoTardia('selenium.webdriver.support.ui', 'WebDriverWait')
+
+# Limite superior padrão (s) das esperas por prontidão
+TEMPO_MAXIMO_PADRAO = 30
+
+# arguments[0]: carregamento 'eager' (DOM pronto basta; imagens e fontes podem continuar chegando)
+_JS_REDE_OCIOSA = """
+var pronto = document.readyState === 'complete' || (arguments[0] && document.readyState === 'interactive');
+return pronto && (!window.jQuery || window.jQuery.active === 0);
+"""
+
+_JS_MODAL_ESTAVEL = """
+var visivelEsperado = arguments[0];
+var lov = document.getElementById('lov');
+if (!lov) { return !visivelEsperado; }
+var estilo = window.getComputedStyle(lov);
+var visivel = estilo.display !== 'none' && estilo.visibility !== 'hidden';
+var animando = window.jQuery ? window.jQuery(lov).is(':animated') : false;
+return visivel === visivelEsperado && !animando && (!visivel || estilo.opacity === '1');
+"""
+
+# Espera dentro da página: resolve assim que a condição fica verdadeira.
+# O MutationObserver reage a mudanças no DOM; a verificação periódica curta
+# cobre o que não altera o DOM (readyState, jQuery.active, animações).
+# %s é o corpo de uma função que recebe os argumentos extras e retorna bool.
+_JS_AGUARDAR_NA_PAGINA = """
+var concluir = arguments[arguments.length - 1];
+var limite = arguments[0];
+var args = Array.prototype.slice.call(arguments, 1, arguments.length - 1);
+function condicao() { %s }
+function verificar() { try { return !!condicao.apply(null, args); } catch (e) { return false; } }
+if (verificar()) { concluir(true); return; }
+var terminado = false, observador = null, relogio = null, temporizador = null;
+function finalizar(resultado) {
+    if (terminado) { return; }
+    terminado = true;
+    if (observador) { observador.disconnect(); }
+    clearInterval(relogio);
+    clearTimeout(temporizador);
+    concluir(resultado);
+}
+if (window.MutationObserver) {
+    observador = new MutationObserver(function () { if (verificar()) { finalizar(true); } });
+    observador.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+relogio = setInterval(function () { if (verificar()) { finalizar(true); } }, 25);
+temporizador = setTimeout(function () { finalizar(verificar()); }, limite);
+"""
+
+_JS_QUANTIDADE = "return document.querySelectorAll(arguments[0]).length >= arguments[1];"
+
+_JS_VISIVEL = """
+var el = document.querySelector(arguments[0]);
+if (!el) { return false; }
+var estilo = window.getComputedStyle(el);
+return estilo.display !== 'none' && estilo.visibility !== 'hidden' && el.getClientRects().length > 0;
+"""
+
+# Cada chamada assíncrona espera no máximo isto (abaixo do script timeout padrão de 30 s do Selenium)
+_FATIA_NA_PAGINA = 10.0
+
+# Localizadores convertidos para seletor CSS (querySelectorAll devolve também IDs duplicados)
+_PARA_CSS = {
+    By.ID: '[id="{}"]',
+    By.NAME: '[name="{}"]',
+    By.CSS_SELECTOR: '{}',
+}
+
+class RegistroEsperas:
+    """ Guarda quanto tempo cada espera realmente levou (thread-safe). """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._duracoes = {}
+
+    def registrar(self, nome, segundos):
+        with self._lock:
+            self._duracoes.setdefault(nome, []).append(segundos)
+
+    def resumo(self):
+        """ Retorna {nome: (quantidade, média, máximo)}. """
+        with self._lock:
+            return {
+                nome: (len(valores), sum(valores) / len(valores), max(valores))
+                for nome, valores in self._duracoes.items()
+            }
+
+    def limpar(self):
+        with self._lock:
+            self._duracoes.clear()
+
+registro = RegistroEsperas()
+
+def _medir(nome, driver, condicao, timeout, mensagem, intervalo=0.1):
+    """ Executa a espera, registra a duração e a devolve em segundos. """
+    inicio = time.perf_counter()
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=intervalo,
+                      ignored_exceptions=[StaleElementReferenceException]).until(condicao, mensagem)
+    finally:
+        duracao = time.perf_counter() - inicio
+        registro.registrar(nome, duracao)
+    return duracao
+
+def _aguardar_na_pagina(driver, condicao_js, args, timeout):
+    """
+    Espera a condição dentro da página, em fatias de até _FATIA_NA_PAGINA.
+    Retorna True quando ela fica verdadeira e False no timeout; lança
+    WebDriverException se o documento for descarregado durante a espera.
+    """
+    script = _JS_AGUARDAR_NA_PAGINA % condicao_js
+    limite = time.monotonic() + timeout
+    while True:
+        restante = limite - time.monotonic()
+        fatia = max(0.0, min(restante, _FATIA_NA_PAGINA))
+        if driver.execute_async_script(script, int(fatia * 1000), *args):
+            return True
+        if restante <= _FATIA_NA_PAGINA:
+            return False
+
+def _medir_na_pagina(nome, driver, condicao_js, args, timeout, mensagem, condicao_python):
+    """
+    Como _medir, mas a espera roda dentro da página (sem o atraso do polling).
+    Se a página for recarregada no meio da espera, continua com o polling
+    comum pelo tempo que restar. Lança TimeoutException com a mesma mensagem.
+    """
+    inicio = time.perf_counter()
+    try:
+        try:
+            pronto = _aguardar_na_pagina(driver, condicao_js, args, timeout)
+        except WebDriverException:
+            restante = timeout - (time.perf_counter() - inicio)
+            WebDriverWait(driver, max(0.0, restante), poll_frequency=0.1,
+                          ignored_exceptions=[StaleElementReferenceException]).until(condicao_python, mensagem)
+            pronto = True
+        if not pronto:
+            raise TimeoutException(mensagem or "")
+    finally:
+        duracao = time.perf_counter() - inicio
+        registro.registrar(nome, duracao)
+    return duracao
+
+def _seletor_css(localizador):
+    por, valor = localizador
+    return _PARA_CSS[por].format(valor)
+
+def aguardar_quantidade(driver, localizador, minimo, timeout=TEMPO_MAXIMO_PADRAO, mensagem=None, nome=None):
+    """ Espera existirem pelo menos 'minimo' elementos do localizador (By.ID, By.NAME ou CSS). """
+    return _medir_na_pagina(
+        nome or f"quantidade:{localizador[1]}", driver, _JS_QUANTIDADE, [_seletor_css(localizador), minimo],
+        timeout, mensagem, lambda d: len(d.find_elements(*localizador)) >= minimo,
+    )
+
+def aguardar_visivel(driver, localizador, timeout=TEMPO_MAXIMO_PADRAO, mensagem=None, nome=None):
+    """ Espera o primeiro elemento do localizador estar visível. """
+    def visivel(d):
+        elementos = d.find_elements(*localizador)
+        return bool(elementos) and elementos[0].is_displayed()
+
+    return _medir_na_pagina(nome or f"visivel:{localizador[1]}", driver, _JS_VISIVEL, [_seletor_css(localizador)],
+                            timeout, mensagem, visivel)
+
+def rede_ociosa(driver):
+    """ Documento carregado (ou só o DOM, no perfil enxuto) e nenhuma requisição AJAX (jQuery) pendente. """
+    return driver.execute_script(_JS_REDE_OCIOSA, navegador.perfil.enxuto)
+
+def aguardar_rede_ociosa(driver, timeout=TEMPO_MAXIMO_PADRAO):
+    return _medir_na_pagina("rede_ociosa", driver, _JS_REDE_OCIOSA, [navegador.perfil.enxuto], timeout,
+                            "Timeout: o portal não terminou as requisições pendentes.", rede_ociosa)
+
+def aguardar_modal(driver, visivel, timeout=TEMPO_MAXIMO_PADRAO):
+    """ Espera o modal '#lov' terminar a transição para aberto/fechado. """
+    nome = "modal_aberto" if visivel else "modal_fechado"
+    return _medir_na_pagina(nome, driver, _JS_MODAL_ESTAVEL, [visivel], timeout,
+                            f"Timeout: o modal da placa não terminou de {'abrir' if visivel else 'fechar'}.",
+                            lambda d: d.execute_script(_JS_MODAL_ESTAVEL, visivel))
+
+def aguardar_pos_envio(driver, form_antigo, timeout=TEMPO_MAXIMO_PADRAO):
+    """
+    Espera o portal processar o envio do formulário: o formulário antigo
+    fica obsoleto (página recarregada) ou o campo 'p_cd_cliente' volta vazio,
+    e não há mais requisições pendentes.
+    Retorna o tempo real da espera em segundos.
+    """
+    def pagina_pronta(d):
+        try:
+            form_antigo.is_enabled()
+            recarregou = False
+        except StaleElementReferenceException:
+            recarregou = True
+
+        campos_cliente = d.find_elements(By.NAME, 'p_cd_cliente')
+        if not campos_cliente:
+            return False
+        if not recarregou and campos_cliente[0].get_attribute('value'):
+            return False
+        return rede_ociosa(d)
+
+    return _medir("pos_envio", driver, pagina_pronta, timeout,
+                  f"Timeout: a página não ficou pronta em {timeout:.0f}s após o envio.")
+
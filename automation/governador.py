@@ -0,0 +1,214 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Latência média acima de FATOR_CONGESTAO x a linha de base indica portal sobrecarregado...
+FATOR_CONGESTAO = 2.0
+# ... desde que a diferença passe de FOLGA_MINIMA s (variações pequenas são ruído)
+FOLGA_MINIMA = 0.3
+# Peso da amostra nova na média móvel da latência
+PESO_AMOSTRA = 0.3
+# Linha de base: menor latência entre as últimas JANELA_BASE amostras de cada tipo
+JANELA_BASE = 50
+# Amostras necessárias (desde o último recuo) antes de julgar a latência de um tipo
+AMOSTRAS_MINIMAS = 3
+# Recuo: o limite de sessões cai pela metade; com uma sessão só, o intervalo dobra (mínimo INTERVALO_RECUO s)
+FATOR_RECUO = 0.5
+INTERVALO_RECUO = 0.5
+# Avanço a cada amostra boa: o intervalo cai PASSO_INTERVALO s; sem intervalo, o limite sobe ~1 sessão por janela
+PASSO_INTERVALO = 0.25
+# Situação registrada no log a cada N envios
+INTERVALO_RELATORIO = 10
+# Vazão calculada sobre os envios dos últimos JANELA_VAZAO segundos
+JANELA_VAZAO = 60.0
+
+class _Latencia:
+    """ Média móvel e linha de base das latências de um tipo de operação ('envio', 'placa'). """
+
+    def __init__(self):
+        self.media = None
+        self.amostras = 0
+        self.recentes = deque(maxlen=JANELA_BASE)
+
+    def adicionar(self, segundos):
+        self.recentes.append(segundos)
+        self.amostras += 1
+        self.media = segundos if self.media is None else PESO_AMOSTRA * segundos + (1 - PESO_AMOSTRA) * self.media
+
+    def reiniciar(self):
+        """ Após um recuo a média recomeça: só conta o que foi medido no ritmo novo. """
+        self.media = None
+        self.amostras = 0
+
+    @property
+    def base(self):
+        return min(self.recentes)
+
+    def congestionada(self):
+        if self.amostras < AMOSTRAS_MINIMAS:
+            return False
+        return self.media > FATOR_CONGESTAO * self.base and self.media - self.base > FOLGA_MINIMA
+
+class Governador:
+    """
+    Controla o ritmo dos envios pela latência do portal (AIMD): enquanto o
+    envio e a busca da placa respondem perto da linha de base, o intervalo
+    entre envios diminui aos poucos e o limite de sessões simultâneas sobe
+    até o máximo configurado; quando a latência dobra ou o portal devolve
+    erro, o limite cai pela metade e, com uma sessão só, o intervalo dobra.
+    O intervalo conta do fim de um registro ao início do próximo. Após um
+    recuo, as medições dos registros que começaram antes dele são ignoradas
+    (foram feitas sob o ritmo anterior).
+    """
+
+    ativo = True
+
+    def __init__(self, maximo, intervalo_maximo, logger=print):
+        self.maximo = max(1, maximo)
+        self.limite = float(self.maximo)
+        self.intervalo = 0.0
+        self.intervalo_maximo = intervalo_maximo
+        self.logger = logger
+        self.recuos = 0
+        self._latencias = {}
+        self._cond = threading.Condition()
+        self._ativos = 0
+        self._proximo_inicio = 0.0
+        # Cada recuo abre uma época; a vaga guarda na thread a época em que o registro começou
+        self._epoca = 0
+        self._local = threading.local()
+        self._envios = 0
+        self._inicio = time.monotonic()
+        self._concluidos = deque()
+
+    @contextmanager
+    def vaga(self):
+        """ Espera uma vaga dentro do limite de sessões e do intervalo entre envios. """
+        with self._cond:
+            while True:
+                agora = time.monotonic()
+                if self._ativos >= int(self.limite):
+                    self._cond.wait()
+                elif agora < self._proximo_inicio:
+                    self._cond.wait(self._proximo_inicio - agora)
+                else:
+                    break
+            self._ativos += 1
+            self._local.epoca = self._epoca
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._ativos -= 1
+                self._proximo_inicio = time.monotonic() + self.intervalo
+                self._cond.notify_all()
+
+    def _ritmo_anterior(self):
+        """ A medição vem de um registro iniciado antes do último recuo. """
+        return getattr(self._local, 'epoca', self._epoca) < self._epoca
+
+    def registrar(self, tipo, segundos):
+        """ Latência de uma operação concluída no portal. """
+        mensagens = []
+        with self._cond:
+            latencia = self._latencias.setdefault(tipo, _Latencia())
+            if tipo == 'envio':
+                self._envios += 1
+                self._concluidos.append(time.monotonic())
+            if not self._ritmo_anterior():
+                latencia.adicionar(segundos)
+                if latencia.congestionada():
+                    mensagens.append(self._recuar(f"{tipo} em {latencia.media:.2f}s, base {latencia.base:.2f}s"))
+                else:
+                    self._avancar()
+            if tipo == 'envio' and self._envios % INTERVALO_RELATORIO == 0:
+                mensagens.append(f"Ritmo: {self._situacao()}")
+            self._cond.notify_all()
+        for mensagem in mensagens:
+            self.logger(mensagem)
+
+    def registrar_erro(self, tipo):
+        """ Falha do portal (página de erro, resposta recusada, tempo esgotado). """
+        with self._cond:
+            if self._ritmo_anterior():
+                return
+            mensagem = self._recuar(f"erro em {tipo}")
+        self.logger(mensagem)
+
+    def _recuar(self, motivo):
+        if self.limite >= 2:
+            self.limite = max(1.0, self.limite * FATOR_RECUO)
+        else:
+            self.limite = 1.0
+            self.intervalo = min(self.intervalo_maximo, max(INTERVALO_RECUO, self.intervalo * 2))
+        self._epoca += 1
+        for latencia in self._latencias.values():
+            latencia.reiniciar()
+        self.recuos += 1
+        return f"Portal sobrecarregado ({motivo}). Reduzindo o ritmo: {self._descricao_limite()}."
+
+    def _avancar(self):
+        if self.intervalo > 0:
+            self.intervalo = max(0.0, self.intervalo - PASSO_INTERVALO)
+        elif self.limite < self.maximo:
+            self.limite = min(float(self.maximo), self.limite + 1 / self.limite)
+
+    def _descricao_limite(self):
+        return f"{int(self.limite)} de {self.maximo} sessão(ões), intervalo {self.intervalo:.2f}s"
+
+    def _vazao(self):
+        """ Registros enviados por minuto na janela recente. """
+        agora = time.monotonic()
+        while self._concluidos and self._concluidos[0] < agora - JANELA_VAZAO:
+            self._concluidos.popleft()
+        janela = min(JANELA_VAZAO, agora - self._inicio)
+        return len(self._concluidos) * 60 / janela if janela > 0 else 0.0
+
+    def _situacao(self):
+        envio = self._latencias.get('envio')
+        latencia = ""
+        if envio and envio.media is not None:
+            latencia = f" | latência do envio {envio.media:.2f}s (base {envio.base:.2f}s)"
+        return f"{self._vazao():.1f} registros/min | limite {self._descricao_limite()}{latencia}"
+
+    def situacao(self):
+        with self._cond:
+            return self._situacao()
+
+class _GovernadorNulo:
+    """ Ritmo fixo: sem espera entre envios e sem limite além do número de sessões. """
+
+    ativo = False
+    recuos = 0
+
+    @contextmanager
+    def vaga(self):
+        yield
+
+    def registrar(self, tipo, segundos):
+        pass
+
+    def registrar_erro(self, tipo):
+        pass
+
+    def situacao(self):
+        return "Ritmo adaptativo desativado."
+
+# Instância em uso pela execução atual (desativada por padrão)
+atual = _GovernadorNulo()
+
+def iniciar(ativo, maximo, intervalo_maximo, logger=print):
+    """ Define o governador da próxima execução; maximo é o número de sessões (ou envios HTTP) simultâneos. """
+    global atual
+    atual = Governador(maximo, intervalo_maximo, logger) if ativo else _GovernadorNulo()
+    return atual
+
+def vaga():
+    return atual.vaga()
+
+def registrar(tipo, segundos):
+    atual.registrar(tipo, segundos)
+
+def registrar_erro(tipo):
+    atual.registrar_erro(tipo)
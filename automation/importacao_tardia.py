@@ -0,0 +1,27 @@
+import importlib
+
+class ImportacaoTardia:
+    """
+    Substituto de um módulo (ou de um atributo dele) que só é importado no
+    primeiro uso. Permite importar o pacote sem carregar pandas, openpyxl,
+    Selenium ou requests, que levam segundos para inicializar.
+    """
+
+    def __init__(self, modulo, atributo=None):
+        self._modulo = modulo
+        self._atributo = atributo
+        self._alvo = None
+
+    def _resolver(self):
+        if self._alvo is None:
+            alvo = importlib.import_module(self._modulo)
+            if self._atributo:
+                alvo = getattr(alvo, self._atributo)
+            self._alvo = alvo
+        return self._alvo
+
+    def __getattr__(self, nome):
+        return getattr(self._resolver(), nome)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolver()(*args, **kwargs)
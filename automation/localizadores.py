@@ -0,0 +1,110 @@
+import threading
+import weakref
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
+from selenium.webdriver.common.by import By
+
+# Resolve vários localizadores em uma única chamada: {chave: [elementos]}
+_JS_LOCALIZAR = """
+var pedidos = arguments[0], resultado = {};
+for (var i = 0; i < pedidos.length; i++) {
+    var chave = pedidos[i][0], por = pedidos[i][1], valor = pedidos[i][2], lista = [];
+    if (por === 'name') {
+        lista = document.getElementsByName(valor);
+    } else if (por === 'id') {
+        lista = document.querySelectorAll('[id="' + valor + '"]');
+    } else if (por === 'css selector') {
+        lista = document.querySelectorAll(valor);
+    } else if (por === 'xpath') {
+        var nos = document.evaluate(valor, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        for (var j = 0; j < nos.snapshotLength; j++) { lista.push(nos.snapshotItem(j)); }
+    }
+    resultado[chave] = Array.prototype.slice.call(lista);
+}
+return resultado;
+"""
+
+_POR_JS = (By.NAME, By.ID, By.CSS_SELECTOR, By.XPATH)
+
+class CacheElementos:
+    """
+    Elementos do formulário já localizados, por chave do LOCATORS. Valem para
+    a geração atual do formulário: são descartados após o envio, ao reabrir o
+    formulário e, automaticamente, quando o portal os torna obsoletos
+    (StaleElementReferenceException).
+    """
+
+    def __init__(self, driver, localizadores):
+        self.driver = driver
+        self.localizadores = localizadores
+        self._elementos = {}
+        # Chamadas ao navegador feitas para localizar elementos (para medição)
+        self.consultas = 0
+
+    def carregar(self, chaves):
+        """ Localiza de uma vez todas as chaves ainda fora do cache. """
+        faltando = [c for c in chaves if c not in self._elementos]
+        if not faltando:
+            return
+        por_js = [c for c in faltando if self.localizadores[c][0] in _POR_JS]
+        if por_js:
+            self.consultas += 1
+            encontrados = self.driver.execute_script(
+                _JS_LOCALIZAR, [[c, *self.localizadores[c]] for c in por_js]
+            )
+            for chave, elementos in encontrados.items():
+                # Lista vazia não entra no cache: o elemento ainda pode aparecer
+                if elementos:
+                    self._elementos[chave] = elementos
+        for chave in faltando:
+            if chave not in por_js:
+                self.consultas += 1
+                elementos = self.driver.find_elements(*self.localizadores[chave])
+                if elementos:
+                    self._elementos[chave] = elementos
+
+    def elementos(self, chave):
+        self.carregar([chave])
+        return self._elementos.get(chave, [])
+
+    def elemento(self, chave, indice=0):
+        elementos = self.elementos(chave)
+        if len(elementos) <= indice:
+            por, valor = self.localizadores[chave]
+            raise NoSuchElementException(f"Elemento '{chave}' ({por}={valor}) [{indice}] não encontrado.")
+        return elementos[indice]
+
+    def usar(self, chave, acao, indice=0):
+        """
+        Executa acao(elemento). Se o elemento ficou obsoleto (formulário
+        recarregado), limpa o cache, localiza de novo e repete a ação uma vez.
+        """
+        try:
+            return acao(self.elemento(chave, indice))
+        except StaleElementReferenceException:
+            self.invalidar()
+            return acao(self.elemento(chave, indice))
+
+    def invalidar(self, *chaves):
+        """ Descarta as chaves informadas ou, sem argumentos, o cache inteiro. """
+        if not chaves:
+            self._elementos.clear()
+        for chave in chaves:
+            self._elementos.pop(chave, None)
+
+# Um cache por sessão do navegador (cada sessão é usada por uma única thread)
+_caches = weakref.WeakKeyDictionary()
+_lock_caches = threading.Lock()
+
+def cache(driver, localizadores):
+    with _lock_caches:
+        atual = _caches.get(driver)
+        if atual is None:
+            atual = _caches[driver] = CacheElementos(driver, localizadores)
+        return atual
+
+def invalidar(driver):
+    """ Chamado quando o formulário é trocado (envio, navegação, recuperação). """
+    with _lock_caches:
+        atual = _caches.get(driver)
+    if atual:
+        atual.invalidar()
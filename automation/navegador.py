@@ -0,0 +1,247 @@
+import json
+import os
+import threading
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+from automation.importacao_tardia import ImportacaoTardia
+
+webdriver = ImportacaoTardia('selenium.webdriver')
+Service = ImportacaoTardia('selenium.webdriver.chrome.service', 'Service')
+ChromeOptions = ImportacaoTardia('selenium.webdriver.chrome.options', 'Options')
+ChromeDriverManager = ImportacaoTardia('webdriver_manager.chrome', 'ChromeDriverManager')
+
+# --- Provisionamento do chromedriver ---
+
+_caminho_driver = None
+_lock_driver = threading.Lock()
+
+def _arquivo_cache():
+    return os.getenv("CACHE_CHROMEDRIVER", ".chromedriver_cache.json")
+
+def _ler_cache():
+    try:
+        with open(_arquivo_cache(), encoding='utf-8') as f:
+            caminho = json.load(f).get('caminho')
+    except (OSError, ValueError, AttributeError):
+        return None
+    return caminho if caminho and os.path.isfile(caminho) else None
+
+def _gravar_cache(caminho):
+    try:
+        with open(_arquivo_cache(), 'w', encoding='utf-8') as f:
+            json.dump({'caminho': caminho}, f)
+    except OSError:
+        pass
+
+def caminho_chromedriver(logger=print, ignorar_cache=False):
+    """
+    Resolve o executável do chromedriver uma única vez: CHROMEDRIVER_PATH do
+    .env, o caminho guardado em cache por uma execução anterior ou, por último,
+    o webdriver_manager (que exige rede). Retorna None se nada funcionar; nesse
+    caso o Selenium procura o driver por conta própria (PATH/Selenium Manager).
+    """
+    global _caminho_driver
+    with _lock_driver:
+        if ignorar_cache:
+            _caminho_driver = None
+        elif _caminho_driver and os.path.isfile(_caminho_driver):
+            return _caminho_driver
+
+        configurado = os.getenv("CHROMEDRIVER_PATH")
+        if configurado and os.path.isfile(configurado):
+            _caminho_driver = configurado
+            return _caminho_driver
+
+        if not ignorar_cache:
+            _caminho_driver = _ler_cache()
+            if _caminho_driver:
+                return _caminho_driver
+
+        try:
+            _caminho_driver = ChromeDriverManager().install()
+            _gravar_cache(_caminho_driver)
+            logger(f"Chromedriver instalado em: {_caminho_driver}")
+        except Exception as e:
+            logger(f"AVISO: Não foi possível baixar o chromedriver ({e}). Usando o driver do sistema.")
+            _caminho_driver = None
+        return _caminho_driver
+
+# --- Perfil do navegador ---
+
+# Padrões de URL (Network.setBlockedURLs) de cada grupo de recursos bloqueável
+RECURSOS_BLOQUEAVEIS = {
+    'imagens': ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico'],
+    'fontes': ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot', '*fonts.googleapis.com*', '*fonts.gstatic.com*'],
+    'analytics': ['*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*hotjar.com*',
+                  '*clarity.ms*', '*/analytics.js*', '*/gtag/js*'],
+}
+
+# Serviços do Chrome que o robô não usa (menos processos, memória e tráfego em segundo plano)
+_ARGUMENTOS_ENXUTOS = [
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--disable-extensions',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication',
+    '--mute-audio',
+    # Sessões paralelas ficam em janelas de fundo: sem isso os timers delas são desacelerados
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+]
+
+class PerfilNavegador:
+    """
+    Como o Chrome é aberto. O perfil enxuto usa o carregamento 'eager' (a
+    página é usada assim que o DOM está pronto, sem esperar imagens e
+    fontes), bloqueia os grupos de recursos escolhidos e desliga serviços
+    do Chrome desnecessários. Folhas de estilo nunca são bloqueadas: as
+    esperas dependem da visibilidade calculada dos elementos.
+    """
+
+    def __init__(self, enxuto=False, bloquear=()):
+        self.enxuto = enxuto
+        self.bloquear = tuple(g for g in bloquear if g in RECURSOS_BLOQUEAVEIS) if enxuto else ()
+
+    def __eq__(self, outro):
+        return isinstance(outro, PerfilNavegador) and (self.enxuto, self.bloquear) == (outro.enxuto, outro.bloquear)
+
+    def descricao(self):
+        if not self.enxuto:
+            return "padrão"
+        return f"enxuto (bloqueando: {', '.join(self.bloquear) or 'nada'})"
+
+    def opcoes_chrome(self):
+        """ Options do Chrome, ou None para o perfil padrão (mesmo comportamento de antes). """
+        if not self.enxuto:
+            return None
+        opcoes = ChromeOptions()
+        opcoes.page_load_strategy = 'eager'
+        for argumento in _ARGUMENTOS_ENXUTOS:
+            opcoes.add_argument(argumento)
+        if 'imagens' in self.bloquear:
+            # Bloqueio nativo: a imagem nem chega a ser requisitada
+            opcoes.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+        return opcoes
+
+    def aplicar(self, driver, logger=print):
+        """ Bloqueios que só podem ser ligados com o navegador aberto (DevTools). """
+        padroes = [p for grupo in self.bloquear if grupo != 'imagens' for p in RECURSOS_BLOQUEAVEIS[grupo]]
+        if not padroes:
+            return
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': padroes})
+        except WebDriverException as e:
+            logger(f"AVISO: Não foi possível bloquear recursos no navegador: {e.msg}")
+
+# Perfil usado pelos próximos navegadores abertos (definido no início de cada execução)
+perfil = PerfilNavegador()
+
+def configurar_perfil(enxuto, bloquear):
+    """ bloquear: grupos de RECURSOS_BLOQUEAVEIS separados por vírgula ('imagens,fontes'). """
+    global perfil
+    grupos = [g.strip().lower() for g in (bloquear or "").split(',') if g.strip()]
+    perfil = PerfilNavegador(enxuto, grupos)
+    return perfil
+
+# Limite (s) dos scripts assíncronos de todo driver: cobre o preenchimento em lote
+# (até 30 s, em preenchimento_js) e as fatias das esperas dentro da página
+TEMPO_LIMITE_SCRIPT = 35
+
+def _abrir_chrome(caminho, perfil_atual, logger):
+    servico = Service(caminho) if caminho else Service()
+    opcoes = perfil_atual.opcoes_chrome()
+    driver = webdriver.Chrome(service=servico, options=opcoes) if opcoes else webdriver.Chrome(service=servico)
+    perfil_atual.aplicar(driver, logger)
+    driver.set_script_timeout(TEMPO_LIMITE_SCRIPT)
+    return driver
+
+def criar_driver(logger=print):
+    """ Abre o Chrome com o driver em cache; se o Chrome foi atualizado, baixa o driver novo uma vez. """
+    perfil_atual = perfil
+    caminho = caminho_chromedriver(logger)
+    try:
+        return _abrir_chrome(caminho, perfil_atual, logger)
+    except WebDriverException as e:
+        if not caminho or caminho == os.getenv("CHROMEDRIVER_PATH"):
+            raise
+        logger(f"AVISO: O chromedriver em cache falhou ({e.msg}). Baixando novamente...")
+        caminho = caminho_chromedriver(logger, ignorar_cache=True)
+        return _abrir_chrome(caminho, perfil_atual, logger)
+
+# --- Navegador mantido aberto entre execuções ---
+
+class NavegadorQuente:
+    """
+    Guarda o navegador já logado ao fim de uma execução para que a próxima
+    (na mesma sessão da interface) pule a abertura do driver, o login e,
+    se o formulário continuar aberto, a navegação pelos menus.
+    """
+
+    def __init__(self):
+        self.driver = None
+        self.wait = None
+        self.perfil = None
+
+    def guardar(self, driver, wait):
+        self.driver, self.wait, self.perfil = driver, wait, perfil
+
+    def contem(self, driver):
+        return driver is not None and driver is self.driver
+
+    def vivo(self):
+        """ Confere se o navegador ainda responde (a janela pode ter sido fechada). """
+        if not self.driver:
+            return False
+        try:
+            # Não troca de frame: o formulário pode continuar aberto no contexto atual
+            return bool(self.driver.window_handles) and bool(self.driver.current_url)
+        except WebDriverException:
+            return False
+
+    def _na_pagina_de_login(self):
+        seletor = (By.CSS_SELECTOR, "input[type='password']")
+        try:
+            return bool(self.driver.find_elements(*seletor))
+        except WebDriverException:
+            # O frame atual deixou de existir (a página foi redirecionada)
+            self.driver.switch_to.default_content()
+            return bool(self.driver.find_elements(*seletor))
+
+    def reutilizar(self, url_login, logger, callback_pausa_login):
+        """
+        Retorna (driver, wait) do navegador guardado, ou (None, None) se não
+        houver um navegador vivo. Se a sessão do portal expirou, volta à página
+        de login e pausa para o login manual.
+        """
+        if not self.vivo():
+            if self.driver:
+                logger("O navegador mantido aberto não responde mais. Abrindo um novo...")
+            self.fechar()
+            return None, None
+        if self.perfil != perfil:
+            logger("O perfil do navegador mudou. Abrindo um novo navegador...")
+            self.fechar()
+            return None, None
+
+        logger("Reutilizando o navegador já aberto.")
+        if self._na_pagina_de_login():
+            logger("A sessão do portal expirou. Refaça o login.")
+            self.driver.get(url_login)
+            callback_pausa_login()
+        return self.driver, self.wait
+
+    def fechar(self):
+        driver, self.driver, self.wait, self.perfil = self.driver, None, None, None
+        if driver:
+            try:
+                driver.quit()
+            except WebDriverException:
+                pass
+
+# Uma instância por processo (a interface roda uma execução por vez)
+quente = NavegadorQuente()
@@ -0,0 +1,74 @@
+import os
+from dataclasses import dataclass, field
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def _env_int(nome, padrao):
+    valor = os.getenv(nome)
+    try:
+        return int(valor) if valor not in (None, "") else padrao
+    except ValueError:
+        return padrao
+
+def _env_bool(nome, padrao):
+    valor = os.getenv(nome)
+    if valor in (None, ""):
+        return padrao
+    return valor.strip().lower() in ("1", "true", "sim", "s")
+
+def _env_float(nome, padrao):
+    valor = os.getenv(nome)
+    try:
+        return float(valor) if valor not in (None, "") else padrao
+    except ValueError:
+        return padrao
+
+@dataclass
+class OpcoesExecucao:
+    """
+    Parâmetros ajustáveis de uma execução da automação.
+    Os valores padrão podem ser sobrescritos pelo arquivo .env.
+    """
+    # Quantidade de sessões do navegador enviando registros em paralelo
+    num_workers: int = field(default_factory=lambda: _env_int("NUM_WORKERS", 1))
+    # Limite superior (s) da espera pela página ficar pronta após cada envio
+    tempo_maximo_espera: float = field(default_factory=lambda: _env_float("TEMPO_MAXIMO_ESPERA", 30.0))
+    # 'js' define todos os campos em lote via JavaScript; 'teclado' digita campo a campo
+    modo_preenchimento: str = field(default_factory=lambda: os.getenv("MODO_PREENCHIMENTO") or "js")
+    # 'navegador' envia cada registro pelo Selenium; 'http' envia por requisições diretas
+    modo_envio: str = field(default_factory=lambda: os.getenv("MODO_ENVIO") or "navegador")
+    # Diário SQLite usado para retomar execuções interrompidas ('' desativa)
+    caminho_diario: str = field(default_factory=lambda: os.getenv("CAMINHO_DIARIO", "diario_envios.sqlite3"))
+    # Arquivo JSONL com a duração de cada fase dos registros ('' desativa a telemetria)
+    caminho_telemetria: str = field(default_factory=lambda: os.getenv("CAMINHO_TELEMETRIA", "telemetria.jsonl"))
+    # Sessão do portal (cookies) salva após o login para dispensar o CAPTCHA na próxima execução ('' desativa)
+    caminho_sessao: str = field(default_factory=lambda: os.getenv("CAMINHO_SESSAO", ".sessao_portal.json"))
+    # Listagem do portal com {placa} e {pagina}, lida para não reenviar registros já gravados ('' desativa)
+    url_consulta: str = field(default_factory=lambda: os.getenv("URL_CONSULTA", ""))
+    # Opções de produto do formulário guardadas entre execuções ('' lê sempre do portal)
+    caminho_catalogo: str = field(default_factory=lambda: os.getenv("CAMINHO_CATALOGO", ".catalogo_produtos.json"))
+    # Validade (horas) do catálogo de produtos salvo
+    validade_catalogo_horas: float = field(default_factory=lambda: _env_float("VALIDADE_CATALOGO_HORAS", 24.0))
+    # Ajusta o intervalo entre envios e as sessões simultâneas pela latência do portal
+    ritmo_adaptativo: bool = field(default_factory=lambda: _env_bool("RITMO_ADAPTATIVO", True))
+    # Maior intervalo (s) entre envios que o ritmo adaptativo pode impor
+    intervalo_maximo_envio: float = field(default_factory=lambda: _env_float("INTERVALO_MAXIMO_ENVIO", 30.0))
+    # Tentativas por registro; entre elas a página é recuperada (1 = sem nova tentativa)
+    max_tentativas: int = field(default_factory=lambda: _env_int("MAX_TENTATIVAS", 3))
+    # Reinicia o navegador (mantendo a sessão) após N registros no envio sequencial (0 desativa)
+    reciclar_apos_registros: int = field(default_factory=lambda: _env_int("RECICLAR_APOS_REGISTROS", 500))
+    # ... ou quando a memória da página passa deste limite em MB (0 desativa)
+    reciclar_memoria_mb: float = field(default_factory=lambda: _env_float("RECICLAR_MEMORIA_MB", 300.0))
+    # Mantém o navegador logado aberto ao fim da execução, para reutilizá-lo na próxima
+    manter_navegador: bool = field(default_factory=lambda: _env_bool("MANTER_NAVEGADOR", False))
+    # Espera (s) antes de fechar o navegador ao fim da execução, para conferir a última página (0 não espera)
+    espera_ao_fechar: float = field(default_factory=lambda: _env_float("ESPERA_AO_FECHAR", 10.0))
+    # Carregamento 'eager', recursos bloqueados e serviços do Chrome desligados
+    perfil_enxuto: bool = field(default_factory=lambda: _env_bool("PERFIL_ENXUTO", False))
+    # Grupos bloqueados no perfil enxuto: imagens, fontes, analytics ('' não bloqueia nada)
+    bloquear_recursos: str = field(default_factory=lambda: os.getenv("BLOQUEAR_RECURSOS", "imagens,fontes,analytics"))
+    # Processos que leem as planilhas do lote enquanto os registros são enviados (0 = automático)
+    processos_leitura: int = field(default_factory=lambda: _env_int("PROCESSOS_LEITURA", 0))
+    # Apenas lê e valida as planilhas, sem abrir o navegador
+    somente_validar: bool = False
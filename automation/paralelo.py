@@ -0,0 +1,107 @@
+import queue
+import threading
+import automation.core_functions as core
+import automation.recuperacao as recuperacao
+import automation.sessao as sessao
+from automation.importacao_tardia import ImportacaoTardia
+
+WebDriverWait = ImportacaoTardia('selenium.webdriver.support.ui', 'WebDriverWait')
+
+def capturar_sessao(driver):
+    """
+    Captura a URL autenticada e os cookies do navegador logado manualmente.
+    Volta ao documento principal antes, pois a URL dos frames não serve de entrada.
+    """
+    driver.switch_to.default_content()
+    return driver.current_url, driver.get_cookies()
+
+def abrir_sessao_clonada(url_sessao, cookies, logger):
+    """
+    Abre um novo navegador e injeta os cookies da sessão principal,
+    evitando um novo login manual (CAPTCHA).
+    """
+    driver = core.criar_driver(logger)
+    try:
+        sessao.injetar_cookies(driver, url_sessao, cookies, logger)
+        return driver, WebDriverWait(driver, 30)
+    except Exception:
+        driver.quit()
+        raise
+
+def _executar_worker(num_sessao, driver, wait, fila, dados_cabecalho, total, enviar_registro, logger, resultados):
+    """
+    Navega até o formulário uma única vez e consome transações da fila
+    até ela esvaziar. Registros com falha (já com a página recuperada) são
+    anotados e a sessão segue; se a sessão ficar inutilizável ela é encerrada
+    e as transações restantes ficam para as outras.
+    """
+    def log(mensagem):
+        logger(f"[Sessão {num_sessao}] {mensagem}")
+
+    if not core.garantir_formulario(driver, wait, log):
+        log("Sessão descartada: não foi possível chegar ao formulário.")
+        return
+
+    while True:
+        try:
+            i, transacao = fila.get_nowait()
+        except queue.Empty:
+            return
+
+        log(f"--- Processando Registro {i+1} de {total} ---")
+        try:
+            enviar_registro(driver, wait, {**dados_cabecalho, **transacao}, log, i)
+            resultados[i] = None
+        except recuperacao.SessaoIrrecuperavel as e:
+            resultados[i] = e
+            log(f"ERRO no registro {i+1}: {e}. Encerrando esta sessão.")
+            return
+        except Exception as e:
+            resultados[i] = e
+            log(f"ERRO no registro {i+1}: {e}. Registro pulado.")
+
+def executar_em_paralelo(driver, wait, dados_cabecalho, lista_transacoes, num_workers, enviar_registro, logger):
+    """
+    Distribui as transações entre N sessões do navegador que compartilham
+    os cookies do login manual. A sessão principal (já logada) é a sessão 1.
+
+    Retorna um dicionário {indice_transacao: None (sucesso) ou Exception}.
+    Transações ausentes do dicionário não chegaram a ser processadas.
+    """
+    url_sessao, cookies = capturar_sessao(driver)
+
+    fila = queue.Queue()
+    for item in enumerate(lista_transacoes):
+        fila.put(item)
+
+    total = len(lista_transacoes)
+    num_workers = max(1, min(num_workers, total))
+    resultados = {}
+
+    def worker_clonado(num_sessao):
+        try:
+            driver_clone, wait_clone = abrir_sessao_clonada(url_sessao, cookies, logger)
+        except Exception as e:
+            logger(f"[Sessão {num_sessao}] ERRO ao abrir o navegador: {e}")
+            return
+        try:
+            _executar_worker(num_sessao, driver_clone, wait_clone, fila, dados_cabecalho,
+                             total, enviar_registro, logger, resultados)
+        finally:
+            driver_clone.quit()
+            logger(f"[Sessão {num_sessao}] Navegador fechado.")
+
+    logger(f"Modo paralelo: {num_workers} sessões do navegador.")
+    threads = [
+        threading.Thread(target=worker_clonado, args=(n,), daemon=True)
+        for n in range(2, num_workers + 1)
+    ]
+    for t in threads:
+        t.start()
+
+    # A sessão principal trabalha na thread atual
+    _executar_worker(1, driver, wait, fila, dados_cabecalho, total, enviar_registro, logger, resultados)
+
+    for t in threads:
+        t.join()
+    return resultados
@@ -0,0 +1,117 @@
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import automation.core_functions as core
+import automation.validacao as validacao
+
+# Planilhas já lidas aguardando o envio; com a fila cheia a leitura para
+TAMANHO_FILA = 2
+# Limite de processos de leitura quando não configurado (cada um carrega o pandas)
+MAX_PROCESSOS_PADRAO = 4
+
+_FIM = object()
+
+def preparar_planilha(caminho):
+    """
+    Lê e valida uma planilha. Roda em um processo separado, então as mensagens
+    de log são guardadas e devolvidas junto com os dados, para o processo
+    principal repassá-las ao logger na ordem dos arquivos.
+    """
+    mensagens = []
+    resultado = {
+        'caminho': caminho,
+        'nome': os.path.basename(caminho),
+        'dados_cabecalho': None,
+        'lista_transacoes': None,
+        'mensagens': mensagens,
+        'erro': None,
+    }
+    try:
+        dados_cabecalho, lista_transacoes = core.extrair_dados_planilha(caminho, mensagens.append)
+        if not dados_cabecalho or not lista_transacoes:
+            resultado['erro'] = "Falha ao extrair dados (cabeçalho ou transações)."
+            return resultado
+        relatorio = validacao.validar_planilha(dados_cabecalho, lista_transacoes)
+        relatorio.registrar(mensagens.append)
+        resultado['erro'] = relatorio.mensagem_erro()
+        resultado['dados_cabecalho'] = dados_cabecalho
+        resultado['lista_transacoes'] = lista_transacoes
+    except Exception as e:
+        resultado['erro'] = f"Falha ao ler a planilha: {e}"
+    return resultado
+
+class PipelinePlanilhas:
+    """
+    Lê e valida as planilhas em um pool de processos enquanto o processo
+    principal faz o login e envia os registros. As planilhas prontas passam
+    por uma fila limitada, na ordem da seleção: se o envio está atrasado a
+    fila enche e a leitura espera (no máximo num_processos leituras em
+    andamento e TAMANHO_FILA planilhas prontas em memória).
+    Uso: iniciar(), percorrer com for e, ao final, encerrar().
+    """
+
+    def __init__(self, caminhos, num_processos=0, tamanho_fila=TAMANHO_FILA):
+        self.caminhos = list(caminhos)
+        if num_processos <= 0:
+            num_processos = min(os.cpu_count() or 1, MAX_PROCESSOS_PADRAO)
+        self.num_processos = max(1, min(num_processos, len(self.caminhos)))
+        self._fila = queue.Queue(maxsize=max(1, tamanho_fila))
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._produzir, name="leitura-planilhas", daemon=True)
+        self._thread.start()
+
+    def _colocar(self, item):
+        """ Espera espaço na fila (contrapressão); desiste se o pipeline foi encerrado. """
+        while not self._parar.is_set():
+            try:
+                self._fila.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produzir(self):
+        try:
+            with ProcessPoolExecutor(max_workers=self.num_processos) as pool:
+                em_andamento = deque()
+                for caminho in self.caminhos:
+                    em_andamento.append((caminho, pool.submit(preparar_planilha, caminho)))
+                    if len(em_andamento) >= self.num_processos:
+                        if not self._colocar(self._resultado(*em_andamento.popleft())):
+                            break
+                while em_andamento and not self._parar.is_set():
+                    if not self._colocar(self._resultado(*em_andamento.popleft())):
+                        break
+                for _, futuro in em_andamento:
+                    futuro.cancel()
+        finally:
+            self._colocar(_FIM)
+
+    @staticmethod
+    def _resultado(caminho, futuro):
+        try:
+            return futuro.result()
+        except Exception as e:
+            # Processo de leitura encerrado de forma anormal (BrokenProcessPool, memória...)
+            return {
+                'caminho': caminho, 'nome': os.path.basename(caminho), 'dados_cabecalho': None,
+                'lista_transacoes': None, 'mensagens': [], 'erro': f"Falha no processo de leitura: {e}",
+            }
+
+    def __iter__(self):
+        while True:
+            item = self._fila.get()
+            if item is _FIM:
+                return
+            yield item
+
+    def encerrar(self):
+        """ Interrompe a leitura (se ainda em andamento) e libera os processos. """
+        self._parar.set()
+        if self._thread:
+            self._thread.join()
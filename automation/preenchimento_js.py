@@ -0,0 +1,157 @@
+import time
+import automation.core_functions as core
+import automation.catalogo_produtos as catalogo_produtos
+from automation.importacao_tardia import ImportacaoTardia
+
+EC = ImportacaoTardia('selenium.webdriver.support.expected_conditions')
+
+# Preenche uma lista de campos [nome, índice, valor] e, se houver segunda linha
+# de produto, clica em 'Incluir novo', espera a linha nova e preenche também.
+# Os eventos disparados são os mesmos que a digitação gera, pois a validação
+# JavaScript do portal depende deles.
+_JS_PREENCHER = """
+var campos = arguments[0];
+var camposSegundaLinha = arguments[1];
+var xpathIncluirNovo = arguments[2];
+var timeoutMs = arguments[3];
+var concluir = arguments[arguments.length - 1];
+
+function disparar(el, tipo) {
+    var evento = (tipo === 'focus' || tipo === 'blur')
+        ? new FocusEvent(tipo)
+        : new Event(tipo, {bubbles: true});
+    el.dispatchEvent(evento);
+}
+
+function preencher(lista) {
+    for (var i = 0; i < lista.length; i++) {
+        var nome = lista[i][0], indice = lista[i][1], valor = lista[i][2];
+        var el = document.getElementsByName(nome)[indice];
+        if (!el) {
+            throw new Error('Campo ' + nome + '[' + indice + '] não encontrado.');
+        }
+        if (el.tagName === 'SELECT') {
+            var existe = Array.prototype.some.call(el.options, function (o) { return o.value === valor; });
+            if (!existe) {
+                throw new Error('Opção ' + valor + ' não encontrada em ' + nome + '[' + indice + '].');
+            }
+        }
+        disparar(el, 'focus');
+        el.value = valor;
+        disparar(el, 'input');
+        disparar(el, 'keyup');
+        disparar(el, 'change');
+        disparar(el, 'blur');
+    }
+}
+
+try {
+    preencher(campos);
+    if (!camposSegundaLinha) {
+        concluir(null);
+        return;
+    }
+
+    var nomeSelect = camposSegundaLinha[0][0];
+    var botao = document.evaluate(xpathIncluirNovo, document, null,
+        XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    if (!botao) {
+        throw new Error("Botão 'Incluir novo' não encontrado.");
+    }
+    botao.click();
+
+    var inicio = Date.now();
+    (function aguardarSegundaLinha() {
+        if (document.getElementsByName(nomeSelect).length > 1) {
+            try {
+                preencher(camposSegundaLinha);
+                concluir(null);
+            } catch (e) {
+                concluir(e.message);
+            }
+        } else if (Date.now() - inicio > timeoutMs) {
+            concluir('Timeout: O segundo campo de produto (Arla) não apareceu.');
+        } else {
+            setTimeout(aguardarSegundaLinha, 25);
+        }
+    })();
+} catch (e) {
+    concluir(e.message);
+}
+"""
+
+def _nome(chave):
+    """ Nome do campo (atributo 'name') de uma entrada do LOCATORS. """
+    return core.LOCATORS[chave][1]
+
+def _executar(driver, campos, campos_segunda_linha=None, timeout=30):
+    # O limite do script no driver (navegador.TEMPO_LIMITE_SCRIPT) é maior que timeout
+    erro = driver.execute_async_script(
+        _JS_PREENCHER,
+        campos,
+        campos_segunda_linha,
+        core.LOCATORS['btn_incluir_novo'][1],
+        int(timeout * 1000),
+    )
+    if erro:
+        if erro.startswith('Opção '):
+            # Catálogo desatualizado (opções do portal mudaram): é lido de novo na próxima tentativa
+            catalogo_produtos.catalogo.invalidar()
+        raise Exception(erro)
+
+def preencher_um_registro_js(driver, wait, dados_combinados, logger):
+    """
+    Mesmo preenchimento de core.preencher_um_registro, mas definindo os valores
+    via JavaScript: uma chamada antes e outra depois do popup da placa, em vez
+    de dezenas de comandos de teclado.
+    """
+    try:
+        wait.until(EC.presence_of_element_located(core.LOCATORS['cliente_codigo']))
+        valor_produto, valor_aditivo = core.valores_produto(driver, dados_combinados, logger)
+        inicio = time.perf_counter()
+
+        logger("Preenchendo campos fixos e dados do motorista (JavaScript)...")
+        _executar(driver, [
+            [_nome('cliente_codigo'), 0, "3359"],
+            [_nome('contrato_informe'), 0, "00101033590125"],
+            [_nome('motorista_nome'), 0, dados_combinados['nome']],
+            [_nome('motorista_matricula'), 0, dados_combinados['matricula']],
+        ])
+        duracao_fixos = time.perf_counter() - inicio
+
+        # --- Lógica do Popup (ou cache da placa) ---
+        core.resolver_placa(driver, dados_combinados['placa'], logger)
+
+        inicio = time.perf_counter()
+        campos = [
+            [_nome('destino'), 0, dados_combinados['destino']],
+            [_nome('data'), 0, dados_combinados['data']],
+            [_nome('hora'), 0, dados_combinados['hora_para_preencher']],
+            [_nome('hodometro_abastecimento'), 0, dados_combinados['hodometro_abastecimento']],
+            [_nome('valor_total'), 0, dados_combinados['valor_total']],
+            [_nome('litros'), 0, dados_combinados['litros']],
+            [_nome('select_produto'), 0, valor_produto],
+        ]
+
+        campos_aditivo = None
+        aditivo_dados = dados_combinados.get('aditivo')
+        if aditivo_dados:
+            logger(f"Detectado Aditivo/Arla. Preenchendo: {aditivo_dados}")
+            campos_aditivo = [
+                [_nome('select_produto'), 1, valor_aditivo],
+                [_nome('valor_total'), 1, aditivo_dados['valor']],
+                [_nome('litros'), 1, aditivo_dados['litros']],
+            ]
+        else:
+            logger("Nenhum aditivo detectado para este registro.")
+
+        logger("Preenchendo dados da transação e do produto (JavaScript)...")
+        _executar(driver, campos, campos_aditivo)
+        duracao_total = duracao_fixos + time.perf_counter() - inicio
+
+        logger(f"Preenchimento deste registro concluído em {duracao_total * 1000:.0f} ms (sem o popup).")
+        return True
+
+    except Exception as e:
+        logger(f"ERRO ao preencher os campos do formulário (JavaScript): {e}")
+        return False
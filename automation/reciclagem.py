@@ -0,0 +1,91 @@
+import time
+from selenium.common.exceptions import WebDriverException
+import automation.core_functions as core
+import automation.navegador as navegador
+import automation.paralelo as paralelo
+import automation.sessao as sessao
+import automation.telemetria as telemetria
+
+# A memória é medida a cada INTERVALO_MEDICAO registros (uma chamada ao DevTools)
+INTERVALO_MEDICAO = 10
+
+def memoria_mb(driver):
+    """
+    Heap JavaScript alocado pela página (MB), pelo DevTools do Chrome. É o que
+    cresce com as recargas do formulário e do popup; None se não puder ser lido.
+    """
+    try:
+        driver.execute_cdp_cmd('Performance.enable', {})
+        metricas = driver.execute_cdp_cmd('Performance.getMetrics', {})
+    except WebDriverException:
+        return None
+    for metrica in metricas.get('metrics', []):
+        if metrica.get('name') == 'JSHeapTotalSize':
+            return metrica['value'] / (1024 * 1024)
+    return None
+
+class NavegadorReciclavel:
+    """
+    Navegador do envio sequencial, reiniciado após max_registros registros ou
+    quando a memória da página passa de max_memoria_mb (0 desativa cada
+    limite). O navegador novo recebe os cookies da sessão autenticada e volta
+    ao formulário pelos menus antes que o antigo seja fechado: sem novo login
+    e, se algo falhar, o envio continua no navegador antigo.
+    """
+
+    def __init__(self, driver, wait, max_registros=0, max_memoria_mb=0):
+        self.driver = driver
+        self.wait = wait
+        self.max_registros = max_registros
+        self.max_memoria_mb = max_memoria_mb
+        self.registros = 0
+        self.reciclagens = 0
+
+    def _motivo(self):
+        if self.max_registros and self.registros >= self.max_registros:
+            return f"{self.registros} registros enviados"
+        if self.max_memoria_mb and self.registros and self.registros % INTERVALO_MEDICAO == 0:
+            memoria = memoria_mb(self.driver)
+            if memoria is not None and memoria >= self.max_memoria_mb:
+                return f"memória da página em {memoria:.0f} MB"
+        return None
+
+    def antes_do_registro(self, logger):
+        """ Chamado antes de cada registro: recicla o navegador se algum limite foi atingido. """
+        motivo = self._motivo()
+        if motivo:
+            self.reciclar(motivo, logger)
+        self.registros += 1
+
+    def reciclar(self, motivo, logger):
+        logger(f"Reiniciando o navegador ({motivo})...")
+        inicio = time.perf_counter()
+        # Com ou sem sucesso, a contagem recomeça (não tenta de novo a cada registro)
+        self.registros = 0
+        novo = None
+        try:
+            with telemetria.fase('reciclagem'):
+                url_sessao, cookies = paralelo.capturar_sessao(self.driver)
+                novo, wait_novo = paralelo.abrir_sessao_clonada(url_sessao, cookies, logger)
+                if not sessao.sessao_valida(novo):
+                    raise Exception("a sessão do portal não foi aceita no navegador novo")
+                if not core.garantir_formulario(novo, wait_novo, logger):
+                    raise Exception("o formulário não abriu no navegador novo")
+        except Exception as e:
+            logger(f"AVISO: Não foi possível reiniciar o navegador ({e}). Seguindo com o atual.")
+            if novo:
+                novo.quit()
+            # A captura da sessão deixou o navegador atual no documento principal
+            core.garantir_formulario(self.driver, self.wait, logger)
+            return False
+
+        antigo, self.driver, self.wait = self.driver, novo, wait_novo
+        if navegador.quente.contem(antigo):
+            navegador.quente.guardar(novo, wait_novo)
+        try:
+            antigo.quit()
+        except WebDriverException:
+            pass
+        self.reciclagens += 1
+        logger(f"Navegador reiniciado em {time.perf_counter() - inicio:.1f}s.")
+        return True
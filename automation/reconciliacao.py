@@ -0,0 +1,197 @@
+import re
+import time
+import unicodedata
+from html.parser import HTMLParser
+from urllib.parse import quote, urljoin
+import automation.diario as diario_envios
+from automation.importacao_tardia import ImportacaoTardia
+
+requests = ImportacaoTardia('requests')
+
+# Segurança contra paginação que não termina (portal devolvendo sempre a mesma página)
+MAX_PAGINAS = 500
+
+# Cabeçalhos da listagem do portal (sem acento, maiúsculos) -> campo do índice
+_COLUNAS_LISTAGEM = {
+    'placa': ('PLACA',),
+    'data': ('DATA', 'DATA ABASTECIMENTO', 'DT ABASTECIMENTO'),
+    'hodometro': ('HODOMETRO', 'KM', 'HODOMETRO/KM'),
+    'valor': ('VALOR', 'VALOR TOTAL', 'VL PRODUTO'),
+}
+
+_PADRAO_DATA = re.compile(r'(\d{2})/(\d{2})/(\d{4})')
+
+def _sem_acento(texto):
+    return ''.join(c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c))
+
+def normalizar_placa(placa):
+    return re.sub(r'[^A-Z0-9]', '', str(placa or '').upper())
+
+def normalizar_valor(texto):
+    """ 'R$ 1.234,56', '1234,56' ou '1234.56' -> '1234.56'; None se não for número. """
+    texto = str(texto or '').replace('R$', '').replace(' ', '').strip()
+    if ',' in texto:
+        texto = texto.replace('.', '').replace(',', '.')
+    try:
+        return f"{float(texto):.2f}"
+    except ValueError:
+        return None
+
+def normalizar_hodometro(texto):
+    digitos = re.sub(r'\D', '', str(texto or '').split(',')[0])
+    return str(int(digitos)) if digitos else None
+
+def chave_indice(placa, data, hodometro, valor):
+    """ Chave de comparação entre a planilha e a listagem do portal. """
+    encontrada = _PADRAO_DATA.search(str(data or ''))
+    return (
+        normalizar_placa(placa),
+        encontrada.group(0) if encontrada else None,
+        normalizar_hodometro(hodometro),
+        normalizar_valor(valor),
+    )
+
+def chave_transacao(placa, transacao):
+    """ Chave de uma transação da planilha, comparável às linhas da listagem. """
+    return chave_indice(placa, transacao.get('data'), transacao.get('hodometro_abastecimento'),
+                        transacao.get('valor_total'))
+
+class _LeitorTabela(HTMLParser):
+    """ Extrai as linhas (texto de cada célula) de todas as tabelas da página. """
+
+    def __init__(self):
+        super().__init__()
+        self.linhas = []
+        self._linha = None
+        self._celula = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'tr':
+            self._linha = []
+        elif tag in ('td', 'th') and self._linha is not None:
+            self._celula = []
+
+    def handle_endtag(self, tag):
+        if tag in ('td', 'th') and self._celula is not None:
+            self._linha.append(' '.join(''.join(self._celula).split()))
+            self._celula = None
+        elif tag == 'tr' and self._linha is not None:
+            if self._linha:
+                self.linhas.append(self._linha)
+            self._linha = None
+
+    def handle_data(self, data):
+        if self._celula is not None:
+            self._celula.append(data)
+
+def ler_listagem(html):
+    """
+    Lê uma página da listagem e devolve as chaves (placa, data, hodômetro,
+    valor) de cada linha. A tabela é reconhecida pelos cabeçalhos.
+    """
+    leitor = _LeitorTabela()
+    leitor.feed(html)
+    chaves = []
+    colunas = None
+    for linha in leitor.linhas:
+        nomes = [_sem_acento(celula).upper() for celula in linha]
+        mapa = {campo: nomes.index(n) for campo, aceitos in _COLUNAS_LISTAGEM.items()
+                for n in aceitos if n in nomes}
+        if len(mapa) == len(_COLUNAS_LISTAGEM):
+            colunas = mapa
+            continue
+        if colunas and len(linha) > max(colunas.values()):
+            chave = chave_indice(*(linha[colunas[c]] for c in ('placa', 'data', 'hodometro', 'valor')))
+            if all(chave):
+                chaves.append(chave)
+    return chaves
+
+class IndicePortal:
+    """
+    Registros que já existem no portal, lidos uma vez por placa das páginas
+    de listagem (URL_CONSULTA, com {placa} e {pagina}), usando os cookies do
+    navegador logado. Serve para não enviar de novo o que já foi gravado
+    (execução parcial, planilhas com períodos sobrepostos).
+    """
+
+    def __init__(self, url_consulta, timeout=30):
+        self.url_consulta = url_consulta
+        self.timeout = timeout
+        self._chaves_por_placa = {}
+
+    def _sessao_http(self, driver):
+        sessao = requests.Session()
+        sessao.headers.update({'User-Agent': driver.execute_script("return navigator.userAgent;")})
+        for cookie in driver.get_cookies():
+            sessao.cookies.set(cookie['name'], cookie['value'],
+                               domain=cookie.get('domain', ''), path=cookie.get('path', '/'))
+        return sessao
+
+    def carregar(self, driver, placa, logger):
+        """ Lê todas as páginas da listagem da placa (uma vez por execução). """
+        placa = normalizar_placa(placa)
+        if placa in self._chaves_por_placa:
+            return self._chaves_por_placa[placa]
+
+        inicio = time.perf_counter()
+        base = driver.current_url
+        chaves = set()
+        anterior = None
+        lidas = 0
+        with self._sessao_http(driver) as sessao:
+            for pagina in range(1, MAX_PAGINAS + 1):
+                url = urljoin(base, self.url_consulta.format(placa=quote(placa), pagina=pagina))
+                resposta = sessao.get(url, timeout=self.timeout)
+                if resposta.status_code != 200:
+                    raise Exception(f"Listagem do portal respondeu HTTP {resposta.status_code}.")
+                if 'login' in resposta.url.lower() or 'type="password"' in resposta.text:
+                    raise Exception("Sessão expirada ao ler a listagem do portal.")
+                linhas = ler_listagem(resposta.text)
+                if not linhas or linhas == anterior:
+                    break
+                chaves.update(linhas)
+                anterior = linhas
+                lidas += 1
+        logger(f"Listagem do portal: {len(chaves)} linha(s) da placa {placa} "
+               f"em {lidas} página(s), {time.perf_counter() - inicio:.1f}s.")
+        self._chaves_por_placa[placa] = chaves
+        return chaves
+
+    def registrar(self, placa, chave):
+        """
+        Acrescenta ao índice um registro enviado nesta execução: a listagem da
+        placa foi lida antes dele, e outra planilha do lote pode repeti-lo.
+        """
+        chaves = self._chaves_por_placa.get(normalizar_placa(placa))
+        if chaves is not None:
+            chaves.add(chave)
+
+    def filtrar(self, driver, dados_cabecalho, lista_transacoes, logger, diario=None):
+        """
+        Devolve as transações que ainda não existem no portal. Se a listagem
+        não puder ser lida, avisa e devolve a lista inteira (nada é pulado).
+        As já existentes são confirmadas no diário, se houver.
+        """
+        placa = dados_cabecalho.get('placa')
+        try:
+            existentes = self.carregar(driver, placa, logger)
+        except Exception as e:
+            logger(f"AVISO: Não foi possível ler a listagem do portal ({e}). Enviando sem conferir duplicados.")
+            return lista_transacoes
+
+        restantes = []
+        for i, transacao in enumerate(lista_transacoes):
+            chave = chave_transacao(placa, transacao)
+            if chave in existentes:
+                logger(f"Registro {i+1} ({transacao.get('data')}, hodômetro {transacao.get('hodometro_abastecimento')}) "
+                       f"já existe no portal. Pulando.")
+                if diario:
+                    diario.marcar(diario_envios.chave_registro({**dados_cabecalho, **transacao}),
+                                  diario_envios.CONFIRMADO, detalhe="já existia no portal")
+                continue
+            restantes.append(transacao)
+
+        puladas = len(lista_transacoes) - len(restantes)
+        if puladas:
+            logger(f"Conferência com o portal: {puladas} registro(s) já existentes, {len(restantes)} a enviar.")
+        return restantes
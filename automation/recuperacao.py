@@ -0,0 +1,151 @@
+from selenium.common.exceptions import (
+    NoAlertPresentException, NoSuchWindowException, TimeoutException, WebDriverException,
+)
+import automation.core_functions as core
+import automation.esperas as esperas
+import automation.localizadores as localizadores
+
+# Estados da página identificados após uma falha
+NAVEGADOR_FECHADO = 'navegador_fechado'
+CONTEXTO_PERDIDO = 'contexto_perdido'
+SESSAO_EXPIRADA = 'sessao_expirada'
+MODAL_ABERTO = 'modal_aberto'
+FORMULARIO_PARCIAL = 'formulario_parcial'
+FORMULARIO_LIMPO = 'formulario_limpo'
+FORA_DO_FORMULARIO = 'fora_do_formulario'
+
+_JS_ESTADO_PAGINA = """
+var nomes = arguments[0];
+var lov = document.getElementById('lov');
+var modal = false;
+if (lov) {
+    var estilo = window.getComputedStyle(lov);
+    modal = estilo.display !== 'none' && estilo.visibility !== 'hidden';
+}
+// Uma linha de produto extra ('Incluir novo') também conta como preenchimento
+var preenchido = document.getElementsByName(arguments[1]).length > 1;
+for (var i = 0; i < nomes.length; i++) {
+    var campos = document.getElementsByName(nomes[i]);
+    for (var j = 0; j < campos.length; j++) {
+        if (!campos[j].closest('#lov') && campos[j].value) { preenchido = true; }
+    }
+}
+return {
+    senha: !!document.querySelector("input[type='password']"),
+    modal: modal,
+    formulario: document.getElementsByName(nomes[0]).length > 0,
+    preenchido: preenchido
+};
+"""
+
+_JS_FECHAR_MODAL = """
+var lov = document.getElementById('lov');
+if (window.jQuery && window.jQuery.fn.jqmHide) { window.jQuery('#lov').jqmHide(); }
+else if (lov) { lov.style.display = 'none'; }
+var sobreposicoes = document.querySelectorAll('.jqmOverlay');
+for (var i = 0; i < sobreposicoes.length; i++) { sobreposicoes[i].remove(); }
+"""
+
+# Campos digitados pelo robô (o primeiro também indica que o formulário está aberto)
+_CAMPOS_FORMULARIO = [core.LOCATORS[chave][1] for chave in (
+    'cliente_codigo', 'contrato_informe', 'motorista_nome', 'motorista_matricula',
+    'destino', 'data', 'hora', 'hodometro_abastecimento', 'select_produto', 'litros', 'valor_total',
+)]
+
+class SessaoIrrecuperavel(Exception):
+    """ O navegador não pode mais enviar registros (fechado, sessão expirada sem novo login...). """
+
+class EnvioIncerto(Exception):
+    """ A falha ocorreu durante o envio: o registro pode ter sido gravado, então não é repetido. """
+
+def _aceitar_alerta(driver, logger):
+    try:
+        alerta = driver.switch_to.alert
+        logger(f"Alerta do portal fechado: {alerta.text}")
+        alerta.accept()
+    except NoAlertPresentException:
+        pass
+
+def classificar_estado(driver):
+    """ Identifica em que estado a página ficou após uma falha. """
+    try:
+        estado = driver.execute_script(_JS_ESTADO_PAGINA, _CAMPOS_FORMULARIO, core.LOCATORS['select_produto'][1])
+    except NoSuchWindowException:
+        return NAVEGADOR_FECHADO
+    except WebDriverException:
+        # O frame atual deixou de existir (página recarregada ou redirecionada)
+        try:
+            driver.switch_to.default_content()
+        except WebDriverException:
+            return NAVEGADOR_FECHADO
+        return CONTEXTO_PERDIDO
+
+    if estado['senha']:
+        return SESSAO_EXPIRADA
+    if estado['modal']:
+        return MODAL_ABERTO
+    if estado['formulario']:
+        return FORMULARIO_PARCIAL if estado['preenchido'] else FORMULARIO_LIMPO
+    return FORA_DO_FORMULARIO
+
+def recuperar(driver, wait, logger, reautenticar=None):
+    """
+    Leva a página de volta ao formulário de inclusão vazio, conforme o estado
+    em que a falha a deixou. Lança SessaoIrrecuperavel se não for possível.
+    """
+    # A falha pode ter deixado o formulário obsoleto ou trocado
+    localizadores.invalidar(driver)
+    for _ in range(6):
+        try:
+            _aceitar_alerta(driver, logger)
+        except WebDriverException:
+            raise SessaoIrrecuperavel("O navegador não responde mais.")
+
+        estado = classificar_estado(driver)
+        logger(f"Recuperação: estado da página '{estado}'.")
+
+        if estado == NAVEGADOR_FECHADO:
+            raise SessaoIrrecuperavel("O navegador foi fechado.")
+        if estado == FORMULARIO_LIMPO:
+            return
+        if estado == CONTEXTO_PERDIDO:
+            continue
+        if estado == MODAL_ABERTO:
+            driver.execute_script(_JS_FECHAR_MODAL)
+            try:
+                esperas.aguardar_modal(driver, visivel=False, timeout=10)
+            except TimeoutException:
+                pass
+            continue
+        if estado == SESSAO_EXPIRADA:
+            if not reautenticar:
+                raise SessaoIrrecuperavel("A sessão do portal expirou.")
+            reautenticar()
+            ok = core.garantir_formulario(driver, wait, logger)
+        else:
+            # Formulário meio preenchido (ou fora dele): reabre pelos menus
+            ok = core.garantir_formulario(driver, wait, logger, recarregar=(estado == FORMULARIO_PARCIAL))
+        if not ok:
+            raise SessaoIrrecuperavel("Não foi possível voltar ao formulário de inclusão.")
+
+    raise SessaoIrrecuperavel("A página não voltou a um estado conhecido.")
+
+def enviar_com_recuperacao(enviar, driver, wait, logger, max_tentativas, reautenticar=None):
+    """
+    Executa enviar() com até max_tentativas tentativas. A cada falha a página
+    é recuperada antes de tentar de novo. Falhas durante o envio (EnvioIncerto)
+    não são repetidas, para não duplicar o registro no portal.
+    Lança a última exceção se o registro não puder ser enviado.
+    """
+    for tentativa in range(1, max(1, max_tentativas) + 1):
+        try:
+            return enviar()
+        except SessaoIrrecuperavel:
+            raise
+        except Exception as e:
+            erro = e
+            logger(f"Falha na tentativa {tentativa} de {max_tentativas}: {e}")
+        recuperar(driver, wait, logger, reautenticar)
+        if isinstance(erro, EnvioIncerto):
+            break
+    raise erro
@@ -0,0 +1,125 @@
+import json
+import os
+import time
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+
+# Campos aceitos por driver.add_cookie (get_cookies pode devolver chaves extras)
+_CAMPOS_COOKIE = ('name', 'value', 'path', 'domain', 'secure', 'httpOnly', 'expiry', 'sameSite')
+
+def injetar_cookies(driver, url, cookies, logger):
+    """
+    Abre a URL com os cookies informados no lugar dos atuais. O navegador só
+    aceita cookies do domínio da página aberta, por isso a URL é carregada
+    antes (e de novo depois, já autenticada).
+    """
+    driver.get(url)
+    driver.delete_all_cookies()
+    for cookie in cookies:
+        try:
+            driver.add_cookie({k: v for k, v in cookie.items() if k in _CAMPOS_COOKIE})
+        except Exception as e:
+            logger(f"AVISO: Cookie '{cookie.get('name')}' não pôde ser copiado: {e}")
+    driver.get(url)
+
+def sessao_valida(driver):
+    """
+    Confere se o navegador está logado: a página principal do portal tem o
+    frame 'content' e nenhum campo de senha (nem nela, nem dentro do frame).
+    Deixa o driver no documento principal.
+    """
+    try:
+        driver.switch_to.default_content()
+        if driver.find_elements(By.CSS_SELECTOR, "input[type='password']"):
+            return False
+        frames = driver.find_elements(By.NAME, "content")
+        if not frames:
+            return False
+        driver.switch_to.frame(frames[0])
+        sem_senha = not driver.find_elements(By.CSS_SELECTOR, "input[type='password']")
+        driver.switch_to.default_content()
+        return sem_senha
+    except WebDriverException:
+        return False
+
+class ArmazemSessao:
+    """
+    Guarda em disco a sessão autenticada do portal (URL da página principal
+    e cookies) após um login manual bem-sucedido, para que a próxima execução
+    a restaure e só peça o login (CAPTCHA) quando ela tiver expirado.
+    O arquivo dá acesso ao portal: fica apenas na máquina do usuário.
+    """
+
+    def __init__(self, caminho, url_login):
+        self.caminho = caminho
+        self.url_login = url_login
+
+    def _ler(self):
+        try:
+            with open(self.caminho, encoding='utf-8') as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Sessão de outro portal (URL_LOGIN alterada no .env) não serve
+        if not isinstance(dados, dict) or dados.get('url_login') != self.url_login:
+            return None
+        return dados
+
+    def salvar(self, driver, logger):
+        """ Grava a sessão atual, se o navegador estiver de fato logado. """
+        if not sessao_valida(driver):
+            return False
+        dados = {
+            'url_login': self.url_login,
+            'url_sessao': driver.current_url,
+            'cookies': driver.get_cookies(),
+            'salvo_em': time.time(),
+        }
+        try:
+            # Grava em um arquivo temporário e troca: uma execução interrompida não corrompe a sessão
+            temporario = f"{self.caminho}.tmp"
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(dados, f)
+            try:
+                os.chmod(temporario, 0o600)
+            except OSError:
+                pass
+            os.replace(temporario, self.caminho)
+        except OSError as e:
+            logger(f"AVISO: Não foi possível salvar a sessão do portal: {e}")
+            return False
+        logger("Sessão do portal salva para as próximas execuções.")
+        return True
+
+    def restaurar(self, driver, logger):
+        """
+        Carrega os cookies salvos no navegador e confere se a sessão ainda vale.
+        Retorna True se o login manual pode ser dispensado.
+        """
+        dados = self._ler()
+        if not dados:
+            return False
+        agora = time.time()
+        cookies = [c for c in dados.get('cookies', []) if c.get('expiry') is None or c['expiry'] > agora]
+        if not cookies:
+            logger("A sessão salva expirou.")
+            self.apagar()
+            return False
+
+        logger("Restaurando a sessão salva do portal...")
+        try:
+            injetar_cookies(driver, dados['url_sessao'], cookies, logger)
+        except WebDriverException as e:
+            logger(f"AVISO: Não foi possível restaurar a sessão salva: {e.msg}")
+            return False
+        if not sessao_valida(driver):
+            logger("A sessão salva expirou no portal. Será necessário fazer o login.")
+            self.apagar()
+            return False
+        return True
+
+    def apagar(self):
+        try:
+            os.remove(self.caminho)
+        except OSError:
+            pass
@@ -0,0 +1,241 @@
+import json
+import math
+import threading
+import time
+from datetime import datetime
+
+# Ordem de exibição das fases no resumo (as demais vêm em seguida)
+ORDEM_FASES = ('registro', 'preenchimento', 'placa', 'envio', 'espera_pos_envio', 'envio_http')
+
+def percentil(valores, p):
+    """ Percentil pelo método do posto mais próximo (valores não vazios). """
+    ordenados = sorted(valores)
+    posicao = max(0, min(len(ordenados) - 1, math.ceil(p / 100 * len(ordenados)) - 1))
+    return ordenados[posicao]
+
+def _p95(valores):
+    return percentil(valores, 95)
+
+class _Span:
+    """ Uma fase em andamento; anotar() acrescenta campos à linha do JSONL. """
+    __slots__ = ('extras',)
+
+    def __init__(self):
+        self.extras = {}
+
+    def anotar(self, **extras):
+        self.extras.update(extras)
+
+class _Fase:
+    """ Fase cronometrada; o tempo das fases internas (ex.: 'placa' dentro de 'preenchimento') é descontado. """
+    __slots__ = ('_telemetria', '_nome', '_span', '_inicio', '_internas')
+
+    def __init__(self, telemetria, nome):
+        self._telemetria = telemetria
+        self._nome = nome
+        self._span = _Span()
+
+    def __enter__(self):
+        self._internas = 0.0
+        self._telemetria._fases_abertas().append(self)
+        self._inicio = time.perf_counter()
+        return self._span
+
+    def __exit__(self, tipo_erro, erro, traceback):
+        duracao = time.perf_counter() - self._inicio
+        abertas = self._telemetria._fases_abertas()
+        abertas.pop()
+        if abertas:
+            abertas[-1]._internas += duracao
+        self._telemetria._registrar(self._nome, self._duracao_propria(duracao), 'erro' if tipo_erro else 'ok',
+                                    self._span.extras)
+        return False
+
+    def _duracao_propria(self, duracao):
+        return duracao - self._internas
+
+class _Registro(_Fase):
+    """ Fase 'registro': define o arquivo/índice das fases internas da mesma thread. """
+    __slots__ = ('_arquivo', '_indice')
+
+    def __init__(self, telemetria, arquivo, indice):
+        super().__init__(telemetria, 'registro')
+        self._arquivo = arquivo
+        self._indice = indice
+
+    def __enter__(self):
+        local = self._telemetria._local
+        local.arquivo, local.indice = self._arquivo, self._indice
+        self._telemetria._marcar_inicio()
+        return super().__enter__()
+
+    def __exit__(self, tipo_erro, erro, traceback):
+        super().__exit__(tipo_erro, erro, traceback)
+        local = self._telemetria._local
+        local.arquivo = local.indice = None
+        self._telemetria._concluir_registro()
+        return False
+
+    def _duracao_propria(self, duracao):
+        # O registro é o total: a soma das fases internas mais o tempo fora delas
+        return duracao
+
+class Telemetria:
+    """
+    Mede fases nomeadas de cada registro (placa, preenchimento, envio, espera
+    após o envio) e grava uma linha JSON por fase, com arquivo, índice do
+    registro e resultado. Uma fase dentro de outra não é contada duas vezes:
+    a de fora registra só o próprio tempo, e a soma das fases de um registro
+    não passa da duração da fase 'registro'. Mantém em memória as durações
+    para o resumo ao vivo.
+    """
+
+    ativa = True
+
+    def __init__(self, caminho_jsonl=None):
+        self.caminho_jsonl = caminho_jsonl
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._arquivo_saida = open(caminho_jsonl, 'a', encoding='utf-8') if caminho_jsonl else None
+        self._duracoes = {}
+        self._inicio = None
+        self.previstos = 0
+        self.concluidos = 0
+
+    def fase(self, nome):
+        return _Fase(self, nome)
+
+    def _fases_abertas(self):
+        """ Fases em andamento na thread atual, da mais externa à mais interna. """
+        abertas = getattr(self._local, 'fases', None)
+        if abertas is None:
+            abertas = self._local.fases = []
+        return abertas
+
+    def registro(self, arquivo, indice):
+        return _Registro(self, arquivo, indice)
+
+    def adicionar_previstos(self, quantidade):
+        with self._lock:
+            self.previstos += quantidade
+
+    def _marcar_inicio(self):
+        if self._inicio is None:
+            self._inicio = time.perf_counter()
+
+    def _concluir_registro(self):
+        with self._lock:
+            self.concluidos += 1
+
+    def _registrar(self, nome, duracao, resultado, extras):
+        linha = None
+        if self._arquivo_saida:
+            linha = json.dumps({
+                'ts': datetime.now().isoformat(timespec='milliseconds'),
+                'fase': nome,
+                'arquivo': getattr(self._local, 'arquivo', None),
+                'registro': getattr(self._local, 'indice', None),
+                'duracao_ms': round(duracao * 1000, 2),
+                'resultado': resultado,
+                **extras,
+            }, ensure_ascii=False)
+        with self._lock:
+            self._duracoes.setdefault(nome, []).append(duracao)
+            if linha:
+                self._arquivo_saida.write(linha + "\n")
+                self._arquivo_saida.flush()
+
+    def resumo(self):
+        """ Retorna {fase: (quantidade, média, p95)} em segundos. """
+        with self._lock:
+            duracoes = {nome: list(valores) for nome, valores in self._duracoes.items()}
+        return {nome: (len(v), sum(v) / len(v), _p95(v)) for nome, v in duracoes.items()}
+
+    def eta(self):
+        """ Segundos estimados para os registros restantes, pela vazão observada até aqui. """
+        with self._lock:
+            concluidos, restantes = self.concluidos, self.previstos - self.concluidos
+        if not concluidos or self._inicio is None or restantes <= 0:
+            return None
+        return (time.perf_counter() - self._inicio) / concluidos * restantes
+
+    def texto_resumo(self):
+        resumo = self.resumo()
+        if not resumo:
+            return "Aguardando o primeiro registro..."
+        nomes = [n for n in ORDEM_FASES if n in resumo] + sorted(n for n in resumo if n not in ORDEM_FASES)
+        linhas = [f"{nome:<17} média {resumo[nome][1]:6.2f}s  p95 {resumo[nome][2]:6.2f}s  ({resumo[nome][0]}x)"
+                  for nome in nomes]
+        eta = self.eta()
+        progresso = f"Registros: {self.concluidos} de {self.previstos}"
+        if eta is not None:
+            minutos, segundos = divmod(int(eta), 60)
+            progresso += f"  |  ETA: {minutos}min {segundos:02d}s"
+        return "\n".join([progresso] + linhas)
+
+    def encerrar(self):
+        with self._lock:
+            if self._arquivo_saida:
+                self._arquivo_saida.close()
+                self._arquivo_saida = None
+
+class _FaseNula:
+    __slots__ = ()
+
+    def __enter__(self):
+        return _SPAN_NULO
+
+    def __exit__(self, tipo_erro, erro, traceback):
+        return False
+
+class _SpanNulo:
+    __slots__ = ()
+
+    def anotar(self, **extras):
+        pass
+
+_SPAN_NULO = _SpanNulo()
+_FASE_NULA = _FaseNula()
+
+class _TelemetriaNula:
+    """ Telemetria desativada: todas as operações são no-ops baratos. """
+
+    ativa = False
+    previstos = concluidos = 0
+
+    def fase(self, nome):
+        return _FASE_NULA
+
+    def registro(self, arquivo, indice):
+        return _FASE_NULA
+
+    def adicionar_previstos(self, quantidade):
+        pass
+
+    def resumo(self):
+        return {}
+
+    def eta(self):
+        return None
+
+    def texto_resumo(self):
+        return "Telemetria desativada."
+
+    def encerrar(self):
+        pass
+
+# Instância em uso pela execução atual (desativada por padrão)
+atual = _TelemetriaNula()
+
+def iniciar(caminho_jsonl):
+    """ Ativa a telemetria para a próxima execução. Caminho vazio desativa. """
+    global atual
+    atual.encerrar()
+    atual = Telemetria(caminho_jsonl) if caminho_jsonl else _TelemetriaNula()
+    return atual
+
+def fase(nome):
+    return atual.fase(nome)
+
+def registro(arquivo, indice):
+    return atual.registro(arquivo, indice)
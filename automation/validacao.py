@@ -0,0 +1,148 @@
+import re
+import time
+from datetime import datetime
+
+# Campos do cabeçalho lidos no preenchimento (dados_combinados[...])
+CAMPOS_CABECALHO_OBRIGATORIOS = ('nome', 'matricula', 'placa', 'destino')
+
+# Placa no padrão antigo (ABC1234) ou Mercosul (ABC1D23)
+_PADRAO_PLACA = re.compile(r'^[A-Z]{3}\d[A-Z0-9]\d{2}$')
+_PADRAO_NUMERO = re.compile(r'^\d+(?:\.\d+)?$')
+
+# Acima disso o registro é enviado, mas com aviso
+LITROS_MAXIMO = 1500
+
+class RelatorioValidacao:
+    """
+    Resultado da validação de uma planilha. Erros impedem o envio;
+    avisos apenas chamam a atenção para valores suspeitos.
+    Cada item é (registro, campo, mensagem); registro None é o cabeçalho.
+    """
+
+    def __init__(self):
+        self.erros = []
+        self.avisos = []
+        self.duracao = 0.0
+
+    @property
+    def valido(self):
+        return not self.erros
+
+    def erro(self, registro, campo, mensagem):
+        self.erros.append((registro, campo, mensagem))
+
+    def aviso(self, registro, campo, mensagem):
+        self.avisos.append((registro, campo, mensagem))
+
+    @staticmethod
+    def _formatar(item):
+        registro, campo, mensagem = item
+        local = "Cabeçalho" if registro is None else f"Registro {registro}"
+        return f"{local} ({campo}): {mensagem}"
+
+    def linhas(self):
+        return ([f"ERRO - {self._formatar(item)}" for item in self.erros] +
+                [f"AVISO - {self._formatar(item)}" for item in self.avisos])
+
+    def como_dicionario(self):
+        """ Versão serializável (relatório JSON da linha de comando). """
+        return {
+            'valido': self.valido,
+            'erros': [self._formatar(item) for item in self.erros],
+            'avisos': [self._formatar(item) for item in self.avisos],
+        }
+
+    def mensagem_erro(self):
+        """ Motivo para não enviar a planilha, ou None se ela é válida. """
+        if self.valido:
+            return None
+        return f"A planilha tem {len(self.erros)} erro(s) de validação. Corrija-a e tente novamente."
+
+    def registrar(self, logger):
+        for linha in self.linhas():
+            logger(linha)
+        logger(f"Validação: {len(self.erros)} erro(s), {len(self.avisos)} aviso(s) "
+               f"em {self.duracao * 1000:.1f} ms.")
+
+def _numero(relatorio, registro, campo, valor, positivo=True):
+    """ Confere um número já normalizado pela extração ('123.45'). Retorna o float ou None. """
+    texto = str(valor).strip() if valor is not None else ""
+    if not _PADRAO_NUMERO.match(texto):
+        relatorio.erro(registro, campo, f"valor não numérico: '{valor}'")
+        return None
+    numero = float(texto)
+    if positivo and numero <= 0:
+        relatorio.erro(registro, campo, f"deve ser maior que zero (recebido {texto})")
+    return numero
+
+def _validar_cabecalho(relatorio, dados_cabecalho):
+    for campo in CAMPOS_CABECALHO_OBRIGATORIOS:
+        if not str(dados_cabecalho.get(campo) or "").strip():
+            relatorio.erro(None, campo, "campo obrigatório ausente no cabeçalho da planilha")
+
+    matricula = str(dados_cabecalho.get('matricula') or "")
+    if matricula and not matricula.isdigit():
+        relatorio.erro(None, 'matricula', f"deve conter apenas dígitos (recebido '{matricula}')")
+
+    placa = str(dados_cabecalho.get('placa') or "").strip().upper().replace('-', '')
+    if placa and not _PADRAO_PLACA.match(placa):
+        relatorio.aviso(None, 'placa', f"formato incomum '{dados_cabecalho['placa']}' (a busca no portal pode falhar)")
+
+def validar_planilha(dados_cabecalho, lista_transacoes, hoje=None):
+    """
+    Confere, em uma única passada e sem abrir o navegador, o resultado de
+    extrair_dados_planilha: cabeçalho, tipos e faixas de cada registro,
+    hodômetro crescente em ordem de data, linhas duplicadas e aditivos que
+    não puderam ser interpretados. Retorna um RelatorioValidacao.
+    """
+    inicio = time.perf_counter()
+    relatorio = RelatorioValidacao()
+    hoje = hoje or datetime.now()
+
+    _validar_cabecalho(relatorio, dados_cabecalho or {})
+    if not lista_transacoes:
+        relatorio.erro(None, 'transacoes', "nenhuma transação encontrada na tabela")
+
+    vistos = {}
+    leituras_hodometro = []
+    for n, transacao in enumerate(lista_transacoes or [], 1):
+        data = None
+        try:
+            data = datetime.strptime(transacao.get('data') or "", '%d/%m/%Y')
+        except ValueError:
+            relatorio.erro(n, 'data', f"data inválida: '{transacao.get('data')}'")
+        if data and data > hoje:
+            relatorio.erro(n, 'data', f"data no futuro: {transacao['data']}")
+
+        hodometro = str(transacao.get('hodometro_abastecimento') or "")
+        if not hodometro.isdigit() or int(hodometro) <= 0:
+            relatorio.erro(n, 'hodometro_abastecimento', f"hodômetro inválido: '{hodometro}'")
+        elif data:
+            leituras_hodometro.append((data, n, int(hodometro)))
+
+        _numero(relatorio, n, 'valor_total', transacao.get('valor_total'))
+        litros = _numero(relatorio, n, 'litros', transacao.get('litros'))
+        if litros and litros > LITROS_MAXIMO:
+            relatorio.aviso(n, 'litros', f"{litros:g} litros em um único abastecimento")
+
+        if transacao.get('erro_aditivo'):
+            relatorio.erro(n, 'aditivo', f"valor do aditivo não interpretado: '{transacao['erro_aditivo']}'")
+        aditivo = transacao.get('aditivo')
+        if aditivo:
+            _numero(relatorio, n, 'aditivo', aditivo.get('valor'))
+
+        chave = (transacao.get('data'), hodometro, transacao.get('valor_total'), transacao.get('litros'))
+        if chave in vistos:
+            relatorio.erro(n, 'duplicado', f"mesma data, hodômetro, valor e litros do registro {vistos[chave]}")
+        else:
+            vistos[chave] = n
+
+    # O hodômetro não pode voltar quando os registros são postos em ordem de data
+    leituras_hodometro.sort()
+    for (_, n_ant, km_ant), (_, n, km) in zip(leituras_hodometro, leituras_hodometro[1:]):
+        if km < km_ant:
+            relatorio.erro(n, 'hodometro_abastecimento',
+                           f"hodômetro {km} menor que {km_ant}, do registro {n_ant} (data anterior ou igual)")
+
+    relatorio.duracao = time.perf_counter() - inicio
+    return relatorio
@@ -0,0 +1,62 @@
+"""
+Mede a vazão do modo paralelo (run_automation_flow com N sessões)
+contra o portal simulado. Requer Google Chrome instalado.
+
+Uso:
+    python -m benchmarks.bench_paralelo --registros 12 --workers 1 2 4 --latencia 0.2
+    python -m benchmarks.bench_paralelo --modo-envio http
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import automation.controller as controller
+from automation.opcoes import OpcoesExecucao
+from benchmarks import portal_simulado
+from benchmarks.planilha_sintetica import gerar_planilha
+
+def executar(caminho_planilha, num_workers, latencia, modo_envio="navegador"):
+    servidor, portal, url_base = portal_simulado.iniciar(latencia=latencia)
+    os.environ["URL_LOGIN"] = f"{url_base}/login?auto=1"
+    resultado = {}
+
+    def callback_final(sucesso, erro):
+        resultado['sucesso'] = sucesso
+        resultado['erro'] = erro
+
+    try:
+        inicio = time.perf_counter()
+        controller.run_automation_flow(
+            caminho_planilha,
+            lambda mensagem: None,
+            lambda: None,
+            callback_final,
+            # Sem diário, sessão, telemetria ou catálogo em disco: cada execução envia todos os registros
+            OpcoesExecucao(num_workers=num_workers, modo_envio=modo_envio, caminho_diario="", caminho_sessao="",
+                           caminho_telemetria="", caminho_catalogo="", espera_ao_fechar=0),
+        )
+        duracao = time.perf_counter() - inicio
+    finally:
+        servidor.shutdown()
+    return duracao, len(portal.registros), resultado
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do modo paralelo")
+    parser.add_argument('--registros', type=int, default=12)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--latencia', type=float, default=0.2)
+    parser.add_argument('--modo-envio', choices=['navegador', 'http'], default='navegador')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = gerar_planilha(os.path.join(pasta, "bench.xlsx"), args.registros)
+        print(f"{'sessões':>8} {'gravados':>9} {'tempo (s)':>10} {'reg/min':>8}")
+        for n in args.workers:
+            duracao, gravados, resultado = executar(caminho, n, args.latencia, args.modo_envio)
+            print(f"{n:>8} {gravados:>9} {duracao:>10.1f} {gravados / duracao * 60:>8.1f}")
+            if not resultado.get('sucesso'):
+                print(f"         falha: {resultado.get('erro')}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Benchmarks offline da automação: leitura de planilha e fluxo completo de
+envio contra o portal simulado (benchmarks/portal_simulado.py).
+
+Relata a latência por registro (média e percentis) e registros por minuto.
+O fluxo completo requer Google Chrome instalado.
+
+Uso:
+    python -m benchmarks.bench_registros planilha --linhas 5000 --repeticoes 3
+    python -m benchmarks.bench_registros extracao --linhas 50000
+    python -m benchmarks.bench_registros fluxo --registros 20 --latencia 0.1
+    python -m benchmarks.bench_registros fluxo --registros 20 --preenchimento teclado
+    python -m benchmarks.bench_registros recarga --recargas 20 --latencia 0.1
+    python -m benchmarks.bench_registros fluxo --registros 40 --sobreposicao 0.5
+"""
+import argparse
+import os
+import re
+import tempfile
+import threading
+import time
+
+from automation.telemetria import percentil
+from benchmarks import portal_simulado
+from benchmarks.planilha_sintetica import gerar_planilha
+
+_INICIO_REGISTRO = re.compile(r"^(?:\[Sessão (\d+)\] )?--- Processando Registro (\d+) de \d+ ---")
+_REGISTRO_HTTP = re.compile(r"^Registro (\d+) de \d+ enviado via HTTP em (\d+) ms")
+_FIM_FLUXO = "--- TODOS OS REGISTROS FORAM PROCESSADOS ---"
+
+def resumir(nome, latencias, duracao_total):
+    """ Imprime média, p50/p90/p95/p99 (ms) e vazão (registros/min). """
+    if not latencias:
+        print(f"{nome}: nenhum registro medido.")
+        return
+    media = sum(latencias) / len(latencias)
+    print(f"{nome}: {len(latencias)} registros em {duracao_total:.2f}s "
+          f"-> {len(latencias) / duracao_total * 60:.1f} registros/min")
+    print(f"  latência por registro (ms): média {media * 1000:.1f} | "
+          + " | ".join(f"p{p} {percentil(latencias, p) * 1000:.1f}" for p in (50, 90, 95, 99)))
+
+class ColetorLatencias:
+    """
+    Logger que marca o horário de cada mensagem e deriva a latência de cada
+    registro: do início de um registro até o início do próximo da mesma sessão
+    (ou o fim do fluxo). No modo HTTP usa o tempo informado no próprio log.
+    """
+
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+        self.latencias = []
+        self._abertos = {}
+        self._primeiro = None
+        self._ultimo = None
+        self._lock = threading.Lock()
+
+    def __call__(self, mensagem):
+        agora = time.perf_counter()
+        if self.verbose:
+            print(mensagem)
+        with self._lock:
+            inicio = _INICIO_REGISTRO.match(mensagem)
+            if inicio:
+                sessao = inicio.group(1) or "1"
+                self._fechar(sessao, agora)
+                self._abertos[sessao] = agora
+                self._primeiro = self._primeiro or agora
+                return
+            http = _REGISTRO_HTTP.match(mensagem)
+            if http:
+                self.latencias.append(int(http.group(2)) / 1000)
+                self._primeiro = self._primeiro or agora
+                self._ultimo = agora
+                return
+            if _FIM_FLUXO in mensagem or "Navegador fechado." in mensagem:
+                for sessao in list(self._abertos):
+                    self._fechar(sessao, agora)
+
+    def _fechar(self, sessao, agora):
+        inicio = self._abertos.pop(sessao, None)
+        if inicio is not None:
+            self.latencias.append(agora - inicio)
+            self._ultimo = agora
+
+    @property
+    def duracao(self):
+        if self._primeiro is None or self._ultimo is None:
+            return 0.0
+        return self._ultimo - self._primeiro
+
+def bench_planilha(linhas, repeticoes):
+    import automation.core_functions as core
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = gerar_planilha(os.path.join(pasta, "bench.xlsx"), linhas)
+        duracoes = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            _, lista_transacoes = core.extrair_dados_planilha(caminho, lambda mensagem: None)
+            duracoes.append(time.perf_counter() - inicio)
+
+    print(f"Leitura de planilha ({linhas} linhas, {repeticoes} repetições)")
+    print(f"  tempo por leitura (s): média {sum(duracoes) / len(duracoes):.3f} | "
+          f"p50 {percentil(duracoes, 50):.3f} | máx {max(duracoes):.3f}")
+    print(f"  {len(lista_transacoes) / percentil(duracoes, 50) * 60:,.0f} registros/min "
+          f"({percentil(duracoes, 50) / len(lista_transacoes) * 1e6:.1f} µs por registro)")
+
+def bench_extracao(linhas, repeticoes):
+    """ Compara a conversão da tabela linha a linha com a conversão vetorizada em bloco. """
+    import automation.core_functions as core
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = gerar_planilha(os.path.join(pasta, "bench.xlsx"), linhas)
+        todas = list(core._iterar_linhas_planilha(caminho))
+
+    nulo = lambda mensagem: None
+    inicio_tabela = next(i for i, row in enumerate(todas) if str(row[0]).strip().upper() == 'DATA')
+    col_map = core._mapear_colunas_tabela(todas[inicio_tabela], nulo)
+    tabela = todas[inicio_tabela + 1:-1]  # sem o cabeçalho e a linha TOTAL
+
+    def linha_a_linha():
+        return [t for t in (core._extrair_transacao(row, col_map, nulo) for row in tabela) if t]
+
+    def vetorizada():
+        transacoes = []
+        for i in range(0, len(tabela), core._TAMANHO_BLOCO_TABELA):
+            transacoes.extend(core._extrair_transacoes_bloco(tabela[i:i + core._TAMANHO_BLOCO_TABELA], col_map, nulo))
+        return transacoes
+
+    if linha_a_linha() != vetorizada():
+        print("ERRO: as duas conversões produziram resultados diferentes.")
+        return
+
+    print(f"Conversão da tabela ({len(tabela)} linhas, {repeticoes} repetições)")
+    medianas = {}
+    for nome, funcao in (("linha a linha", linha_a_linha), ("vetorizada", vetorizada)):
+        duracoes = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao()
+            duracoes.append(time.perf_counter() - inicio)
+        medianas[nome] = percentil(duracoes, 50)
+        print(f"  {nome:<14} p50 {medianas[nome]:.3f}s ({medianas[nome] / len(tabela) * 1e6:.1f} µs por linha)")
+    print(f"  ganho: {medianas['linha a linha'] / medianas['vetorizada']:.1f}x")
+
+def bench_recarga(recargas, latencia, bloquear):
+    """ Tempo de cada recarga do formulário (get + espera de prontidão) no perfil padrão e no enxuto. """
+    import automation.esperas as esperas
+    import automation.navegador as navegador
+
+    servidor, portal, url_base = portal_simulado.iniciar(latencia=latencia)
+    print(f"Recarga do formulário ({recargas} recargas, latência do servidor {latencia * 1000:.0f} ms)")
+    medianas = {}
+    try:
+        for enxuto in (False, True):
+            perfil = navegador.configurar_perfil(enxuto, bloquear)
+            driver = navegador.criar_driver(lambda mensagem: None)
+            try:
+                driver.get(f"{url_base}/login?auto=1")
+                antes = portal.recursos_servidos
+                duracoes = []
+                for _ in range(recargas):
+                    inicio = time.perf_counter()
+                    driver.get(f"{url_base}/inclusao")
+                    esperas.aguardar_rede_ociosa(driver)
+                    duracoes.append(time.perf_counter() - inicio)
+                recursos = (portal.recursos_servidos - antes) / recargas
+            finally:
+                driver.quit()
+            medianas[enxuto] = percentil(duracoes, 50)
+            print(f"  {perfil.descricao():<50} p50 {medianas[enxuto] * 1000:.0f} ms | "
+                  f"p95 {percentil(duracoes, 95) * 1000:.0f} ms | {recursos:.1f} recursos por recarga")
+    finally:
+        navegador.configurar_perfil(False, "")
+        servidor.shutdown()
+    print(f"  ganho por recarga: {(medianas[False] - medianas[True]) * 1000:.0f} ms "
+          f"({medianas[False] / medianas[True]:.1f}x)")
+
+def _semear_portal(portal, caminho, fracao):
+    """ Grava direto no portal simulado a primeira fração das transações da planilha. """
+    import automation.core_functions as core
+
+    dados_cabecalho, lista_transacoes = core.extrair_dados_planilha(caminho, lambda mensagem: None)
+    semeados = lista_transacoes[:int(len(lista_transacoes) * fracao)]
+    for transacao in semeados:
+        linhas = [("72", transacao['valor_total'], transacao['litros'])]
+        if transacao.get('aditivo'):
+            linhas.append(("85", transacao['aditivo']['valor'], transacao['aditivo']['litros']))
+        produtos, valores, litros = (list(coluna) for coluna in zip(*linhas))
+        portal.registros.append({
+            'p_nr_placa_veiculo': dados_cabecalho['placa'],
+            'p_dt_especifica': transacao['data'],
+            'p_hr_especifica': transacao['hora_para_preencher'],
+            'p_nr_km_veiculo': transacao['hodometro_abastecimento'],
+            'p_id_produto_servico': produtos if len(linhas) > 1 else produtos[0],
+            'p_vl_produto': valores if len(linhas) > 1 else valores[0],
+            'p_qt_produto_utilizado': litros if len(linhas) > 1 else litros[0],
+        })
+    return len(semeados)
+
+def bench_fluxo(registros, latencia, workers, modo_envio, preenchimento, verbose, enxuto=False, sobreposicao=0.0):
+    import automation.controller as controller
+    from automation.opcoes import OpcoesExecucao
+
+    servidor, portal, url_base = portal_simulado.iniciar(latencia=latencia)
+    os.environ["URL_LOGIN"] = f"{url_base}/login?auto=1"
+    coletor = ColetorLatencias(verbose)
+    resultado = {}
+
+    def callback_final(sucesso, erro):
+        resultado['sucesso'] = sucesso
+        resultado['erro'] = erro
+
+    opcoes = OpcoesExecucao(
+        num_workers=workers,
+        modo_envio=modo_envio,
+        modo_preenchimento=preenchimento,
+        # Nada gravado no diretório de quem roda o benchmark, e sem a espera de 10 s antes de fechar
+        caminho_diario="",
+        caminho_sessao="",
+        caminho_telemetria="",
+        caminho_catalogo="",
+        manter_navegador=False,
+        espera_ao_fechar=0,
+        perfil_enxuto=enxuto,
+        # A conferência com a listagem só é ligada quando há registros já gravados
+        url_consulta="/consulta?p_nr_placa_veiculo={placa}&pagina={pagina}" if sobreposicao else "",
+    )
+    semeados = 0
+    try:
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = gerar_planilha(os.path.join(pasta, "bench.xlsx"), registros)
+            if sobreposicao:
+                semeados = _semear_portal(portal, caminho, sobreposicao)
+            inicio = time.perf_counter()
+            controller.run_automation_flow(caminho, coletor, lambda: None, callback_final, opcoes)
+            duracao_total = time.perf_counter() - inicio
+    finally:
+        servidor.shutdown()
+
+    print(f"Fluxo completo (latência do servidor {latencia * 1000:.0f} ms, {workers} sessão(ões), "
+          f"envio '{modo_envio}', preenchimento '{preenchimento}', navegador {'enxuto' if enxuto else 'padrão'})")
+    if semeados:
+        print(f"  já existentes no portal antes da execução: {semeados} ({sobreposicao:.0%})")
+    print(f"  gravados no portal: {len(portal.registros) - semeados} de {registros - semeados} a enviar")
+    print(f"  tempo total da execução (inclui login e leitura da listagem): {duracao_total:.1f}s")
+    if not resultado.get('sucesso'):
+        print(f"  falha: {resultado.get('erro')}")
+    resumir("  envio", coletor.latencias, coletor.duracao)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks offline da automação Valeshop")
+    sub = parser.add_subparsers(dest='alvo', required=True)
+
+    p_planilha = sub.add_parser('planilha', help="Leitura da planilha")
+    p_planilha.add_argument('--linhas', type=int, default=5000)
+    p_planilha.add_argument('--repeticoes', type=int, default=3)
+
+    p_extracao = sub.add_parser('extracao', help="Conversão da tabela: linha a linha x vetorizada")
+    p_extracao.add_argument('--linhas', type=int, default=50000)
+    p_extracao.add_argument('--repeticoes', type=int, default=3)
+
+    p_fluxo = sub.add_parser('fluxo', help="Fluxo completo contra o portal simulado")
+    p_fluxo.add_argument('--registros', type=int, default=20)
+    p_fluxo.add_argument('--latencia', type=float, default=0.1, help="Atraso do servidor por requisição (s)")
+    p_fluxo.add_argument('--workers', type=int, default=1)
+    p_fluxo.add_argument('--modo-envio', choices=['navegador', 'http'], default='navegador')
+    p_fluxo.add_argument('--preenchimento', choices=['js', 'teclado'], default='js')
+    p_fluxo.add_argument('--enxuto', action='store_true', help="Perfil enxuto do navegador")
+    p_fluxo.add_argument('--sobreposicao', type=float, default=0.0,
+                         help="Fração dos registros já gravados no portal antes do envio (0 a 1)")
+    p_fluxo.add_argument('--verbose', action='store_true', help="Mostra o log da automação")
+
+    p_recarga = sub.add_parser('recarga', help="Recarga do formulário: perfil padrão x enxuto")
+    p_recarga.add_argument('--recargas', type=int, default=20)
+    p_recarga.add_argument('--latencia', type=float, default=0.1, help="Atraso do servidor por requisição (s)")
+    p_recarga.add_argument('--bloquear', default="imagens,fontes,analytics", help="Grupos bloqueados no perfil enxuto")
+
+    args = parser.parse_args()
+    if args.alvo == 'planilha':
+        bench_planilha(args.linhas, args.repeticoes)
+    elif args.alvo == 'extracao':
+        bench_extracao(args.linhas, args.repeticoes)
+    elif args.alvo == 'recarga':
+        bench_recarga(args.recargas, args.latencia, args.bloquear)
+    else:
+        bench_fluxo(args.registros, args.latencia, args.workers, args.modo_envio,
+                    args.preenchimento, args.verbose, args.enxuto, args.sobreposicao)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Gera planilhas no mesmo layout das exportações recebidas (cabeçalho do
+condutor/veículo seguido da tabela de abastecimentos e da linha 'TOTAL').
+"""
+import random
+from datetime import datetime, timedelta
+from openpyxl import Workbook
+
+def gerar_planilha(caminho, num_linhas, placa="ABC1D23", proporcao_arla=0.3, semente=42):
+    rnd = random.Random(semente)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Abastecimentos")
+
+    ws.append(["CONDUTOR:", "JOÃO DA SILVA"])
+    ws.append(["CPF:", "12345678901"])
+    ws.append(["DESTINO:", "MINA DE CARAJÁS"])
+    ws.append(["VEÍCULO:", "VOLVO FH 540"])
+    ws.append(["PLACA:", placa])
+    ws.append([])
+    ws.append(["DATA", "HODÔMETRO ABASTECIMENTO", "COMBUSTÍVEL", "POSTO", "VALOR (R$)", "LITROS"])
+
+    data = datetime(2024, 1, 1, 8, 0)
+    hodometro = 150000
+    for _ in range(num_linhas):
+        data += timedelta(hours=rnd.randint(6, 30))
+        hodometro += rnd.randint(200, 900)
+        litros = round(rnd.uniform(80, 400), 2)
+        valor_diesel = round(litros * 6.09, 2)
+        if rnd.random() < proporcao_arla:
+            valor_arla = round(rnd.uniform(20, 120), 2)
+            produto = f"Diesel S10 ({valor_diesel:.2f}) + Arla ({valor_arla:.2f})".replace('.', ',')
+            valor = valor_diesel + valor_arla
+        else:
+            produto = "Diesel S10"
+            valor = valor_diesel
+        ws.append([
+            data.strftime('%Y-%m-%d %H:%M:%S'),
+            hodometro,
+            produto,
+            "POSTO CENTRAL",
+            f"{valor:.2f}".replace('.', ','),
+            f"{litros:.2f} L".replace('.', ','),
+        ])
+
+    ws.append(["", "", "", "TOTAL", "", ""])
+    wb.save(caminho)
+    return caminho
@@ -0,0 +1,368 @@
+"""
+Portal Valeshop simulado para testes locais e benchmarks.
+
+Reproduz o suficiente do portal real para que o robô rode sem alterações:
+frames 'content' aninhados, menus CONTROLLER > Veículo > Compras sem cartão >
+Inclusão, o modal jqModal da placa (com o ID 'p_nr_placa_veiculo' duplicado),
+o botão 'Incluir novo', a gravação do formulário de inclusão e a consulta
+paginada das compras gravadas (/consulta?p_nr_placa_veiculo=...&pagina=N).
+As páginas carregam estilo, fonte, imagens e analytics sem cache, como o
+portal real.
+Cada resposta pode ser atrasada (latência configurável) para simular o servidor.
+
+Uso:
+    python -m benchmarks.portal_simulado --porta 8765 --latencia 0.2
+    (URL_LOGIN=http://127.0.0.1:8765/login?auto=1
+     URL_CONSULTA=/consulta?p_nr_placa_veiculo={placa}&pagina={pagina})
+"""
+import argparse
+import secrets
+import threading
+import time
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+CAMPOS_OBRIGATORIOS = [
+    'p_cd_cliente', 'p_nr_contrato', 'p_nm_motorista', 'p_nr_matricula',
+    'p_nr_placa_veiculo', 'p_id_veiculo', 'p_nm_razao_social_cre',
+    'p_dt_especifica', 'p_hr_especifica', 'p_nr_km_veiculo',
+    'p_id_produto_servico', 'p_qt_produto_utilizado', 'p_vl_produto',
+]
+
+PRODUTOS = [
+    ('', 'Selecione'),
+    ('70', 'GASOLINA COMUM'),
+    ('71', 'ETANOL'),
+    ('72', 'DIESEL S10'),
+    ('73', 'DIESEL S500'),
+    ('85', 'ÓLEO ARLA 32'),
+]
+
+_PAGINA = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Valeshop (simulado)</title></head>
+<body>{recursos}{corpo}</body></html>"""
+
+# Como no portal real, cada página carrega de novo (sem cache) folha de estilo,
+# fonte, imagens e um script de analytics
+_RECURSOS = """<link rel="stylesheet" href="/estatico/portal.css">
+<script src="/estatico/analytics.js"></script>
+<img class="logo" src="/estatico/logo.png" alt=""><img class="faixa" src="/estatico/faixa.jpg" alt="">
+"""
+
+_ESTATICOS = {
+    '/estatico/portal.css': ('text/css', (
+        "@font-face { font-family: Portal; src: url(/estatico/portal.woff2) format('woff2'); }\n"
+        "body { font-family: Portal, sans-serif; }\n"
+        "img.logo, img.faixa { display: block; width: 200px; height: 40px; }\n"
+    ).encode('utf-8')),
+    '/estatico/analytics.js': ('application/javascript', b"window.analyticsCarregado = true;\n"),
+    '/estatico/portal.woff2': ('font/woff2', bytes(120 * 1024)),
+    '/estatico/logo.png': ('image/png', bytes(80 * 1024)),
+    '/estatico/faixa.jpg': ('image/jpeg', bytes(250 * 1024)),
+}
+
+_MENU = """
+<a href="#" id="m-veiculo">Veículo</a>
+<div id="sub-veiculo" style="display:none">
+  <a href="#" id="m-compras">Compras sem cartão</a>
+  <div id="sub-compras" style="display:none"><a href="/inclusao">Inclusão</a></div>
+</div>
+<script>
+document.getElementById('m-veiculo').addEventListener('mouseover', function () {
+  setTimeout(function () { document.getElementById('sub-veiculo').style.display = 'block'; }, 50);
+});
+document.getElementById('m-compras').addEventListener('click', function (e) {
+  e.preventDefault();
+  document.getElementById('sub-compras').style.display = 'block';
+});
+</script>
+"""
+
+_FORMULARIO = """
+{mensagem}
+<form method="post" action="/inclusao">
+  Cliente <input name="p_cd_cliente" value="">
+  Contrato <input name="p_nr_contrato" value="">
+  Motorista <input name="p_nm_motorista" value="">
+  Matrícula <input name="p_nr_matricula" value="">
+  Placa <input id="p_nr_placa_veiculo" name="p_nr_placa_veiculo" value="">
+  <input type="hidden" name="p_id_veiculo" value="">
+  <a class="jqModal buscar" href="pkg_compras!lv_placa">Buscar</a>
+  Destino <input name="p_nm_razao_social_cre" value="">
+  Data <input name="p_dt_especifica" value="">
+  Hora <input name="p_hr_especifica" value="">
+  Hodômetro <input name="p_nr_km_veiculo" value="">
+  <input type="hidden" name="p_km_validado" value="">
+  <div id="produtos">
+    <div class="produto">
+      <select name="p_id_produto_servico">{opcoes}</select>
+      Litros <input name="p_qt_produto_utilizado" value="">
+      Valor <input name="p_vl_produto" value="">
+    </div>
+  </div>
+  <button type="button" class="novo">Incluir novo</button>
+  <button type="button" class="gravar">Gravar</button>
+</form>
+
+<div id="lov" class="jqmWindow" style="display:none">
+  Placa <input id="p_nr_placa_veiculo" value="">
+  <button type="button" id="pesquisar">Pesquisar</button>
+  <div id="resultado"></div>
+</div>
+
+<script>
+(function () {{
+  var form = document.forms[0];
+  var lov = document.getElementById('lov');
+
+  // Validação JavaScript do portal: o hodômetro só vale após o evento change
+  form.p_nr_km_veiculo.addEventListener('change', function () {{
+    form.p_km_validado.value = /^\\d+$/.test(this.value) ? '1' : '';
+  }});
+
+  document.querySelector('a.jqModal.buscar').addEventListener('click', function (e) {{
+    e.preventDefault();
+    setTimeout(function () {{ lov.style.display = 'block'; }}, 100);
+  }});
+
+  document.getElementById('pesquisar').addEventListener('click', function () {{
+    var placa = lov.querySelector('input').value;
+    fetch('/lv_placa?p_nr_placa_veiculo=' + encodeURIComponent(placa))
+      .then(function (r) {{ return r.text(); }})
+      .then(function (html) {{ document.getElementById('resultado').innerHTML = html; }});
+  }});
+
+  document.getElementById('resultado').addEventListener('click', function (e) {{
+    var link = e.target.closest('a.retorno');
+    if (!link) return;
+    e.preventDefault();
+    form.p_nr_placa_veiculo.value = link.dataset.placa;
+    form.p_id_veiculo.value = link.dataset.id;
+    setTimeout(function () {{ lov.style.display = 'none'; }}, 100);
+  }});
+
+  document.querySelector('button.novo').addEventListener('click', function () {{
+    var linhas = document.getElementById('produtos');
+    var nova = linhas.firstElementChild.cloneNode(true);
+    nova.querySelectorAll('input').forEach(function (i) {{ i.value = ''; }});
+    setTimeout(function () {{ linhas.appendChild(nova); }}, 100);
+  }});
+
+  document.querySelector('button.gravar').addEventListener('click', function () {{
+    form.submit();
+  }});
+}})();
+</script>
+"""
+
+# Linhas por página da listagem de compras (/consulta)
+LINHAS_POR_PAGINA = 20
+
+def _valor_brasileiro(valor):
+    """ '1234.5' -> '1.234,50', como o portal exibe na listagem. """
+    return f"{float(valor):,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
+
+def id_veiculo(placa):
+    """ ID interno estável que o portal associa a cada placa. """
+    return str(sum(ord(c) * (i + 1) for i, c in enumerate(placa.upper())) + 1000)
+
+class PortalSimulado:
+    """ Estado do portal: sessões válidas e registros gravados. """
+
+    def __init__(self, latencia=0.0):
+        self.latencia = latencia
+        self.sessoes = set()
+        self.registros = []
+        self.recursos_servidos = 0
+        self.lock = threading.Lock()
+
+    def gravar(self, campos):
+        """ Valida e grava um formulário de inclusão. Retorna a mensagem de erro ou None. """
+        for nome in CAMPOS_OBRIGATORIOS:
+            valores = campos.get(nome) or ['']
+            if not all(v.strip() for v in valores):
+                return f"Campo obrigatório não preenchido: {nome}"
+        if campos.get('p_km_validado', [''])[0] != '1':
+            return "Hodômetro não validado."
+        placa = campos['p_nr_placa_veiculo'][0]
+        if campos['p_id_veiculo'][0] != id_veiculo(placa):
+            return f"Veículo inválido para a placa {placa}."
+        with self.lock:
+            self.registros.append({nome: valores if len(valores) > 1 else valores[0]
+                                   for nome, valores in campos.items()})
+        return None
+
+    def linhas_listagem(self, placa):
+        """ Uma linha por produto de cada registro gravado da placa, como na consulta do portal. """
+        linhas = []
+        with self.lock:
+            registros = list(self.registros)
+        for registro in registros:
+            if str(registro.get('p_nr_placa_veiculo', '')).upper() != placa:
+                continue
+            produtos = registro['p_id_produto_servico']
+            valores, litros = registro['p_vl_produto'], registro['p_qt_produto_utilizado']
+            if not isinstance(produtos, list):
+                produtos, valores, litros = [produtos], [valores], [litros]
+            nomes = dict(PRODUTOS)
+            for produto, valor, qtd in zip(produtos, valores, litros):
+                linhas.append((registro['p_dt_especifica'], registro['p_hr_especifica'], placa,
+                               registro['p_nr_km_veiculo'], nomes.get(produto, produto), qtd,
+                               _valor_brasileiro(valor)))
+        return linhas
+
+def _criar_handler(portal):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _responder(self, corpo, status=200, cabecalhos=None, recursos=True):
+            time.sleep(portal.latencia)
+            dados = _PAGINA.format(corpo=corpo, recursos=_RECURSOS if recursos else '').encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(dados)))
+            for nome, valor in (cabecalhos or {}).items():
+                self.send_header(nome, valor)
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def _estatico(self, caminho):
+            time.sleep(portal.latencia)
+            tipo, dados = _ESTATICOS[caminho]
+            with portal.lock:
+                portal.recursos_servidos += 1
+            self.send_response(200)
+            self.send_header('Content-Type', tipo)
+            self.send_header('Content-Length', str(len(dados)))
+            self.send_header('Cache-Control', 'no-store')
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def _redirecionar(self, destino, cabecalhos=None):
+            self.send_response(302)
+            self.send_header('Location', destino)
+            self.send_header('Content-Length', '0')
+            for nome, valor in (cabecalhos or {}).items():
+                self.send_header(nome, valor)
+            self.end_headers()
+
+        def _autenticado(self):
+            for parte in self.headers.get('Cookie', '').split(';'):
+                nome, _, valor = parte.strip().partition('=')
+                if nome == 'sessao' and valor in portal.sessoes:
+                    return True
+            return False
+
+        def _login(self):
+            token = secrets.token_hex(16)
+            portal.sessoes.add(token)
+            self._redirecionar('/principal', {'Set-Cookie': f'sessao={token}; Path=/'})
+
+        def _formulario(self, mensagem=''):
+            opcoes = ''.join(f'<option value="{v}">{escape(t)}</option>' for v, t in PRODUTOS)
+            self._responder(_FORMULARIO.format(mensagem=mensagem, opcoes=opcoes))
+
+        def _consulta(self, params):
+            placa = params.get('p_nr_placa_veiculo', [''])[0].strip().upper()
+            try:
+                pagina = max(1, int(params.get('pagina', ['1'])[0]))
+            except ValueError:
+                pagina = 1
+            linhas = portal.linhas_listagem(placa)
+            trecho = linhas[(pagina - 1) * LINHAS_POR_PAGINA:pagina * LINHAS_POR_PAGINA]
+            corpo = ''.join('<tr>' + ''.join(f'<td>{escape(str(c))}</td>' for c in linha) + '</tr>'
+                            for linha in trecho)
+            proxima = ''
+            if pagina * LINHAS_POR_PAGINA < len(linhas):
+                proxima = (f'<a class="proxima" href="/consulta?p_nr_placa_veiculo={escape(placa)}'
+                           f'&amp;pagina={pagina + 1}">Próxima</a>')
+            self._responder(
+                '<table class="consulta"><tr><th>Data</th><th>Hora</th><th>Placa</th><th>Hodômetro</th>'
+                f'<th>Produto</th><th>Litros</th><th>Valor</th></tr>{corpo}</table>{proxima}'
+            )
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+
+            if url.path in _ESTATICOS:
+                return self._estatico(url.path)
+            if url.path == '/login':
+                if params.get('auto') == ['1']:
+                    return self._login()
+                return self._responder(
+                    '<form method="post" action="/login">Usuário <input name="u">'
+                    '<button type="submit">Entrar</button></form>'
+                )
+            if not self._autenticado():
+                return self._redirecionar('/login')
+
+            if url.path == '/principal':
+                return self._responder('<iframe name="content" src="/inicio" width="100%" height="600"></iframe>')
+            if url.path == '/inicio':
+                return self._responder('<a href="/controller">CONTROLLER</a>')
+            if url.path == '/controller':
+                return self._responder('<iframe name="content" src="/menu" width="100%" height="580"></iframe>')
+            if url.path == '/menu':
+                return self._responder(_MENU)
+            if url.path == '/inclusao':
+                return self._formulario()
+            if url.path == '/consulta':
+                return self._consulta(params)
+            if url.path == '/lv_placa':
+                placa = params.get('p_nr_placa_veiculo', [''])[0].strip().upper()
+                placas = [placa, placa + 'X'] if placa else []
+                linhas = ''.join(
+                    f'<a class="retorno" href="#" data-placa="{escape(p)}" data-id="{id_veiculo(p)}">{escape(p)}</a><br>'
+                    for p in placas
+                )
+                # Fragmento inserido via innerHTML pelo modal: sem recursos da página
+                return self._responder(f'<div class="tabela">{linhas}</div>', recursos=False)
+            self._responder('Página não encontrada', status=404)
+
+        def do_POST(self):
+            tamanho = int(self.headers.get('Content-Length', 0))
+            campos = parse_qs(self.rfile.read(tamanho).decode('utf-8'), keep_blank_values=True)
+
+            if self.path == '/login':
+                return self._login()
+            if not self._autenticado():
+                return self._redirecionar('/login')
+            if self.path == '/inclusao':
+                erro = portal.gravar(campos)
+                if erro:
+                    return self._formulario(f'<div class="erro">{escape(erro)}</div>')
+                return self._formulario('<div class="sucesso">Registro incluído com sucesso.</div>')
+            self._responder('Página não encontrada', status=404)
+
+    return Handler
+
+def iniciar(porta=0, latencia=0.0):
+    """
+    Sobe o portal simulado em uma thread de fundo.
+    Retorna (servidor, portal, url_base). Use servidor.shutdown() para encerrar.
+    """
+    portal = PortalSimulado(latencia)
+    servidor = ThreadingHTTPServer(('127.0.0.1', porta), _criar_handler(portal))
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url_base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    return servidor, portal, url_base
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Portal Valeshop simulado")
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--latencia', type=float, default=0.0, help="Atraso do servidor por requisição (s)")
+    args = parser.parse_args()
+
+    servidor, _, url_base = iniciar(args.porta, args.latencia)
+    print(f"Portal simulado em {url_base} (URL_LOGIN={url_base}/login?auto=1)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
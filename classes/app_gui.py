@@ -1,7 +1,31 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
+import logging
+import os
+import queue
 import threading
+from logging.handlers import RotatingFileHandler
 import automation.controller as controller
+import automation.telemetria as telemetria
+import automation.navegador as navegador
+from automation.opcoes import OpcoesExecucao
+
+# Bomba de log: a thread de automação só enfileira; a GUI drena em lotes
+INTERVALO_LOG_MS = 100
+MAX_MENSAGENS_POR_CICLO = 1000
+MAX_LINHAS_LOG = 2000  # a caixa de log mantém só as linhas mais recentes
+
+def _criar_log_arquivo():
+    """ Log completo em arquivo rotativo (a caixa de texto guarda só o final). """
+    log_arquivo = logging.getLogger("automacao_valeshop")
+    if not log_arquivo.handlers:
+        handler = RotatingFileHandler(os.getenv("ARQUIVO_LOG", "automacao.log"),
+                                      maxBytes=5 * 1024 * 1024, backupCount=3, encoding='utf-8')
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        log_arquivo.addHandler(handler)
+        log_arquivo.setLevel(logging.INFO)
+        log_arquivo.propagate = False
+    return log_arquivo
 
 class AppGui:
     """
@@ -21,10 +45,35 @@ class AppGui:
 
         self.lbl_entrada_status = ttk.Label(frame_entrada, text="Nenhuma entrada selecionada.", wraplength=650)
         
-        btn_arquivos = ttk.Button(frame_entrada, text="Selecionar Arquivo (.xlsx)", command=self.selecionar_arquivo_veiculo)
+        btn_arquivos = ttk.Button(frame_entrada, text="Selecionar Arquivo(s) (.xlsx)", command=self.selecionar_arquivo_veiculo)
         btn_arquivos.pack(fill=tk.X, pady=5)
+        btn_pasta = ttk.Button(frame_entrada, text="Selecionar Pasta (lote)", command=self.selecionar_pasta_veiculos)
+        btn_pasta.pack(fill=tk.X, pady=5)
         self.lbl_entrada_status.pack(fill=tk.X, pady=5) 
         
+        # --- Seção de Opções ---
+        frame_opcoes = ttk.LabelFrame(main_frame, text="2. Opções", padding=15)
+        frame_opcoes.pack(fill=tk.X, padx=10, pady=10)
+
+        ttk.Label(frame_opcoes, text="Sessões paralelas do navegador:").pack(side=tk.LEFT)
+        self.var_num_workers = tk.IntVar(value=OpcoesExecucao().num_workers)
+        ttk.Spinbox(frame_opcoes, from_=1, to=8, width=5, textvariable=self.var_num_workers).pack(side=tk.LEFT)
+
+        self.var_preencher_js = tk.BooleanVar(value=OpcoesExecucao().modo_preenchimento != "teclado")
+        ttk.Checkbutton(frame_opcoes, text="Preenchimento rápido (JavaScript)", variable=self.var_preencher_js).pack(side=tk.LEFT, padx=15)
+
+        self.var_envio_http = tk.BooleanVar(value=OpcoesExecucao().modo_envio == "http")
+        ttk.Checkbutton(frame_opcoes, text="Envio direto (HTTP)", variable=self.var_envio_http).pack(side=tk.LEFT)
+
+        self.var_manter_navegador = tk.BooleanVar(value=OpcoesExecucao().manter_navegador)
+        ttk.Checkbutton(frame_opcoes, text="Manter navegador aberto", variable=self.var_manter_navegador).pack(side=tk.LEFT, padx=15)
+
+        self.var_somente_validar = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frame_opcoes, text="Somente validar", variable=self.var_somente_validar).pack(side=tk.LEFT)
+
+        self.var_perfil_enxuto = tk.BooleanVar(value=OpcoesExecucao().perfil_enxuto)
+        ttk.Checkbutton(frame_opcoes, text="Navegador enxuto", variable=self.var_perfil_enxuto).pack(side=tk.LEFT, padx=15)
+
         # --- Seção de Ação ---
         frame_acao = ttk.Frame(main_frame)
         frame_acao.pack(fill=tk.X, padx=10, pady=10)
@@ -32,6 +81,13 @@ class AppGui:
         self.btn_gerar = ttk.Button(frame_acao, text="REGISTRAR VEÍCULO", command=self.iniciar_processamento_veiculo)
         self.btn_gerar.pack(fill=tk.X, ipady=10)
 
+        # --- Seção de Desempenho (tempo de cada fase, ao vivo) ---
+        frame_desempenho = ttk.LabelFrame(main_frame, text="Desempenho", padding=10)
+        frame_desempenho.pack(fill=tk.X, padx=10, pady=(0, 10))
+
+        self.lbl_desempenho = ttk.Label(frame_desempenho, text="Nenhuma execução em andamento.", font=('Courier New', 9), justify=tk.LEFT)
+        self.lbl_desempenho.pack(fill=tk.X)
+
         # --- Seção de Log ---
         frame_log = ttk.LabelFrame(main_frame, text="Mensagens do Processo", padding=10)
         frame_log.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -45,38 +101,84 @@ class AppGui:
 
         # Lógica do 'filesFunctions' mesclada aqui
         self.caminho_arquivo = None
+        self.entradas_lote = None
+        self.processando = False
+
+        self.fila_log = queue.Queue()
+        self.log_arquivo = _criar_log_arquivo()
+        self.frame.after(INTERVALO_LOG_MS, self._bombear_log)
+
+        # Fecha o navegador mantido aberto junto com a janela
+        self.frame.bind('<Destroy>', self._ao_fechar_janela)
+
+    def _ao_fechar_janela(self, evento):
+        if evento.widget is self.frame:
+            navegador.quente.fechar()
 
     def log(self, mensagem: str):
-        """ Envia uma mensagem para a caixa de log (thread-safe). """
-        if self.log_text:
-            try:
-                self.frame.after(0, self._log_update, mensagem)
-            except tk.TclError:
-                print(mensagem) # Fallback se a janela fechar
-        else:
-            print(mensagem)
-            
-    def _log_update(self, mensagem: str):
-        """ Atualiza a caixa de texto do log (chamado por self.log). """
-        self.log_text.config(state='normal')
-        self.log_text.insert(tk.END, f"{mensagem}\n")
-        self.log_text.see(tk.END) 
-        self.log_text.config(state='disabled')
+        """ Registra uma mensagem no log (thread-safe, nunca bloqueia na interface). """
+        self.fila_log.put_nowait(mensagem)
+        self.log_arquivo.info(mensagem)
             
+    def _bombear_log(self):
+        """ Drena a fila de log em lote e limita a caixa às linhas mais recentes. """
+        mensagens = []
+        try:
+            while len(mensagens) < MAX_MENSAGENS_POR_CICLO:
+                mensagens.append(self.fila_log.get_nowait())
+        except queue.Empty:
+            pass
+
+        if mensagens:
+            self.log_text.config(state='normal')
+            self.log_text.insert(tk.END, "\n".join(mensagens) + "\n")
+            excedente = int(self.log_text.index('end-1c').split('.')[0]) - 1 - MAX_LINHAS_LOG
+            if excedente > 0:
+                self.log_text.delete('1.0', f'{excedente + 1}.0')
+            self.log_text.see(tk.END)
+            self.log_text.config(state='disabled')
+
+        try:
+            self.frame.after(INTERVALO_LOG_MS, self._bombear_log)
+        except tk.TclError:
+            pass  # Janela fechada
+
     def limpar_log(self):
         self.log_text.config(state='normal')
         self.log_text.delete(1.0, tk.END)
         self.log_text.config(state='disabled')
 
+    def _atualizar_desempenho(self):
+        """ Atualiza o resumo de desempenho a cada segundo enquanto a automação roda. """
+        self.lbl_desempenho.config(text=telemetria.atual.texto_resumo())
+        if self.processando:
+            self.frame.after(1000, self._atualizar_desempenho)
+
     def selecionar_arquivo_veiculo(self):
-        """ Abre a caixa de diálogo para selecionar o arquivo Excel. """
+        """ Abre a caixa de diálogo para selecionar um ou mais arquivos Excel. """
         tipos_arquivo = [("Planilha Excel", "*.xlsx"), ("Todos os arquivos", "*.*")]
-        arquivo = filedialog.askopenfilename(title="Selecione o arquivo de cadastro", filetypes=tipos_arquivo)
+        arquivos = filedialog.askopenfilenames(title="Selecione o(s) arquivo(s) de cadastro", filetypes=tipos_arquivo)
+        
+        if len(arquivos) == 1:
+            self.caminho_arquivo = arquivos[0]
+            self.entradas_lote = None
+            self.lbl_entrada_status.config(text=f"Arquivo selecionado: {arquivos[0]}")
+            self.log(f"Entrada definida: {arquivos[0]}")
+        elif arquivos:
+            self.caminho_arquivo = None
+            self.entradas_lote = list(arquivos)
+            self.lbl_entrada_status.config(text=f"{len(arquivos)} arquivos selecionados (modo lote).")
+            self.log(f"Entrada definida: {len(arquivos)} arquivos (modo lote).")
+
+    def selecionar_pasta_veiculos(self):
+        """ Seleciona uma pasta: todas as planilhas dela são enviadas em lote. """
+        pasta = filedialog.askdirectory(title="Selecione a pasta com as planilhas")
         
-        if arquivo:
-            self.caminho_arquivo = arquivo 
-            self.lbl_entrada_status.config(text=f"Arquivo selecionado: {arquivo}")
-            self.log(f"Entrada definida: {arquivo}")
+        if pasta:
+            self.caminho_arquivo = None
+            self.entradas_lote = pasta
+            self.lbl_entrada_status.config(text=f"Pasta selecionada (modo lote): {pasta}")
+            self.log(f"Entrada definida: pasta {pasta} (modo lote).")
 
     def _callback_pausa_login_gui(self):
         """ Mostra o popup de pausa para o login manual. """
@@ -96,6 +198,7 @@ class AppGui:
     def _callback_finalizacao(self, sucesso=True, erro=None):
         """ Reativa o botão e mostra a mensagem final (sucesso ou erro). """
         self.btn_gerar.config(text="REGISTRAR VEÍCULO", state='normal')
+        self.processando = False
         if erro:
             self.log(f"\nERRO INESPERADO no processamento: {erro}")
             messagebox.showerror("Erro Inesperado", f"Ocorreu um erro: {erro}")
@@ -108,21 +211,42 @@ class AppGui:
         self.limpar_log()
         self.log("--- Iniciando Registro de Veículo ---")
         
-        if not self.caminho_arquivo:
+        if not self.caminho_arquivo and not self.entradas_lote:
             self.log("ERRO: Nenhum arquivo de entrada selecionado.")
             messagebox.showerror("Erro", "Nenhum arquivo de entrada selecionado.")
             return
             
+        try:
+            opcoes = OpcoesExecucao(
+                num_workers=max(1, self.var_num_workers.get()),
+                modo_preenchimento="js" if self.var_preencher_js.get() else "teclado",
+                modo_envio="http" if self.var_envio_http.get() else "navegador",
+                manter_navegador=self.var_manter_navegador.get(),
+                perfil_enxuto=self.var_perfil_enxuto.get(),
+                somente_validar=self.var_somente_validar.get(),
+            )
+        except tk.TclError:
+            messagebox.showerror("Erro", "Número de sessões paralelas inválido.")
+            return
+
         self.btn_gerar.config(text="PROCESSANDO...", state='disabled')
+        self.processando = True
+        self.frame.after(1000, self._atualizar_desempenho)
         
         # Inicia a thread, passando os callbacks (log, pausa, fim) para o controller
+        if self.entradas_lote:
+            alvo, entrada = controller.run_automation_flow_lote, self.entradas_lote
+        else:
+            alvo, entrada = controller.run_automation_flow, self.caminho_arquivo
+
         threading.Thread(
-            target=controller.run_automation_flow,
+            target=alvo,
             args=(
-                self.caminho_arquivo,
+                entrada,
                 self.log,
                 self._callback_pausa_login_gui,
-                lambda s, e: self.frame.after(0, self._callback_finalizacao, s, e)
+                lambda sucesso, erro: self.frame.after(0, self._callback_finalizacao, sucesso, erro),
+                opcoes
             ),
             daemon=True
         ).start()
@@ -0,0 +1,136 @@
+"""
+Ponto de entrada em linha de comando (sem interface gráfica).
+
+Exemplos:
+    python cli.py planilha.xlsx --dry-run
+    python cli.py pasta_planilhas/ --workers 3 --relatorio relatorio.json
+    python cli.py planilha.xlsx --enxuto --bloquear imagens,fontes
+    python cli.py pasta_planilhas/ --reciclar 300
+"""
+import argparse
+import json
+import sys
+import time
+
+def _criar_parser():
+    parser = argparse.ArgumentParser(
+        description="Automação de Registro de Veículos - Valeshop (linha de comando)"
+    )
+    parser.add_argument('entradas', nargs='+', help="Planilhas .xlsx ou pastas com planilhas")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Sessões paralelas do navegador (padrão: NUM_WORKERS do .env ou 1)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Apenas lê e valida todos os registros das planilhas, sem abrir o navegador")
+    parser.add_argument('--relatorio', metavar='ARQUIVO',
+                        help="Grava um relatório JSON da execução")
+    parser.add_argument('--modo-envio', choices=['navegador', 'http'], default=None,
+                        help="Envio pelo navegador ou por HTTP direto (padrão: MODO_ENVIO do .env)")
+    parser.add_argument('--preenchimento', choices=['js', 'teclado'], default=None,
+                        help="Preenchimento em lote via JavaScript ou por digitação")
+    parser.add_argument('--enxuto', action='store_true',
+                        help="Perfil enxuto do navegador: carregamento 'eager' e recursos bloqueados")
+    parser.add_argument('--bloquear', metavar='GRUPOS', default=None,
+                        help="Recursos bloqueados no perfil enxuto, separados por vírgula "
+                             "(imagens,fontes,analytics; padrão: BLOQUEAR_RECURSOS do .env)")
+    parser.add_argument('--reciclar', type=int, metavar='N', default=None,
+                        help="Reinicia o navegador, mantendo a sessão, a cada N registros "
+                             "(0 desativa; padrão: RECICLAR_APOS_REGISTROS do .env)")
+    return parser
+
+def _logger(mensagem):
+    print(mensagem, flush=True)
+
+def _pausa_login():
+    _logger("=" * 50)
+    _logger("--- AÇÃO MANUAL NECESSÁRIA ---")
+    input("Faça o login no navegador, resolva o CAPTCHA e pressione Enter aqui para continuar... ")
+
+def _ler_planilhas(caminhos):
+    """ Lê e valida cada planilha e devolve o resumo de cada uma para o relatório. """
+    import automation.core_functions as core
+    import automation.validacao as validacao
+
+    arquivos = []
+    for caminho in caminhos:
+        dados_cabecalho, lista_transacoes = core.extrair_dados_planilha(caminho, _logger)
+        resumo = {
+            'arquivo': caminho,
+            'placa': (dados_cabecalho or {}).get('placa'),
+            'transacoes': len(lista_transacoes),
+            'valido': False,
+            'erro': "Falha ao extrair dados (cabeçalho ou transações).",
+        }
+        if dados_cabecalho and lista_transacoes:
+            relatorio = validacao.validar_planilha(dados_cabecalho, lista_transacoes)
+            relatorio.registrar(_logger)
+            resumo['validacao'] = relatorio.como_dicionario()
+            resumo['valido'] = relatorio.valido
+            resumo['erro'] = None if relatorio.valido else f"{len(relatorio.erros)} erro(s) de validação."
+        arquivos.append(resumo)
+    return arquivos
+
+def _gravar_relatorio(caminho, relatorio):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2, default=str)
+    _logger(f"Relatório gravado em {caminho}")
+
+def main(argv=None):
+    args = _criar_parser().parse_args(argv)
+    inicio = time.perf_counter()
+
+    import automation.controller as controller
+    from automation.opcoes import OpcoesExecucao
+
+    caminhos = controller.listar_planilhas(args.entradas)
+    if not caminhos:
+        _logger("ERRO: Nenhuma planilha .xlsx encontrada.")
+        return 2
+
+    relatorio = {'modo': 'dry-run' if args.dry_run else 'envio', 'arquivos': caminhos}
+
+    if args.dry_run:
+        arquivos = _ler_planilhas(caminhos)
+        relatorio['arquivos'] = arquivos
+        relatorio['sucesso'] = all(a['valido'] for a in arquivos)
+        relatorio['erro'] = None if relatorio['sucesso'] else "Há planilhas inválidas."
+        _logger(f"Validação concluída: {sum(a['valido'] for a in arquivos)} de {len(arquivos)} planilhas válidas, "
+                f"{sum(a['transacoes'] for a in arquivos)} transações.")
+    else:
+        opcoes = OpcoesExecucao()
+        opcoes.manter_navegador = False  # o processo termina ao fim da execução
+        if args.workers is not None:
+            opcoes.num_workers = max(1, args.workers)
+        if args.modo_envio:
+            opcoes.modo_envio = args.modo_envio
+        if args.preenchimento:
+            opcoes.modo_preenchimento = args.preenchimento
+        if args.enxuto:
+            opcoes.perfil_enxuto = True
+        if args.bloquear is not None:
+            opcoes.bloquear_recursos = args.bloquear
+        if args.reciclar is not None:
+            opcoes.reciclar_apos_registros = max(0, args.reciclar)
+
+        resultado = {}
+
+        def callback_final(sucesso, erro):
+            resultado['sucesso'] = sucesso
+            resultado['erro'] = erro
+
+        if len(caminhos) == 1:
+            controller.run_automation_flow(caminhos[0], _logger, _pausa_login, callback_final, opcoes)
+        else:
+            controller.run_automation_flow_lote(caminhos, _logger, _pausa_login, callback_final, opcoes)
+
+        relatorio['sucesso'] = resultado.get('sucesso', False)
+        relatorio['erro'] = resultado.get('erro')
+        if relatorio['erro']:
+            _logger(f"ERRO: {relatorio['erro']}")
+
+    relatorio['duracao_s'] = round(time.perf_counter() - inicio, 3)
+    if args.relatorio:
+        _gravar_relatorio(args.relatorio, relatorio)
+    return 0 if relatorio['sucesso'] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
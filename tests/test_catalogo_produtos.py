@@ -0,0 +1,42 @@
+import pytest
+
+import automation.catalogo_produtos as catalogo_produtos
+from benchmarks import portal_simulado
+
+def _catalogo(opcoes=portal_simulado.PRODUTOS):
+    catalogo = catalogo_produtos.CatalogoProdutos("", 24)
+    catalogo._definir(opcoes, 'portal', 0.0)
+    return catalogo
+
+@pytest.mark.parametrize('nome, esperado', [
+    ('Gasolina', '70'),
+    ('GASOLINA COMUM', '70'),
+    ('Gasolina Aditivada', '70'),
+    ('Álcool', '71'),
+    ('Etanol', '71'),
+    ('Diesel', '72'),
+    ('S10', '72'),
+    ('Diesel S-10', '72'),
+    ('Óleo Diesel S10', '72'),
+    ('OLEO DIESEL S-10', '72'),
+    ('Diesel S500', '73'),
+    ('Diesel S500 Aditivado', '73'),
+    ('Arla 32', '85'),
+    ('Aditivo', '85'),
+])
+def test_nome_da_planilha(nome, esperado):
+    assert _catalogo().valor(nome, print) == esperado
+
+@pytest.mark.parametrize('nome', ['COMUM', 'Óleo', 'Aditivado', 'Querosene', 'Diesel Arla', ''])
+def test_nome_ambiguo_usa_o_padrao_com_aviso(nome):
+    avisos = []
+    assert _catalogo().valor(nome, avisos.append) == '72'
+    assert len(avisos) == 1 and catalogo_produtos.PRODUTO_PADRAO in avisos[0]
+
+def test_aditivo():
+    assert _catalogo().valor_aditivo() == '85'
+
+def test_aditivo_sem_opcao_nao_usa_o_padrao():
+    catalogo = _catalogo([opcao for opcao in portal_simulado.PRODUTOS if opcao[0] != '85'])
+    with pytest.raises(Exception, match='aditivo'):
+        catalogo.valor_aditivo()
@@ -0,0 +1,130 @@
+import pytest
+import requests
+
+import automation.catalogo_produtos as catalogo_produtos
+import automation.envio_http as envio_http
+from benchmarks import portal_simulado
+
+PLACA = 'ABC1D23'
+
+def _log(mensagem):
+    pass
+
+class _DriverCatalogo:
+    """ Só o necessário para o catálogo ler as opções de produto. """
+
+    def __init__(self, url_base):
+        self.current_url = f"{url_base}/inclusao"
+
+    def execute_script(self, script, *args):
+        return [list(opcao) for opcao in portal_simulado.PRODUTOS]
+
+@pytest.fixture
+def portal():
+    servidor, estado, url_base = portal_simulado.iniciar()
+    catalogo = catalogo_produtos.configurar("", 24)
+    catalogo.carregar(_DriverCatalogo(url_base), 'p_id_produto_servico', _log)
+    yield estado, url_base
+    servidor.shutdown()
+    servidor.server_close()
+    catalogo.invalidar()
+
+def _sessao_logada(url_base):
+    sessao = requests.Session()
+    sessao.get(f"{url_base}/login?auto=1")
+    return sessao
+
+def _modelo(url_base):
+    """ Formulário como capturar_modelo o devolveria após a busca da placa. """
+    campos = [[nome, 0, ''] for nome in (
+        'p_cd_cliente', 'p_nr_contrato', 'p_nm_motorista', 'p_nr_matricula',
+    )]
+    campos += [
+        ['p_nr_placa_veiculo', 0, PLACA],
+        ['p_id_veiculo', 0, portal_simulado.id_veiculo(PLACA)],
+        ['p_nm_razao_social_cre', 0, ''],
+        ['p_dt_especifica', 0, ''],
+        ['p_hr_especifica', 0, ''],
+        ['p_nr_km_veiculo', 0, ''],
+        ['p_km_validado', 0, '1'],
+        ['p_id_produto_servico', 0, ''],
+        ['p_qt_produto_utilizado', 0, ''],
+        ['p_vl_produto', 0, ''],
+    ]
+    return envio_http.ModeloFormulario({
+        'action': f"{url_base}/inclusao", 'metodo': 'post', 'url': f"{url_base}/inclusao",
+        'agente': 'pytest', 'campos': campos,
+    })
+
+def _dados(**extras):
+    dados = {
+        'nome': 'FULANO DE TAL', 'matricula': '12345678900', 'destino': 'OBRA CENTRO',
+        'placa': PLACA, 'data': '01/02/2024', 'hora_para_preencher': '08:30',
+        'hodometro_abastecimento': '15000', 'valor_total': '350.00', 'litros': '60.5',
+        'produto_nome': 'Diesel S10',
+    }
+    dados.update(extras)
+    return dados
+
+def test_registro_aceito(portal):
+    estado, url_base = portal
+    with _sessao_logada(url_base) as sessao:
+        envio_http.enviar_registro_http(sessao, _modelo(url_base), _dados(produto_nome='Gasolina'), _log)
+    assert len(estado.registros) == 1
+    registro = estado.registros[0]
+    assert registro['p_id_produto_servico'] == '70'
+    assert registro['p_vl_produto'] == '350.00'
+    assert registro['p_nr_km_veiculo'] == '15000'
+
+def test_resposta_de_erro(portal):
+    estado, url_base = portal
+    with _sessao_logada(url_base) as sessao:
+        with pytest.raises(envio_http.RespostaRecusada, match='class="erro"'):
+            envio_http.enviar_registro_http(sessao, _modelo(url_base), _dados(destino=''), _log)
+    assert estado.registros == []
+
+def test_erro_oracle_na_resposta():
+    resposta = requests.models.Response()
+    resposta.status_code = 200
+    resposta.url = 'http://portal/inclusao'
+    resposta._content = b'<p>ORA-01400: cannot insert NULL</p><input name="p_cd_cliente">'
+    assert 'ORA-01400' in envio_http.validar_resposta(resposta)
+
+def test_sessao_expirada(portal):
+    estado, url_base = portal
+    with requests.Session() as sessao:
+        with pytest.raises(envio_http.RespostaRecusada, match='Sessão expirada'):
+            envio_http.enviar_registro_http(sessao, _modelo(url_base), _dados(), _log)
+    assert estado.registros == []
+
+def test_payload_com_aditivo(portal):
+    estado, url_base = portal
+    dados = _dados(aditivo={'valor': '45.00', 'litros': '10'})
+    modelo = _modelo(url_base)
+    payload = modelo.montar_payload(dados, _log)
+    produtos = [(nome, valor) for nome, valor in payload if nome in (
+        'p_id_produto_servico', 'p_qt_produto_utilizado', 'p_vl_produto')]
+    assert produtos == [
+        ('p_id_produto_servico', '72'), ('p_qt_produto_utilizado', '60.5'), ('p_vl_produto', '350.00'),
+        ('p_id_produto_servico', '85'), ('p_qt_produto_utilizado', '10'), ('p_vl_produto', '45.00'),
+    ]
+
+    with _sessao_logada(url_base) as sessao:
+        envio_http.enviar_registro_http(sessao, modelo, dados, _log)
+    registro = estado.registros[0]
+    assert registro['p_id_produto_servico'] == ['72', '85']
+    assert registro['p_vl_produto'] == ['350.00', '45.00']
+
+def test_pagina_de_recusa_do_navegador(portal):
+    # Mesma página que o modo navegador recebe após o portal recusar o formulário
+    estado, url_base = portal
+    with _sessao_logada(url_base) as sessao:
+        recusa = sessao.post(f"{url_base}/inclusao", data={'p_cd_cliente': '3359'})
+        vazio = sessao.get(f"{url_base}/inclusao")
+    assert 'class="erro"' in envio_http.erro_na_pagina(recusa.text)
+    assert envio_http.erro_na_pagina(vazio.text) is None
+
+def test_padrao_de_erro_configurado(monkeypatch):
+    monkeypatch.setenv('PADRAO_ERRO_PORTAL', r'Registro n[aã]o gravado')
+    assert envio_http.erro_na_pagina('<p>Registro não gravado: placa inválida</p>')
+    assert envio_http.erro_na_pagina('<div class="erro">recusado</div>') is None
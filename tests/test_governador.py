@@ -0,0 +1,81 @@
+import threading
+import time
+
+from automation import governador
+
+def _registros(gov, quantidade, duracao):
+    """ Executa registros sequenciais de `duracao` s e devolve (início, fim) de cada um. """
+    tempos = []
+    for _ in range(quantidade):
+        with gov.vaga():
+            inicio = time.monotonic()
+            time.sleep(duracao)
+            tempos.append((inicio, time.monotonic()))
+    return tempos
+
+def test_intervalo_conta_do_fim_do_registro():
+    # Registros mais lentos que o intervalo: a pausa ainda tem de existir entre eles
+    gov = governador.Governador(1, 5, lambda mensagem: None)
+    gov.intervalo = 0.2
+    tempos = _registros(gov, 3, 0.3)
+    pausas = [proximo[0] - anterior[1] for anterior, proximo in zip(tempos, tempos[1:])]
+    assert all(pausa >= 0.19 for pausa in pausas), pausas
+
+def test_recuo_dobra_o_intervalo_com_uma_sessao():
+    gov = governador.Governador(1, 5, lambda mensagem: None)
+    with gov.vaga():
+        gov.registrar_erro('envio')
+    assert gov.intervalo == governador.INTERVALO_RECUO
+    with gov.vaga():
+        gov.registrar_erro('envio')
+    assert gov.intervalo == 2 * governador.INTERVALO_RECUO
+
+def test_recuo_reduz_sessoes_e_avanco_recupera():
+    gov = governador.Governador(4, 5, lambda mensagem: None)
+    for _ in range(5):
+        with gov.vaga():
+            gov.registrar('envio', 0.2)
+    assert gov.limite == 4
+    with gov.vaga():
+        gov.registrar_erro('envio')
+    assert gov.limite == 2
+    for _ in range(20):
+        with gov.vaga():
+            gov.registrar('envio', 0.2)
+    assert gov.limite == 4 and gov.intervalo == 0
+
+def test_medicoes_do_ritmo_anterior_sao_ignoradas():
+    gov = governador.Governador(2, 5, lambda mensagem: None)
+    iniciado, recuou = threading.Event(), threading.Event()
+
+    def registro_antigo():
+        with gov.vaga():
+            iniciado.set()
+            recuou.wait(5)
+            # Começou antes do recuo: nem a lentidão nem o erro contam de novo
+            for _ in range(5):
+                gov.registrar('envio', 9.0)
+            gov.registrar_erro('envio')
+
+    thread = threading.Thread(target=registro_antigo)
+    thread.start()
+    iniciado.wait(5)
+    with gov.vaga():
+        gov.registrar_erro('envio')
+    recuou.set()
+    thread.join(5)
+    assert gov.recuos == 1
+    assert gov.limite == 1
+
+def test_uma_amostra_boa_apos_o_recuo_nao_recua_de_novo():
+    # A média alta que provocou o recuo não é herdada pelas medições do ritmo novo
+    gov = governador.Governador(1, 5, lambda mensagem: None)
+    for segundos in (0.2, 0.2, 0.2, 2.0):
+        with gov.vaga():
+            gov.registrar('envio', segundos)
+    assert gov.recuos == 1
+    gov.intervalo = 0
+    for _ in range(governador.AMOSTRAS_MINIMAS):
+        with gov.vaga():
+            gov.registrar('envio', 0.25)
+    assert gov.recuos == 1
@@ -0,0 +1,146 @@
+import pytest
+import requests
+
+import automation.diario as diario_envios
+from automation import reconciliacao
+from benchmarks import portal_simulado
+
+PLACA = 'ABC1D23'
+URL_CONSULTA = '/consulta?p_nr_placa_veiculo={placa}&pagina={pagina}'
+
+def _transacao(n):
+    return {
+        'data': f"{1 + n % 28:02d}/03/2024", 'hora_para_preencher': '08:00',
+        'hodometro_abastecimento': str(10000 + n * 150), 'valor_total': f"{1000 + n * 10.5:.2f}",
+        'litros': '50',
+    }
+
+def _gravar(portal, transacao, placa=PLACA):
+    portal.registros.append({
+        'p_nr_placa_veiculo': placa,
+        'p_dt_especifica': transacao['data'],
+        'p_hr_especifica': transacao['hora_para_preencher'],
+        'p_nr_km_veiculo': transacao['hodometro_abastecimento'],
+        'p_id_produto_servico': '72',
+        'p_vl_produto': transacao['valor_total'],
+        'p_qt_produto_utilizado': transacao['litros'],
+    })
+
+class _DriverLogado:
+    """ Só o que IndicePortal usa do navegador: URL atual, user agent e cookies. """
+
+    def __init__(self, url_base):
+        self.current_url = f"{url_base}/inclusao"
+        with requests.Session() as sessao:
+            sessao.get(f"{url_base}/login?auto=1")
+            self.cookies = [{'name': c.name, 'value': c.value, 'path': c.path} for c in sessao.cookies]
+
+    def execute_script(self, script, *args):
+        return 'pytest'
+
+    def get_cookies(self):
+        return self.cookies
+
+class _DiarioFalso:
+    def __init__(self):
+        self.marcados = {}
+
+    def marcar(self, chave, estado, arquivo=None, indice=None, detalhe=None):
+        self.marcados[chave] = estado
+
+@pytest.fixture
+def portal():
+    servidor, estado, url_base = portal_simulado.iniciar()
+    yield estado, url_base
+    servidor.shutdown()
+    servidor.server_close()
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('R$ 1.234,56', '1234.56'),
+    ('1234,5', '1234.50'),
+    ('1234.56', '1234.56'),
+    ('350', '350.00'),
+    ('', None),
+    ('abc', None),
+])
+def test_normalizar_valor(texto, esperado):
+    assert reconciliacao.normalizar_valor(texto) == esperado
+
+def test_chave_indice_normaliza_campos():
+    assert reconciliacao.chave_indice('abc-1d23', '05/03/2024 08:00', '15.000', '1.050,00') == \
+        ('ABC1D23', '05/03/2024', '15000', '1050.00')
+    assert reconciliacao.chave_indice('ABC1D23', '2024-03-05', '15000', '1050') == \
+        ('ABC1D23', None, '15000', '1050.00')
+
+def test_ler_listagem_da_pagina_simulada(portal):
+    estado, url_base = portal
+    for n in range(3):
+        _gravar(estado, _transacao(n))
+    _gravar(estado, _transacao(9), placa='OUT9Z99')
+    with requests.Session() as sessao:
+        sessao.get(f"{url_base}/login?auto=1")
+        html = sessao.get(f"{url_base}/consulta", params={'p_nr_placa_veiculo': PLACA, 'pagina': 1}).text
+    assert reconciliacao.ler_listagem(html) == [
+        reconciliacao.chave_transacao(PLACA, _transacao(n)) for n in range(3)
+    ]
+
+def test_carregar_percorre_todas_as_paginas(portal):
+    estado, url_base = portal
+    for n in range(45):
+        _gravar(estado, _transacao(n))
+    indice = reconciliacao.IndicePortal(URL_CONSULTA)
+    mensagens = []
+    chaves = indice.carregar(_DriverLogado(url_base), PLACA, mensagens.append)
+    assert len(chaves) == 45
+    assert 'em 3 página(s)' in mensagens[0]
+    # Segunda leitura da mesma placa vem do cache
+    estado.registros.clear()
+    assert indice.carregar(_DriverLogado(url_base), PLACA, mensagens.append) is chaves
+
+def test_filtrar_pula_os_existentes(portal):
+    estado, url_base = portal
+    planilha = [_transacao(n) for n in range(10)]
+    for transacao in planilha[:4]:
+        _gravar(estado, transacao)
+    diario = _DiarioFalso()
+    cabecalho = {'placa': PLACA, 'nome': 'FULANO', 'matricula': '1', 'destino': 'X'}
+    restantes = reconciliacao.IndicePortal(URL_CONSULTA).filtrar(
+        _DriverLogado(url_base), cabecalho, planilha, lambda mensagem: None, diario
+    )
+    assert restantes == planilha[4:]
+    assert len(diario.marcados) == 4
+    assert set(diario.marcados.values()) == {diario_envios.CONFIRMADO}
+
+def test_registrar_evita_reenvio_no_mesmo_lote(portal):
+    _, url_base = portal
+    driver = _DriverLogado(url_base)
+    cabecalho = {'placa': PLACA}
+    indice = reconciliacao.IndicePortal(URL_CONSULTA)
+    primeira = [_transacao(n) for n in range(5)]
+    assert indice.filtrar(driver, cabecalho, primeira, lambda mensagem: None) == primeira
+    for transacao in primeira:
+        indice.registrar(PLACA, reconciliacao.chave_transacao(PLACA, transacao))
+
+    # Planilha sobreposta: os três primeiros já foram enviados pela anterior
+    segunda = [_transacao(n) for n in range(2, 8)]
+    assert indice.filtrar(driver, cabecalho, segunda, lambda mensagem: None) == segunda[3:]
+
+def test_listagem_indisponivel_nao_pula_nada(portal):
+    _, url_base = portal
+    planilha = [_transacao(n) for n in range(3)]
+    mensagens = []
+    restantes = reconciliacao.IndicePortal('/nao_existe?placa={placa}&p={pagina}').filtrar(
+        _DriverLogado(url_base), {'placa': PLACA}, planilha, mensagens.append
+    )
+    assert restantes == planilha
+    assert 'HTTP 404' in mensagens[0]
+
+def test_contagem_de_paginas_no_limite(portal, monkeypatch):
+    estado, url_base = portal
+    for n in range(45):
+        _gravar(estado, _transacao(n))
+    monkeypatch.setattr(reconciliacao, 'MAX_PAGINAS', 2)
+    mensagens = []
+    chaves = reconciliacao.IndicePortal(URL_CONSULTA).carregar(_DriverLogado(url_base), PLACA, mensagens.append)
+    assert len(chaves) == 40
+    assert 'em 2 página(s)' in mensagens[0]
@@ -0,0 +1,41 @@
+import time
+
+import pytest
+
+from automation import telemetria
+
+@pytest.mark.parametrize('valores, p, esperado', [
+    (range(1, 101), 95, 95),
+    (range(1, 21), 95, 19),
+    (range(1, 61), 95, 57),
+    (range(1, 11), 50, 5),
+    ([1, 2], 50, 1),
+    ([7], 95, 7),
+    (range(1, 11), 100, 10),
+])
+def test_percentil_posto_mais_proximo(valores, p, esperado):
+    assert telemetria.percentil(list(valores), p) == esperado
+
+def test_p95_no_resumo(tmp_path):
+    atual = telemetria.Telemetria(str(tmp_path / 'telemetria.jsonl'))
+    for i in range(1, 21):
+        atual._registrar('envio', float(i), 'ok', {})
+    atual.encerrar()
+    quantidade, media, p95 = atual.resumo()['envio']
+    assert (quantidade, media, p95) == (20, 10.5, 19.0)
+
+def test_fase_interna_nao_e_contada_duas_vezes(tmp_path):
+    atual = telemetria.Telemetria(str(tmp_path / 'telemetria.jsonl'))
+    with atual.registro('planilha.xlsx', 1):
+        with atual.fase('preenchimento'):
+            time.sleep(0.05)
+            with atual.fase('placa'):
+                time.sleep(0.1)
+        with atual.fase('envio'):
+            time.sleep(0.05)
+    atual.encerrar()
+    resumo = atual.resumo()
+    preenchimento, placa, envio, registro = (resumo[nome][1] for nome in ('preenchimento', 'placa', 'envio', 'registro'))
+    assert 0.05 <= preenchimento < 0.1
+    assert placa >= 0.1
+    assert preenchimento + placa + envio == pytest.approx(registro, abs=0.01)